@@ -0,0 +1,128 @@
+"""
+Batched audit trail in ActivityLog
+User actions and security events are buffered per worker process and written
+with one bulk_create once ACTIVITY_LOG_BATCH_SIZE events are waiting or the
+oldest has waited ACTIVITY_LOG_FLUSH_SECONDS - checked after each request
+finishes, so no request pays for an INSERT of its own
+"""
+import atexit
+import threading
+import time
+from datetime import datetime, timezone as dt_timezone
+from django.conf import settings
+from django.db import transaction
+from .models import ActivityLog
+
+
+# Action name fragments mapped to ActivityLog.action_type, first match wins
+ACTION_TYPES = [
+    ('delete', 'DELETE'),
+    ('remove', 'DELETE'),
+    ('export', 'EXPORT'),
+    ('created', 'CREATE'),
+    ('added', 'CREATE'),
+    ('view', 'VIEW'),
+]
+SECURITY_PREFIX = 'security_event:'
+
+
+class ActivityBuffer:
+    """Audit events waiting to be written, shared by the threads of one process"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.events = []
+        self.oldest = None  # time.monotonic() of the first waiting event
+
+    def add(self, event):
+        with self.lock:
+            if not self.events:
+                self.oldest = time.monotonic()
+            self.events.append(event)
+
+    def due(self):
+        """True once the batch is full or its oldest event has waited long enough"""
+        events, oldest = self.events, self.oldest
+        if not events:
+            return False
+        return (
+            len(events) >= settings.ACTIVITY_LOG_BATCH_SIZE
+            or time.monotonic() - oldest >= settings.ACTIVITY_LOG_FLUSH_SECONDS
+        )
+
+    def drain(self):
+        with self.lock:
+            events, self.events, self.oldest = self.events, [], None
+        return events
+
+
+_buffer = ActivityBuffer()
+
+
+def action_type(action):
+    """ActivityLog.action_type for an audit action name"""
+    if action.startswith(SECURITY_PREFIX):
+        return 'SECURITY'
+    for fragment, value in ACTION_TYPES:
+        if fragment in action:
+            return value
+    return 'UPDATE'
+
+
+def make_activity(event):
+    """
+    Build an unsaved ActivityLog row from an AuditEvent.
+
+    Targets written as 'model:id' (e.g. 'member:M001') fill target_model and
+    target_id; anything else (request paths) is kept as the target_id.
+    """
+    target = event.target or ''
+    if ':' in target and not target.startswith('/'):
+        target_model, target_id = target.split(':', 1)
+        target_model = target_model.title()
+    else:
+        target_model, target_id = ('Security' if event.action.startswith(SECURITY_PREFIX) else 'System'), target
+
+    description = event.action
+    if event.extra:
+        description += ': ' + ', '.join(f'{key}={value}' for key, value in event.extra.items())
+
+    return ActivityLog(
+        user_id=event.user_id,
+        action_type=action_type(event.action),
+        target_model=target_model[:50],
+        target_id=target_id[:50],
+        description=description,
+        created_at=datetime.fromtimestamp(event.created, dt_timezone.utc),
+    )
+
+
+def record_activity(event):
+    """Buffer an AuditEvent for the next batch (no database access)"""
+    if settings.ACTIVITY_LOG_ENABLED:
+        _buffer.add(event)
+
+
+def flush_activity(force=False):
+    """
+    Write the buffered events if the batch is due (or always with force).
+
+    Returns:
+        int: Number of rows written
+    """
+    if not (force or _buffer.due()):
+        return 0
+    events = _buffer.drain()
+    if not events:
+        return 0
+    try:
+        # Own savepoint: a failed batch must not break a surrounding transaction
+        with transaction.atomic():
+            ActivityLog.objects.bulk_create([make_activity(event) for event in events], batch_size=500)
+    except Exception:
+        # Silently fail - the events are still in the stdout audit log
+        return 0
+    return len(events)
+
+
+atexit.register(flush_activity, force=True)
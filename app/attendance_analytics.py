@@ -0,0 +1,135 @@
+"""
+Attendance trend analytics
+Present counts per member for two adjacent date windows (e.g. the last three
+months against the three before, or the last year against the year before)
+come from one GROUP BY over the attendance index, with a conditional count per
+window, so the whole membership is checked in a single query.
+"""
+from collections import namedtuple
+from datetime import timedelta
+from django.db.models import Count, F, Q
+from django.utils import timezone
+from .models import MeetingInfo, Member, MemberAttendance
+
+
+# Window presets: key -> (label, days in each window)
+WINDOWS = {
+    '3m': ('Last 3 months vs the 3 before', 90),
+    '6m': ('Last 6 months vs the 6 before', 182),
+    'yoy': ('Last 12 months vs the 12 before', 365),
+}
+DEFAULT_WINDOW = '3m'
+DECLINE_THRESHOLD = 0.3  # A member is declining when attendance dropped by more than this share
+
+AttendanceTrend = namedtuple('AttendanceTrend', [
+    'member_id', 'first_name', 'last_name', 'previous_count', 'recent_count', 'change',
+])
+
+
+def adjacent_windows(days, end=None):
+    """
+    Two back-to-back windows of `days` days ending on `end` (default: today).
+
+    Returns:
+        tuple: (previous_start, recent_start, end) - the previous window is
+        previous_start <= date < recent_start, the recent one recent_start <= date <= end
+    """
+    end = end or timezone.localdate()
+    recent_start = end - timedelta(days=days)
+    return recent_start - timedelta(days=days), recent_start, end
+
+
+def window_meetings(days, end=None):
+    """
+    Meetings in each of two adjacent windows (one small query).
+
+    Returns:
+        tuple: (previous window meeting IDs, recent window meeting IDs)
+    """
+    previous_start, recent_start, end = adjacent_windows(days, end)
+    previous, recent = [], []
+    meetings = MeetingInfo.objects.filter(meeting_date__gte=previous_start, meeting_date__lte=end)
+    for meeting_id, meeting_date in meetings.values_list('meeting_id', 'meeting_date'):
+        (recent if meeting_date >= recent_start else previous).append(meeting_id)
+    return previous, recent
+
+
+def member_window_counts(previous_ids, recent_ids):
+    """
+    Present counts per member at the previous and recent meetings, in one GROUP BY.
+
+    The windows are given as meeting IDs (see window_meetings) and the rows are
+    not joined to meetings or members, so the query reads only the
+    (member_id, attendance_status, meeting_date) index, and only the rows of
+    those meetings. Members of any status are included; those without a
+    present row in either window are left out.
+
+    Returns:
+        QuerySet: dicts with member_id, previous_count and recent_count
+    """
+    return MemberAttendance.objects.filter(
+        attendance_status=True, meeting_date__in=previous_ids + recent_ids,
+    ).values('member_id').annotate(
+        previous_count=Count('attendance_id', filter=Q(meeting_date__in=previous_ids)),
+        recent_count=Count('attendance_id', filter=Q(meeting_date__in=recent_ids)),
+    ).order_by()
+
+
+def declining_members(days=WINDOWS[DEFAULT_WINDOW][1], threshold=DECLINE_THRESHOLD, end=None):
+    """
+    Active members whose present count dropped by more than `threshold` from
+    the previous window to the recent one.
+
+    Decliners are picked out in the grouped query (HAVING), then the names of
+    those still active are loaded in a second query.
+
+    Args:
+        days: Length of each window in days
+        threshold: Drop to exceed, as a share of the previous count (0.3 = 30%)
+        end: Last day of the recent window (default: today)
+
+    Returns:
+        list: AttendanceTrend for each declining member, largest drop first
+    """
+    previous_ids, recent_ids = window_meetings(days, end)
+    if not previous_ids:
+        return []
+    rows = {
+        row['member_id']: row
+        for row in member_window_counts(previous_ids, recent_ids).filter(
+            previous_count__gt=0,
+            recent_count__lt=F('previous_count') * (1 - threshold),
+        )
+    }
+    members = Member.objects.filter(member_is_active=True).only('member_first_name', 'member_last_name').in_bulk(list(rows))
+
+    trends = []
+    for member_id, member in members.items():
+        previous, recent = rows[member_id]['previous_count'], rows[member_id]['recent_count']
+        trends.append(AttendanceTrend(
+            member_id, member.member_first_name, member.member_last_name,
+            previous, recent, round((recent - previous) / previous * 100, 1),
+        ))
+    trends.sort(key=lambda trend: (trend.change, trend.recent_count - trend.previous_count, trend.member_id))
+    return trends
+
+
+def window_summary(days, end=None):
+    """
+    Dates and meeting counts of both windows, for labelling a report.
+
+    Returns:
+        dict: previous_start, recent_start, end, previous_meetings, recent_meetings
+    """
+    previous_start, recent_start, end = adjacent_windows(days, end)
+    meetings = MeetingInfo.objects.filter(meeting_date__gte=previous_start, meeting_date__lte=end).aggregate(
+        previous=Count('meeting_id', filter=Q(meeting_date__lt=recent_start)),
+        recent=Count('meeting_id', filter=Q(meeting_date__gte=recent_start)),
+    )
+    return {
+        'previous_start': previous_start,
+        'recent_start': recent_start,
+        'end': end,
+        'previous_meetings': meetings['previous'],
+        'recent_meetings': meetings['recent'],
+    }
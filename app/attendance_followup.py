@@ -0,0 +1,154 @@
+"""
+Deferred follow-up work for attendance changes
+Badge awards and the inactive-member check run once per transaction, after it
+commits, for the members whose attendance changed - instead of once per saved
+row inside the caller's transaction
+"""
+import threading
+from contextlib import contextmanager
+from django.core.cache import cache
+from django.db import transaction
+from .constants import CONSECUTIVE_MEETINGS_FOR_DEACTIVATION
+from .engagement import drop_engagement_scores
+from .gamification import evaluate_badges
+from .meeting_summary import rebuild_meeting_summaries
+from .member_ledger import rebuild_ledgers
+from .member_state import rebuild_member_states
+from .utils import check_and_deactivate_inactive_members
+
+
+# Cache key to prevent running the check too frequently
+CACHE_KEY_DEACTIVATION_CHECK = 'last_deactivation_check'
+CACHE_TIMEOUT = 300  # 5 minutes - prevents running check more than once per 5 minutes
+
+_local = threading.local()
+
+
+class AttendanceBatch:
+    """Meetings and members touched inside bulk_attendance_changes()"""
+
+    def __init__(self):
+        self.meeting_ids = set()
+        self.member_ids = set()
+
+    def track(self, meeting_id, member_id):
+        self.meeting_ids.add(meeting_id)
+        self.member_ids.add(member_id)
+
+
+def current_batch():
+    """The active AttendanceBatch, or None outside bulk_attendance_changes()"""
+    return getattr(_local, 'batch', None)
+
+
+def _pending_member_ids():
+    if not hasattr(_local, 'pending_member_ids'):
+        _local.pending_member_ids = set()
+    return _local.pending_member_ids
+
+
+def queue_member_followup(member_id):
+    """
+    Re-check a member's badges (and run the throttled deactivation check)
+    once the current transaction commits.
+
+    Outside a transaction this runs straight away. Every call registers a
+    callback, but the first one to run drains the whole queue so each member
+    is processed once per commit. IDs queued in a rolled-back savepoint stay
+    queued and are simply re-checked with the next commit.
+    """
+    _pending_member_ids().add(member_id)
+    if current_batch() is None:
+        transaction.on_commit(process_member_followups)
+
+
+def process_member_followups():
+    """Run the deactivation check and badge evaluation for all queued members"""
+    pending = _pending_member_ids()
+    member_ids = set(pending)
+    pending.clear()
+    if not member_ids:
+        return
+
+    drop_engagement_scores()
+    run_deactivation_check()
+
+    try:
+        evaluate_badges(member_ids)
+    except Exception:
+        # Silently fail - badges are re-evaluated on the next change or by recompute_badges
+        pass
+
+
+def run_deactivation_check():
+    """
+    Deactivate members who missed the configured number of consecutive meetings.
+
+    Uses caching to prevent running more than once per CACHE_TIMEOUT.
+    Works in shared hosting/cPanel environments - no cron jobs needed!
+    """
+    try:
+        # add() claims the slot in the shared cache, so usually one worker runs the check
+        # (FileBasedCache.add() is not atomic; a rare second run deactivates nobody new)
+        try:
+            claimed = cache.add(CACHE_KEY_DEACTIVATION_CHECK, True, CACHE_TIMEOUT)
+        except Exception:
+            # Cache might not be configured - continue anyway
+            claimed = True
+
+        if not claimed:
+            return
+
+        try:
+            check_and_deactivate_inactive_members(
+                consecutive_meetings=CONSECUTIVE_MEETINGS_FOR_DEACTIVATION,
+                dry_run=False
+            )
+        except Exception:
+            # Release the slot so the next change retries
+            try:
+                cache.delete(CACHE_KEY_DEACTIVATION_CHECK)
+            except Exception:
+                pass
+            raise
+    except Exception:
+        # Silently fail - this never interrupts attendance saving
+        pass
+
+
+@contextmanager
+def bulk_attendance_changes():
+    """
+    Run a bulk attendance operation as one transaction with one consolidated pass.
+
+    Inside the block, saving or deleting attendance rows only records which
+    meetings and members were touched. On exit their meeting summaries, member
+    states and ledgers are recomputed in the same transaction, and the badge and
+    deactivation follow-up is queued for commit. Bulk paths that bypass model
+    signals (bulk_create, update) call batch.track() themselves.
+
+    Nested blocks join the outermost one.
+
+    Usage:
+        with bulk_attendance_changes() as batch:
+            ...
+    """
+    if current_batch() is not None:
+        yield current_batch()
+        return
+
+    batch = AttendanceBatch()
+    _local.batch = batch
+    try:
+        with transaction.atomic():
+            yield batch
+            _local.batch = None
+            if batch.meeting_ids:
+                rebuild_meeting_summaries(batch.meeting_ids)
+            if batch.member_ids:
+                rebuild_member_states(batch.member_ids)
+                rebuild_ledgers(batch.member_ids)
+                _pending_member_ids().update(batch.member_ids)
+                transaction.on_commit(process_member_followups)
+    finally:
+        _local.batch = None
@@ -1,11 +1,20 @@
 """
 Audit logging utility for JSON-formatted audit logs
-Captures comprehensive audit information for all system actions
+Captures comprehensive audit information for all system actions. The request
+thread only queues a tuple of the audit fields; building, formatting and
+writing the record happen on a background QueueListener thread.
 """
+import atexit
 import json
 import logging
-from datetime import datetime
-from django.utils import timezone
+import os
+import queue
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime, timezone as dt_timezone
+from logging.handlers import QueueListener
+from django.conf import settings
 
 
 class JSONAuditFormatter(logging.Formatter):
@@ -17,7 +26,8 @@ class JSONAuditFormatter(logging.Formatter):
         # Extract audit data from record
         audit_data = {
             'severity': record.levelname,
-            'timestamp': timezone.now().isoformat(),
+            # When the event happened, not when the background thread wrote it
+            'timestamp': datetime.fromtimestamp(record.created, dt_timezone.utc).isoformat(),
             'who': getattr(record, 'audit_user', 'anonymous'),
             'action': getattr(record, 'audit_action', 'unknown'),
             'target': getattr(record, 'audit_target', None),
@@ -64,6 +74,14 @@ def get_user_agent(request):
     return request.META.get('HTTP_USER_AGENT', 'unknown')
 
 
+def get_user_id(request):
+    """Primary key of the authenticated user, or None"""
+    user = getattr(request, 'user', None)
+    if user and hasattr(user, 'is_authenticated') and user.is_authenticated:
+        return user.pk
+    return None
+
+
 def get_username(request):
     """Safely extract username from request"""
     user = getattr(request, 'user', None)
@@ -72,12 +90,166 @@ def get_username(request):
     return 'anonymous'
 
 
+# Everything the request thread captures; the log record is built from it later
+AuditEvent = namedtuple('AuditEvent', [
+    'level', 'created', 'user_id', 'username', 'action', 'target',
+    'ip_address', 'user_agent', 'endpoint', 'method', 'path', 'extra',
+])
+
+
+def make_audit_record(logger, event):
+    """
+    Build the log record for a queued AuditEvent.
+
+    Args:
+        logger: The 'audit' logger
+        event: AuditEvent captured by audit_log()
+    """
+    log_record = logger.makeRecord(
+        name='audit',
+        level=event.level,
+        fn='',
+        lno=0,
+        msg=event.action,
+        args=(),
+        exc_info=None
+    )
+    log_record.created = event.created
+    log_record.msecs = (event.created - int(event.created)) * 1000
+
+    # Add audit-specific attributes
+    log_record.audit_user = event.username
+    log_record.audit_action = event.action
+    log_record.audit_target = event.target
+    log_record.audit_ip = event.ip_address
+    log_record.audit_user_agent = event.user_agent
+    log_record.audit_endpoint = event.endpoint
+    log_record.audit_method = event.method
+    log_record.audit_path = event.path
+    log_record.audit_extra = event.extra
+    return log_record
+
+
+class AuditPipeline(QueueListener):
+    """
+    Bounded queue of audit events written by one background thread.
+
+    Events go to the handlers configured for the 'audit' logger. When the
+    queue is full, INFO and DEBUG events are dropped and WARNING and above
+    (security events, errors) are written synchronously instead, so they are
+    never lost. Dropped events are reported with one warning once the queue
+    has drained.
+    """
+
+    def __init__(self, logger, maxsize):
+        super().__init__(queue.Queue(maxsize), *logger.handlers, respect_handler_level=True)
+        self.logger = logger
+        self.pid = os.getpid()
+        self.written = 0
+        self.dropped = 0  # queue full, event discarded
+        self.overflowed = 0  # queue full, written on the request thread
+        self._reported_drops = 0
+        self._lock = threading.Lock()
+
+    def submit(self, event):
+        """Queue an event without blocking the caller"""
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            if event.level >= logging.WARNING:
+                with self._lock:
+                    self.overflowed += 1
+                self.logger.handle(make_audit_record(self.logger, event))
+            else:
+                with self._lock:
+                    self.dropped += 1
+
+    def prepare(self, event):
+        return make_audit_record(self.logger, event)
+
+    def handle(self, event):
+        try:
+            super().handle(event)
+        except Exception:
+            # Silently fail - one bad event must not stop the writer thread
+            pass
+        self.written += 1
+        if self.dropped > self._reported_drops and self.queue.empty():
+            self._report_drops()
+
+    def _report_drops(self):
+        dropped = self.dropped
+        count = dropped - self._reported_drops
+        self._reported_drops = dropped
+        event = AuditEvent(
+            logging.WARNING, time.time(), None, 'system', 'audit_events_dropped', None,
+            'unknown', 'unknown', 'unknown', 'unknown', 'unknown',
+            {'dropped': count, 'queue_size': self.queue.maxsize},
+        )
+        super().handle(event)
+
+    def enqueue_sentinel(self):
+        # Wait for room: stop() must not fail because the queue is full
+        self.queue.put(self._sentinel)
+
+    def stats(self):
+        return {
+            'queued': self.queue.qsize(),
+            'written': self.written,
+            'dropped': self.dropped,
+            'overflowed': self.overflowed,
+        }
+
+
+_pipeline = None
+_pipeline_lock = threading.Lock()
+
+
+def get_audit_pipeline():
+    """
+    The running pipeline for this process, started on first use.
+
+    Returns None when AUDIT_LOG_ASYNC is off. A pipeline inherited from a
+    parent process (fork) is replaced, since its thread did not survive.
+    """
+    global _pipeline
+    if not getattr(settings, 'AUDIT_LOG_ASYNC', False):
+        return None
+    pipeline = _pipeline
+    if pipeline is not None and pipeline.pid == os.getpid():
+        return pipeline
+
+    with _pipeline_lock:
+        if _pipeline is None or _pipeline.pid != os.getpid():
+            first = _pipeline is None
+            _pipeline = AuditPipeline(logging.getLogger('audit'), getattr(settings, 'AUDIT_LOG_QUEUE_SIZE', 10000))
+            _pipeline.start()
+            if first:
+                atexit.register(stop_audit_pipeline)
+        return _pipeline
+
+
+def stop_audit_pipeline():
+    """
+    Write every queued event and stop the writer thread.
+
+    Called at interpreter exit and from gunicorn's worker_exit hook
+    (gunicorn.conf.py). Later audit events start a new pipeline.
+    """
+    global _pipeline
+    with _pipeline_lock:
+        pipeline, _pipeline = _pipeline, None
+    if pipeline is not None and pipeline.pid == os.getpid():
+        pipeline.stop()
+
+
 def audit_log(
     request,
     action,
     severity='INFO',
     target=None,
-    extra_details=None
+    extra_details=None,
+    persist=False
 ):
     """
     Create an audit log entry with comprehensive information
@@ -88,41 +260,41 @@ def audit_log(
         severity: Log level (DEBUG, INFO, WARNING, ERROR, CRITICAL)
         target: Target of the action (e.g., member_id, meeting_id, 'user:username')
         extra_details: Additional details to include in the log
+        persist: Also store the entry in ActivityLog (batched, see activity_log)
     """
     logger = logging.getLogger('audit')
+    level = getattr(logging, severity.upper(), logging.INFO)
+    if not persist and not logger.isEnabledFor(level):
+        return
     
-    # Extract audit information
-    username = get_username(request)
-    ip_address = get_client_ip(request)
-    user_agent = get_user_agent(request)
-    endpoint = request.path
-    method = request.method
-    full_path = request.get_full_path()
-    
-    # Create log record with audit information
-    log_record = logger.makeRecord(
-        name='audit',
-        level=getattr(logging, severity.upper(), logging.INFO),
-        fn='',
-        lno=0,
-        msg=action,
-        args=(),
-        exc_info=None
+    # Extract audit information (cheap reads only - the record is built later)
+    event = AuditEvent(
+        level,
+        time.time(),
+        get_user_id(request),
+        get_username(request),
+        action,
+        target,
+        get_client_ip(request),
+        get_user_agent(request),
+        request.path,
+        request.method,
+        request.get_full_path(),
+        extra_details or {},
     )
     
-    # Add audit-specific attributes
-    log_record.audit_user = username
-    log_record.audit_action = action
-    log_record.audit_target = target
-    log_record.audit_ip = ip_address
-    log_record.audit_user_agent = user_agent
-    log_record.audit_endpoint = endpoint
-    log_record.audit_method = method
-    log_record.audit_path = full_path
-    log_record.audit_extra = extra_details or {}
+    if persist:
+        # Imported here: this module is loaded by LOGGING before the app registry is ready
+        from .activity_log import record_activity
+        record_activity(event)
+    if not logger.isEnabledFor(level):
+        return
     
-    # Log the record
-    logger.handle(log_record)
+    pipeline = get_audit_pipeline()
+    if pipeline is None:
+        logger.handle(make_audit_record(logger, event))
+    else:
+        pipeline.submit(event)
 
 
 def audit_log_security_event(
@@ -147,7 +319,8 @@ def audit_log_security_event(
         action=f'security_event:{event_type}',
         severity=severity,
         target=target,
-        extra_details=extra_details
+        extra_details=extra_details,
+        persist=True
     )
 
 
@@ -171,6 +344,7 @@ def audit_log_user_action(
         action=action,
         severity='INFO',
         target=target,
-        extra_details=extra_details
+        extra_details=extra_details,
+        persist=True
     )
 
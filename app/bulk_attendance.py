@@ -0,0 +1,91 @@
+"""
+Set-based attendance writes
+Marks attendance for many members in a fixed number of statements instead of
+one get_or_create/save round-trip per member
+"""
+from django.db import connection
+from django.db.models import Count, Q
+from django.utils import timezone
+from .attendance_followup import bulk_attendance_changes
+from .models import Member, MemberAttendance
+
+
+def _column(model, field_name):
+    return connection.ops.quote_name(model._meta.get_field(field_name).column)
+
+
+def mark_all_present(meeting):
+    """
+    Mark every active member present for a meeting.
+
+    Missing rows are inserted as present with the fee unpaid; existing rows
+    are switched to present and keep their fee status. On MySQL this is a
+    single INSERT ... SELECT ... ON DUPLICATE KEY UPDATE; other backends run
+    an UPDATE followed by an INSERT ... SELECT of the missing rows.
+
+    Args:
+        meeting: MeetingInfo object
+
+    Returns:
+        tuple: (created_count, updated_count)
+    """
+    attendance_table = connection.ops.quote_name(MemberAttendance._meta.db_table)
+    member_table = connection.ops.quote_name(Member._meta.db_table)
+    meeting_col = _column(MemberAttendance, 'meeting_date')
+    member_col = _column(MemberAttendance, 'member_id')
+    status_col = _column(MemberAttendance, 'attendance_status')
+    fee_col = _column(MemberAttendance, 'attendance_fee_status')
+    created_col = _column(MemberAttendance, 'attendance_created_at')
+    updated_col = _column(MemberAttendance, 'attendance_updated_at')
+    member_pk_col = _column(Member, 'member_id')
+    active_col = _column(Member, 'member_is_active')
+
+    now = timezone.now()
+    db_now = connection.ops.adapt_datetimefield_value(now)
+    insert_select = (
+        f'INSERT INTO {attendance_table} '
+        f'({meeting_col}, {member_col}, {status_col}, {fee_col}, {created_col}, {updated_col}) '
+        f'SELECT %s, m.{member_pk_col}, %s, %s, %s, %s FROM {member_table} m WHERE m.{active_col} = %s'
+    )
+    insert_params = [meeting.meeting_id, True, False, db_now, db_now, True]
+
+    with bulk_attendance_changes() as batch:
+        active_member_ids = list(Member.objects.filter(member_is_active=True).values_list('member_id', flat=True))
+        existing = MemberAttendance.objects.filter(meeting_date=meeting, member_id__member_is_active=True)
+
+        if connection.vendor == 'mysql':
+            # With CLIENT_FOUND_ROWS the upsert's row count cannot tell inserts
+            # from unchanged rows, so count what is already there first
+            counts = existing.aggregate(
+                total=Count('attendance_id'),
+                absent=Count('attendance_id', filter=Q(attendance_status=False)),
+            )
+            # SET runs left to right: compare the old status before overwriting it
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'{insert_select} ON DUPLICATE KEY UPDATE '
+                    f'{updated_col} = IF({status_col}, {updated_col}, VALUES({updated_col})), '
+                    f'{status_col} = TRUE',
+                    insert_params,
+                )
+            created_count = len(active_member_ids) - counts['total']
+            updated_count = counts['absent']
+        else:
+            updated_count = existing.filter(attendance_status=False).update(
+                attendance_status=True,
+                attendance_updated_at=now,
+            )
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'{insert_select} AND NOT EXISTS ('
+                    f'SELECT 1 FROM {attendance_table} a '
+                    f'WHERE a.{meeting_col} = %s AND a.{member_col} = m.{member_pk_col})',
+                    insert_params + [meeting.meeting_id],
+                )
+                created_count = cursor.rowcount
+
+        # Raw SQL and update() bypass signals; the batch recounts on exit
+        for member_id in active_member_ids:
+            batch.track(meeting.meeting_id, member_id)
+
+    return created_count, updated_count
@@ -0,0 +1,228 @@
+"""
+Dashboard statistics service
+Computes every number and chart series shown on the dashboard with a handful
+of conditional-aggregation queries instead of one COUNT per figure.
+Attendance figures are read from MeetingSummary and outstanding dues from
+MemberLedger rather than attendance rows.
+"""
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+
+from django.contrib.auth.models import User
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncMonth
+
+from .member_ledger import ledger_totals
+from .models import Member, MeetingInfo, MeetingSummary
+
+
+@dataclass
+class DashboardStats:
+    """All figures rendered by the dashboard, computed in one pass"""
+    current_year: int
+    all_members: int = 0
+    active_members: int = 0
+    passive_members: int = 0
+    all_staff: int = 0
+    all_meeting: int = 0
+    meetings_this_year: int = 0
+    total_attendance_this_year: int = 0
+    present_count_this_year: int = 0
+    paid_count_this_year: int = 0
+    total_collected: int = 0
+    total_to_receive: int = 0
+    members_in_arrears: int = 0
+    latest_meeting: object = None
+    latest_meeting_member_count: int = 0
+    member_status_data: dict = field(default_factory=dict)
+    attendance_vs_fee: dict = field(default_factory=dict)
+    monthly_labels: list = field(default_factory=list)
+    monthly_attendance_data: list = field(default_factory=list)
+    monthly_payment_data: dict = field(default_factory=dict)
+    meeting_dates: list = field(default_factory=list)
+    attendance_counts: list = field(default_factory=list)
+    meetings_by_date: dict = field(default_factory=dict)
+
+    @property
+    def attendance_rate(self):
+        if self.total_attendance_this_year > 0:
+            return (self.present_count_this_year / self.total_attendance_this_year) * 100
+        return 0
+
+    @property
+    def fee_payment_rate(self):
+        if self.present_count_this_year > 0:
+            return (self.paid_count_this_year / self.present_count_this_year) * 100
+        return 0
+
+    @property
+    def percentage_active(self):
+        if self.all_members:
+            return (self.active_members / self.all_members) * 100
+        return 0
+
+    @property
+    def percentage_passive(self):
+        if self.all_members:
+            return (self.passive_members / self.all_members) * 100
+        return 0
+
+
+def adult_cutoff_date(today):
+    """Date of birth on or before which a member counts as 18+"""
+    if today.month == 2 and today.day == 29:
+        return date(today.year - 18, 2, 28)
+    return date(today.year - 18, today.month, today.day)
+
+
+def last_twelve_months(today):
+    """First day of each of the last 12 months, oldest first (current month last)"""
+    months = []
+    year, month = today.year, today.month
+    for _ in range(12):
+        months.append(date(year, month, 1))
+        month -= 1
+        if month == 0:
+            month = 12
+            year -= 1
+    months.reverse()
+    return months
+
+
+def get_dashboard_stats(today=None):
+    """
+    Compute all dashboard statistics.
+
+    Args:
+        today: Reference date (default: date.today())
+
+    Returns:
+        DashboardStats: Populated result object
+    """
+    if today is None:
+        today = date.today()
+
+    stats = DashboardStats(current_year=today.year)
+    cutoff_date = adult_cutoff_date(today)
+    twelve_months_ago = today - timedelta(days=365)
+    months = last_twelve_months(today)
+    window_start = months[0]
+    if today.month == 12:
+        window_end = date(today.year + 1, 1, 1) - timedelta(days=1)
+    else:
+        window_end = date(today.year, today.month + 1, 1) - timedelta(days=1)
+
+    # 1. Member counts, including the age/status split for the pie chart
+    adult = Q(member_dob__lte=cutoff_date)
+    active = Q(member_is_active=True)
+    member_totals = Member.objects.aggregate(
+        total=Count('member_id'),
+        active=Count('member_id', filter=active),
+        active_under_18=Count('member_id', filter=active & ~adult),
+        inactive_under_18=Count('member_id', filter=~active & ~adult),
+        active_18_plus=Count('member_id', filter=active & adult),
+        inactive_18_plus=Count('member_id', filter=~active & adult),
+    )
+    stats.all_members = member_totals['total']
+    stats.active_members = member_totals['active']
+    stats.passive_members = member_totals['total'] - member_totals['active']
+    stats.member_status_data = {
+        'active_under_18': member_totals['active_under_18'],
+        'inactive_under_18': member_totals['inactive_under_18'],
+        'active_18_plus': member_totals['active_18_plus'],
+        'inactive_18_plus': member_totals['inactive_18_plus'],
+    }
+
+    # 2. Staff
+    stats.all_staff = User.objects.count()
+
+    # 3. Meetings (also feeds the calendar widget)
+    meetings = MeetingInfo.objects.order_by('meeting_date').values_list('meeting_id', 'meeting_date', 'meeting_fee')
+    for meeting_id, meeting_date, meeting_fee in meetings:
+        stats.all_meeting += 1
+        if meeting_date.year == today.year:
+            stats.meetings_this_year += 1
+        date_str = meeting_date.strftime('%Y-%m-%d')
+        stats.meetings_by_date.setdefault(date_str, []).append({
+            'id': meeting_id,
+            'date': date_str,
+            'fee': meeting_fee,
+        })
+
+    # 4. Attendance and finance totals (from per-meeting summaries)
+    this_year = Q(meeting__meeting_date__year=today.year)
+    last_year_window = Q(
+        meeting__meeting_date__gte=twelve_months_ago,
+        meeting__meeting_date__lte=today,
+    )
+    attendance_totals = MeetingSummary.objects.aggregate(
+        total_this_year=Sum('total_count', filter=this_year),
+        present_this_year=Sum('present_count', filter=this_year),
+        paid_this_year=Sum('paid_count', filter=this_year),
+        present_paid=Sum(F('present_count') - F('unpaid_present_count'), filter=last_year_window),
+        present_unpaid=Sum('unpaid_present_count', filter=last_year_window),
+        absent=Sum(F('total_count') - F('present_count'), filter=last_year_window),
+        total_collected=Sum('fee_revenue'),
+    )
+    attendance_totals = {name: value or 0 for name, value in attendance_totals.items()}
+    stats.total_attendance_this_year = attendance_totals['total_this_year']
+    stats.present_count_this_year = attendance_totals['present_this_year']
+    stats.paid_count_this_year = attendance_totals['paid_this_year']
+    stats.total_collected = attendance_totals['total_collected']
+    dues = ledger_totals()
+    stats.total_to_receive = dues['total_outstanding']
+    stats.members_in_arrears = dues['members_in_arrears']
+    stats.attendance_vs_fee = {
+        'present_paid': attendance_totals['present_paid'],
+        'present_unpaid': attendance_totals['present_unpaid'],
+        'absent': attendance_totals['absent'],
+    }
+
+    # 5. Monthly series for the trend and payment charts
+    monthly_rows = (
+        MeetingSummary.objects
+        .filter(
+            meeting__meeting_date__gte=window_start,
+            meeting__meeting_date__lte=window_end,
+        )
+        .annotate(month=TruncMonth('meeting__meeting_date'))
+        .values('month')
+        .annotate(
+            present=Sum('present_count'),
+            paid=Sum(F('present_count') - F('unpaid_present_count')),
+        )
+        .order_by()
+    )
+    by_month = {row['month']: row for row in monthly_rows}
+    stats.monthly_payment_data = {'paid': [], 'unpaid': []}
+    for month_start in months:
+        row = by_month.get(month_start, {'present': 0, 'paid': 0})
+        stats.monthly_labels.append(month_start.strftime('%b %Y'))
+        stats.monthly_attendance_data.append(row['present'])
+        stats.monthly_payment_data['paid'].append(row['paid'])
+        stats.monthly_payment_data['unpaid'].append(row['present'] - row['paid'])
+
+    # 6. Per-meeting attendance over the last 12 months
+    meeting_attendance_counts = (
+        MeetingSummary.objects
+        .filter(last_year_window, present_count__gt=0)
+        .order_by('meeting__meeting_date')
+        .values_list('meeting__meeting_date', 'present_count')
+    )
+    for meeting_date, present_count in meeting_attendance_counts:
+        stats.meeting_dates.append(meeting_date.strftime('%d %b'))
+        stats.attendance_counts.append(present_count)
+
+    # 7. Latest meeting with attendance recorded
+    latest_meeting = (
+        MeetingInfo.objects
+        .filter(summary__total_count__gt=0)
+        .select_related('summary')
+        .order_by('-meeting_date')
+        .first()
+    )
+    if latest_meeting:
+        stats.latest_meeting = latest_meeting
+        stats.latest_meeting_member_count = latest_meeting.summary.total_count
+
+    return stats
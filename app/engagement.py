@@ -0,0 +1,178 @@
+"""
+Member engagement scores for the whole membership
+A few grouped queries load every member's counts into NumPy arrays and the
+40/30/20/10 weighting is applied to all of them at once, instead of about
+seven queries per member. The active members' scores are cached as one
+snapshot, dropped whenever attendance, meetings or members change.
+"""
+from collections import namedtuple
+from datetime import timedelta
+import numpy as np
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+from .constants import MAIN_ROLES, SUB_ROLES
+from .models import MeetingInfo, Member, MemberAttendance, MemberAttendanceState, MemberRole
+
+
+CACHE_KEY = 'engagement_scores'
+CACHE_TIMEOUT = 3600  # The recent-activity window moves with the date, so refresh at least hourly
+RECENT_DAYS = 90
+
+# Maximum points per component
+ATTENDANCE_POINTS = 40
+PAYMENT_POINTS = 30
+RECENT_POINTS = 20
+ROLE_POINTS = {
+    **{role: 10 for role in MAIN_ROLES},
+    **{role: 8 for role in SUB_ROLES},
+    MemberRole.COMMITTEE_MEMBER: 5,
+}
+
+# Lowest score for each grade, from the bottom
+GRADE_THRESHOLDS = [50, 60, 70, 80, 90]
+GRADES = np.array(['F', 'D', 'C', 'B', 'A', 'A+'])
+
+EngagementScore = namedtuple('EngagementScore', [
+    'member_id', 'first_name', 'last_name', 'role', 'score',
+    'attendance', 'payment', 'recent_activity', 'leadership', 'grade',
+])
+
+
+def _counts(member_ids, rows):
+    """Array of counts aligned with member_ids from (member_id, count) rows (missing members count 0)"""
+    index = {member_id: i for i, member_id in enumerate(member_ids)}
+    counts = np.zeros(len(member_ids))
+    for member_id, count in rows:
+        i = index.get(member_id)
+        if i is not None:
+            counts[i] = count
+    return counts
+
+
+def compute_engagement_scores(member_ids=None):
+    """
+    Score members (0-100) from their attendance, payments, recent activity and role.
+
+    Scoring:
+    - Attendance rate: 40 points (meetings attended / all meetings)
+    - Payment rate: 30 points (attended meetings paid / attended)
+    - Recent activity: 20 points (attended / held in the last 90 days)
+    - Role/leadership: 10 points (main roles 10, sub roles 8, committee 5)
+
+    Args:
+        member_ids: Members to score (default: all active members)
+
+    Returns:
+        list: EngagementScore for each member, in member_id order
+    """
+    members = Member.objects.order_by('member_id')
+    if member_ids is None:
+        members = members.filter(member_is_active=True)
+    else:
+        members = members.filter(member_id__in=list(member_ids))
+    members = list(members.values_list('member_id', 'member_first_name', 'member_last_name', 'member_role'))
+    if not members:
+        return []
+    ids = [member[0] for member in members]
+    scoped = {} if member_ids is None else {'member_id__in': ids}
+
+    # 1. Meeting totals
+    recent_since = timezone.localdate() - timedelta(days=RECENT_DAYS)
+    meetings = MeetingInfo.objects.aggregate(
+        total=Count('meeting_id'),
+        recent=Count('meeting_id', filter=Q(meeting_date__gte=recent_since)),
+    )
+
+    # 2. Per-member counts, grouped in the database
+    state_rows = list(
+        MemberAttendanceState.objects.filter(**scoped).values_list('member_id', 'attended_count', 'paid_attended_count')
+    )
+    attended = _counts(ids, ((row[0], row[1]) for row in state_rows))
+    paid_attended = _counts(ids, ((row[0], row[2]) for row in state_rows))
+    recent_rows = MemberAttendance.objects.filter(
+        attendance_status=True,
+        meeting_date__meeting_date__gte=recent_since,
+        **scoped,
+    ).values('member_id').annotate(count=Count('attendance_id')).order_by().values_list('member_id', 'count')
+    recent = _counts(ids, recent_rows)
+
+    # 3. Weighting, for every member at once
+    if meetings['total']:
+        attendance = np.minimum(ATTENDANCE_POINTS, attended / meetings['total'] * ATTENDANCE_POINTS)
+    else:
+        attendance = np.zeros(len(ids))
+    payment = np.minimum(PAYMENT_POINTS, np.divide(
+        paid_attended * PAYMENT_POINTS, attended, out=np.zeros(len(ids)), where=attended > 0,
+    ))
+    if meetings['recent']:
+        recent_activity = np.minimum(RECENT_POINTS, recent / meetings['recent'] * RECENT_POINTS)
+    else:
+        recent_activity = np.zeros(len(ids))
+    leadership = np.array([ROLE_POINTS.get(member[3], 0) for member in members], dtype=float)
+
+    scores = np.round(attendance + payment + recent_activity + leadership, 1)
+    grades = GRADES[np.searchsorted(GRADE_THRESHOLDS, scores, side='right')]
+    attendance, payment, recent_activity = (np.round(values, 1) for values in (attendance, payment, recent_activity))
+
+    return [
+        EngagementScore(
+            member_id, first_name, last_name, role,
+            float(scores[i]), float(attendance[i]), float(payment[i]), float(recent_activity[i]),
+            int(leadership[i]), str(grades[i]),
+        )
+        for i, (member_id, first_name, last_name, role) in enumerate(members)
+    ]
+
+
+def get_engagement_scores():
+    """Scores of all active members, from the cached snapshot when available"""
+    try:
+        scores = cache.get(CACHE_KEY)
+    except Exception:
+        # Cache might not be configured - compute directly
+        scores = None
+    if scores is not None:
+        return scores
+
+    scores = compute_engagement_scores()
+    try:
+        cache.set(CACHE_KEY, scores, CACHE_TIMEOUT)
+    except Exception:
+        pass
+    return scores
+
+
+def get_member_engagement(member):
+    """
+    Engagement score of one member (active or not).
+
+    Returns:
+        dict: score, breakdown (attendance, payment, recent_activity, leadership) and grade
+    """
+    [result] = compute_engagement_scores([member.member_id])
+    return {
+        'score': result.score,
+        'breakdown': {
+            'attendance': result.attendance,
+            'payment': result.payment,
+            'recent_activity': result.recent_activity,
+            'leadership': result.leadership,
+        },
+        'grade': result.grade,
+    }
+
+
+def invalidate_engagement_scores():
+    """Drop the snapshot once the current transaction commits"""
+    transaction.on_commit(drop_engagement_scores)
+
+
+def drop_engagement_scores():
+    """Drop the snapshot now (attendance follow-ups call this after commit)"""
+    try:
+        cache.delete(CACHE_KEY)
+    except Exception:
+        # Silently fail - the snapshot expires on its own
+        pass
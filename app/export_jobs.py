@@ -0,0 +1,269 @@
+"""
+Background report exports
+Large Excel and PDF exports are recorded as ExportJob rows and generated by a
+separate worker process (manage.py run_export_worker) instead of inside a
+gunicorn request. Jobs are claimed with a conditional UPDATE, so any number of
+workers can share the table without an external broker.
+"""
+import logging
+import os
+import secrets
+import tempfile
+from datetime import date, timedelta
+from django.conf import settings
+from django.core.files import File
+from django.db.models import F, Q
+from django.utils import timezone
+from .export_utils import (
+    ATTENDANCE_COLUMNS, MEETING_COLUMNS, MEMBER_COLUMNS, PAYMENT_COLUMNS, PDF_DEFAULT_MEMBER_COLUMNS,
+    export_queryset, export_rows, select_columns, write_excel, write_members_pdf,
+)
+from .models import ExportJob, Payment
+from .search_utils import search_attendance, search_meetings, search_members
+
+
+logger = logging.getLogger(__name__)
+
+PROGRESS_EVERY_ROWS = 1000  # Rows written between progress/heartbeat updates
+STALE_AFTER = timedelta(minutes=10)  # A running job with no heartbeat for this long is picked up again
+MAX_ATTEMPTS = 3
+
+# report_type -> (columns, worksheet title, file name prefix)
+REPORTS = {
+    'members': (MEMBER_COLUMNS, 'Members', 'Members_Export'),
+    'attendance': (ATTENDANCE_COLUMNS, 'Attendance', 'Attendance_Export'),
+    'meetings': (MEETING_COLUMNS, 'Meetings', 'Meetings_Export'),
+    'payments': (PAYMENT_COLUMNS, 'Payments', 'Payments_Report'),
+}
+
+
+def adult_cutoff_date(today=None):
+    """Members born on or before this date are 18 or older"""
+    today = today or date.today()
+    if today.month == 2 and today.day == 29:
+        return date(today.year - 18, 2, 28)
+    return date(today.year - 18, today.month, today.day)
+
+
+def build_report_queryset(report_type, filters):
+    """
+    Queryset for a report, from JSON-serialisable filters.
+
+    Members accept 'search' and 'is_adults' (True/False, None for everyone)
+    besides the search_members() filters; the other types use the filters of
+    the reports builder.
+    """
+    filters = dict(filters)
+    if report_type == 'members':
+        search = filters.pop('search', '')
+        is_adults = filters.pop('is_adults', None)
+        members = search_members(search, filters)
+        if is_adults is True:
+            members = members.filter(member_dob__lte=adult_cutoff_date())
+        elif is_adults is False:
+            members = members.filter(member_dob__gt=adult_cutoff_date())
+        return members
+
+    if report_type == 'attendance':
+        return search_attendance('', filters)
+
+    if report_type == 'meetings':
+        return search_meetings('', filters)
+
+    if report_type == 'payments':
+        payments = Payment.objects.all()
+        if filters.get('member_id'):
+            payments = payments.filter(member__member_id__icontains=filters['member_id'])
+        if filters.get('payment_method'):
+            payments = payments.filter(payment_method=filters['payment_method'])
+        if filters.get('date_from'):
+            payments = payments.filter(payment_date__date__gte=filters['date_from'])
+        if filters.get('date_to'):
+            payments = payments.filter(payment_date__date__lte=filters['date_to'])
+        return payments
+
+    raise ValueError(f'Unknown report type: {report_type}')
+
+
+def should_run_in_background(queryset, export_format):
+    """True for Excel/PDF exports above EXPORT_BACKGROUND_ROW_THRESHOLD rows"""
+    if export_format not in ('excel', 'pdf'):
+        return False
+    return queryset.count() > settings.EXPORT_BACKGROUND_ROW_THRESHOLD
+
+
+def create_export_job(user, report_type, export_format, filters=None, columns=None):
+    """
+    Queue an export for the worker.
+
+    Args:
+        user: User who requested the export (only they and superusers can download it)
+        report_type: Key of REPORTS
+        export_format: 'excel' or 'pdf' (PDF is members only)
+        filters: JSON-serialisable filters for build_report_queryset()
+        columns: Selected column keys, or None for the defaults
+
+    Returns:
+        ExportJob: The queued job
+    """
+    if report_type not in REPORTS:
+        raise ValueError(f'Unknown report type: {report_type}')
+    if export_format == 'pdf' and report_type != 'members':
+        raise ValueError('PDF export is only available for members')
+    return ExportJob.objects.create(
+        user=user,
+        report_type=report_type,
+        export_format=export_format,
+        params={'filters': filters or {}, 'columns': columns},
+    )
+
+
+def _claimable(now):
+    # Queued jobs, plus running jobs whose worker stopped sending heartbeats
+    return ExportJob.objects.filter(
+        Q(status=ExportJob.STATUS_PENDING) |
+        Q(status=ExportJob.STATUS_RUNNING, heartbeat_at__lt=now - STALE_AFTER, attempts__lt=MAX_ATTEMPTS)
+    )
+
+
+def claim_next_job():
+    """
+    Claim the oldest available job for this worker.
+
+    The claim is an UPDATE guarded by the same conditions as the lookup, so
+    when two workers race for a job only one of them changes the row.
+
+    Returns:
+        ExportJob or None
+    """
+    now = timezone.now()
+    candidates = list(_claimable(now).order_by('created_at').values_list('job_id', flat=True)[:10])
+    for job_id in candidates:
+        claimed = _claimable(now).filter(job_id=job_id).update(
+            status=ExportJob.STATUS_RUNNING,
+            started_at=now,
+            heartbeat_at=now,
+            rows_done=0,
+            attempts=F('attempts') + 1,
+        )
+        if claimed:
+            return ExportJob.objects.get(job_id=job_id)
+    return None
+
+
+def _track_progress(job, rows):
+    """Pass rows through, recording progress and a heartbeat every PROGRESS_EVERY_ROWS"""
+    done = 0
+    for row in rows:
+        yield row
+        done += 1
+        if done % PROGRESS_EVERY_ROWS == 0:
+            ExportJob.objects.filter(job_id=job.job_id).update(rows_done=done, heartbeat_at=timezone.now())
+    job.rows_done = done
+
+
+def write_job_file(job, output):
+    """
+    Generate a job's export into a binary file object.
+
+    Returns:
+        str: File extension for the export
+    """
+    columns_spec, title, _ = REPORTS[job.report_type]
+    # Counted and iterated without DISTINCT so rows_total matches the rows written
+    queryset = export_queryset(build_report_queryset(job.report_type, job.params.get('filters') or {}))
+    selected = job.params.get('columns')
+    if job.export_format == 'pdf':
+        selected = [col for col in selected or [] if col in columns_spec] or PDF_DEFAULT_MEMBER_COLUMNS
+    columns = select_columns(columns_spec, selected)
+    headers = [header for header, _, _ in columns]
+
+    job.rows_total = queryset.count()
+    ExportJob.objects.filter(job_id=job.job_id).update(rows_total=job.rows_total)
+
+    rows = _track_progress(job, export_rows(queryset, columns))
+    if job.export_format == 'pdf':
+        write_members_pdf(rows, headers, output, workers=settings.EXPORT_PDF_WORKERS)
+        return 'pdf'
+    write_excel(rows, headers, title, output)
+    return 'xlsx'
+
+
+def run_job(job):
+    """
+    Generate a claimed job's file into MEDIA_ROOT/exports/ and mark it done
+    (or failed). The file is stored under a random directory name because
+    /media/ is served without authentication.
+    """
+    retention = timedelta(hours=settings.EXPORT_JOB_RETENTION_HOURS)
+    _, _, prefix = REPORTS.get(job.report_type, (None, None, 'Export'))
+    try:
+        with tempfile.TemporaryFile() as output:
+            extension = write_job_file(job, output)
+            output.seek(0)
+            filename = f"{prefix}_{job.created_at.strftime('%Y%m%d_%H%M%S')}.{extension}"
+            job.file.save(f"{secrets.token_urlsafe(16)}/{filename}", File(output), save=False)
+    except Exception as e:
+        logger.exception('Export job %s failed', job.job_id)
+        job.status = ExportJob.STATUS_FAILED
+        job.error = str(e)
+    else:
+        job.status = ExportJob.STATUS_DONE
+        job.error = ''
+    now = timezone.now()
+    job.finished_at = now
+    job.heartbeat_at = now
+    job.expires_at = now + retention
+    job.save(update_fields=[
+        'status', 'error', 'file', 'rows_done', 'rows_total',
+        'finished_at', 'heartbeat_at', 'expires_at',
+    ])
+    return job
+
+
+def cleanup_expired_jobs(now=None):
+    """
+    Delete expired jobs and their files, and give up on jobs whose worker
+    died MAX_ATTEMPTS times.
+
+    Returns:
+        int: Number of jobs removed
+    """
+    now = now or timezone.now()
+    ExportJob.objects.filter(
+        status=ExportJob.STATUS_RUNNING, heartbeat_at__lt=now - STALE_AFTER, attempts__gte=MAX_ATTEMPTS
+    ).update(
+        status=ExportJob.STATUS_FAILED,
+        error='The export worker stopped while generating this file.',
+        finished_at=now,
+        expires_at=now + timedelta(hours=settings.EXPORT_JOB_RETENTION_HOURS),
+    )
+    expired = list(ExportJob.objects.filter(expires_at__lt=now))
+    for job in expired:
+        if job.file:
+            job.file.storage.delete(job.file.name)
+            # Remove the random directory the file was stored in
+            directory = os.path.dirname(job.file.name)
+            try:
+                os.rmdir(job.file.storage.path(directory))
+            except (OSError, NotImplementedError):
+                pass
+    ExportJob.objects.filter(job_id__in=[job.job_id for job in expired]).delete()
+    return len(expired)
+
+
+def process_jobs(limit=None):
+    """
+    Run claimable jobs until none are left (or limit jobs have run).
+
+    Returns:
+        int: Number of jobs run
+    """
+    count = 0
+    while limit is None or count < limit:
+        job = claim_next_job()
+        if job is None:
+            break
+        run_job(job)
+        count += 1
+    return count
@@ -1,239 +1,471 @@
 """
 Enhanced export utilities for Excel and PDF exports
 """
+import csv
+import tempfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from itertools import chain, islice
 from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
 from openpyxl.utils import get_column_letter
-from reportlab.lib import colors
-from reportlab.lib.pagesizes import letter, A4
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-from django.http import HttpResponse
+from pypdf import PdfReader, PdfWriter
+from django.http import FileResponse, StreamingHttpResponse
 from datetime import datetime
-from .models import Member, MeetingInfo, MemberAttendance
+from .models import Member, MeetingInfo, MemberAttendance, Payment
+from .pagination import seek
+from .pdf_render import plan_layout, render_pages
 
 
-def style_excel_worksheet(ws, title):
-    """Apply consistent styling to Excel worksheet"""
-    # Title row
-    title_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-    title_font = Font(bold=True, color="FFFFFF", size=12)
+EXPORT_CHUNK_SIZE = 2000  # Rows fetched per database round-trip
+SPOOL_MAX_SIZE = 10 * 1024 * 1024  # Finished workbooks larger than this go to disk
+MAX_COLUMN_WIDTH = 50
+PDF_PAGES_PER_CHUNK = 50  # Pages rendered per worker task
+CSV_FLUSH_SIZE = 64 * 1024  # Bytes of CSV text buffered before each write to the client
+
+
+def _choice_label(model, field_name, empty=""):
+    """Formatter that maps a stored choice value to its display label"""
+    labels = dict(model._meta.get_field(field_name).flatchoices)
+    return lambda value: labels.get(value, value) if value else empty
+
+
+def _date(fmt):
+    return lambda value: value.strftime(fmt) if value else ""
+
+
+# Export columns: key -> (header, value_list fields, formatter taking those field values)
+MEMBER_COLUMNS = {
+    'member_id': ('Member ID', ('member_id',), str),
+    'initials': ('Initials', ('member_initials',), str),
+    'first_name': ('First Name', ('member_first_name',), str),
+    'last_name': ('Last Name', ('member_last_name',), str),
+    'address': ('Address', ('member_address',), str),
+    'dob': ('Date of Birth', ('member_dob',), _date("%d/%m/%Y")),
+    'telephone': ('Telephone', ('member_tp_number',), str),
+    'account': ('Account Number', ('member_acc_number',), lambda value: value or ""),
+    'guardian': ('Guardian Name', ('member_guardian_name',), str),
+    'role': ('Role', ('member_role',), _choice_label(Member, 'member_role', empty="No Role")),
+    'status': ('Status', ('member_is_active',), lambda value: "Active" if value else "Inactive"),
+    'join_date': ('Join Date', ('member_join_at',), _date("%d/%m/%Y")),
+}
+
+MEETING_COLUMNS = {
+    'meeting_id': ('Meeting ID', ('meeting_id',), lambda value: value),
+    'date': ('Date', ('meeting_date',), _date("%d/%m/%Y")),
+    'fee': ('Fee', ('meeting_fee',), lambda value: value),
+    'created_at': ('Created At', ('meeting_created_at',), _date("%d/%m/%Y %H:%M")),
+}
+
+ATTENDANCE_COLUMNS = {
+    'member_id': ('Member ID', ('member_id_id',), str),
+    'member_name': (
+        'Member Name',
+        ('member_id__member_initials', 'member_id__member_first_name', 'member_id__member_last_name'),
+        lambda initials, first_name, last_name: f"{initials} {first_name} {last_name}",
+    ),
+    'meeting_date': ('Meeting Date', ('meeting_date__meeting_date',), _date("%d/%m/%Y")),
+    'attendance': ('Attendance', ('attendance_status',), lambda value: "Present" if value else "Absent"),
+    'fee_paid': ('Fee Paid', ('attendance_fee_status',), lambda value: "Paid" if value else "Not Paid"),
+}
+
+PAYMENT_COLUMNS = {
+    'payment_id': ('Payment ID', ('payment_id',), lambda value: value),
+    'member_id': ('Member ID', ('member_id',), str),
+    'member_name': (
+        'Member Name',
+        ('member__member_first_name', 'member__member_last_name'),
+        lambda first_name, last_name: f"{first_name} {last_name}",
+    ),
+    'amount': ('Amount', ('amount',), float),
+    'method': ('Method', ('payment_method',), _choice_label(Payment, 'payment_method')),
+    'meeting_date': ('Meeting Date', ('meeting__meeting_date',), _date("%d/%m/%Y")),
+    'receipt': ('Receipt #', ('receipt_number',), lambda value: value or ""),
+    'date': ('Date', ('payment_date',), _date("%d/%m/%Y %H:%M")),
+}
+
+# Per-meeting and per-member attendance reports (views.export_attendance_report
+# and views.export_member_attendance_report)
+MEETING_ATTENDANCE_COLUMNS = {
+    'member_id': ('Member ID', ('member_id_id',), str),
+    'full_name': ATTENDANCE_COLUMNS['member_name'],
+    'attendance': ('Attendance State', ('attendance_status',), lambda value: 'Present' if value else 'Absent'),
+    'fee': ('Member Fee State', ('attendance_fee_status',), lambda value: 'Payed' if value else 'Not Payed'),
+}
+
+MEMBER_ATTENDANCE_COLUMNS = {
+    'date': ('Date', ('meeting_date__meeting_date',), _date("%d/%m/%Y")),
+    'attendance': MEETING_ATTENDANCE_COLUMNS['attendance'],
+    'fee': MEETING_ATTENDANCE_COLUMNS['fee'],
+}
+
+
+def select_columns(columns, selected=None):
+    """
+    Pick export columns by key, keeping the spec's order for unknown or empty selections.
+
+    Returns:
+        list: (header, fields, formatter) for each selected column
+    """
+    keys = [key for key in (selected or []) if key in columns] or list(columns)
+    return [columns[key] for key in keys]
+
+
+def export_queryset(queryset):
+    """
+    The queryset's rows without DISTINCT, in the same order.
+
+    Search querysets are DISTINCT (their filters can join to many rows), and
+    DISTINCT over only the exported columns would merge different records with
+    the same values, so they are re-selected by primary key instead.
+    """
+    if not queryset.query.distinct:
+        return queryset
+    rows = queryset.model._default_manager.filter(pk__in=queryset.values('pk'))
+    if queryset.query.order_by:
+        rows = rows.order_by(*queryset.query.order_by)
+    return rows
+
+
+def keyset_ordering(queryset):
+    """
+    The queryset's ordering made unique with the primary key, for reading it in slices.
+
+    Orderings that cannot be seeked on (expressions, random, nullable columns,
+    relations to models with their own ordering) fall back to the primary key.
+
+    Returns:
+        list: Field names, '-' prefix for descending
+    """
+    model = queryset.model
+    pk = model._meta.pk.name
+    query = queryset.query
+    ordering = list(query.order_by) or (list(model._meta.ordering) if query.default_ordering else [])
+    keys = []
+    for name in ordering:
+        if not isinstance(name, str) or name == '?':
+            return [pk]
+        prefix, path = ('-', name[1:]) if name.startswith('-') else ('', name)
+        path = pk if path == 'pk' else path
+        try:
+            related = model
+            for part in path.split('__'):
+                field = related._meta.get_field(part)
+                related = field.related_model
+        except Exception:
+            # Ordering by an annotation or a reverse relation
+            return [pk]
+        if getattr(field, 'null', False) or (field.is_relation and (not field.concrete or related._meta.ordering)):
+            return [pk]
+        if field.is_relation:
+            path = f'{path}__{related._meta.pk.name}'
+        keys.append(prefix + path)
+        if path == pk:
+            return keys
+    return keys + [pk]
+
+
+def export_rows(queryset, columns, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Yield formatted rows for a queryset without loading model instances.
+
+    Only the fields the columns need are selected, and rows are read in
+    slices of chunk_size seeked from the last row of the previous slice
+    (keyset on the queryset's ordering, see keyset_ordering). MySQL cursors
+    buffer a whole result set, so this keeps memory flat and the first rows
+    come back after one small query. DISTINCT querysets are exported one row
+    per record (see export_queryset).
+
+    Args:
+        queryset: Queryset to export
+        columns: List of (header, fields, formatter) as returned by select_columns()
+        chunk_size: Rows per fetch
+
+    Yields:
+        list: One formatted value per column
+    """
+    queryset = export_queryset(queryset)
+    ordering = keyset_ordering(queryset)
+    keys = [name.lstrip('-') for name in ordering]
+    fields = list(dict.fromkeys([field for _, column_fields, _ in columns for field in column_fields] + keys))
+    positions = [[fields.index(field) for field in column_fields] for _, column_fields, _ in columns]
+    key_positions = [fields.index(key) for key in keys]
+    formatters = [formatter for _, _, formatter in columns]
+
+    rows = queryset.order_by(*ordering).values_list(*fields)
+    chunk = list(rows[:chunk_size])
+    while chunk:
+        for values in chunk:
+            yield [
+                formatter(*[values[i] for i in indexes])
+                for formatter, indexes in zip(formatters, positions)
+            ]
+        if len(chunk) < chunk_size:
+            return
+        chunk = list(rows.filter(seek(ordering, [chunk[-1][i] for i in key_positions]))[:chunk_size])
+
+
+def _header_cells(ws, headers):
+    fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
+    font = Font(bold=True, color="FFFFFF", size=12)
     border = Border(
         left=Side(style='thin'),
         right=Side(style='thin'),
         top=Side(style='thin'),
         bottom=Side(style='thin')
     )
-    
-    # Style header row
-    for cell in ws[1]:
-        cell.font = title_font
-        cell.fill = title_fill
+    cells = []
+    for header in headers:
+        cell = WriteOnlyCell(ws, value=header)
+        cell.font = font
+        cell.fill = fill
         cell.alignment = Alignment(horizontal='center', vertical='center')
         cell.border = border
-    
-    # Auto-adjust column widths
-    for column in ws.columns:
-        max_length = 0
-        column_letter = get_column_letter(column[0].column)
-        for cell in column:
-            try:
-                if len(str(cell.value)) > max_length:
-                    max_length = len(str(cell.value))
-            except:
-                pass
-        adjusted_width = min(max_length + 2, 50)
-        ws.column_dimensions[column_letter].width = adjusted_width
+        cells.append(cell)
+    return cells
+
+
+def write_excel(rows, headers, title, output, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Write rows to a write-only workbook saved into output.
+
+    Write-only sheets keep a single row in memory, but their column widths
+    must be set before the first row is written, so widths are estimated from
+    the header and the first chunk of rows (capped at MAX_COLUMN_WIDTH).
+
+    Args:
+        rows: Iterable of row value lists, e.g. from export_rows()
+        headers: Column headers
+        title: Worksheet title
+        output: Binary file object to save the workbook to
+        chunk_size: Rows sampled for the column widths
+    """
+    rows = iter(rows)
+    sample = list(islice(rows, chunk_size))
+
+    widths = [len(str(header)) for header in headers]
+    for row in sample:
+        for i, value in enumerate(row):
+            widths[i] = max(widths[i], len(str(value)))
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(title)
+    for i, width in enumerate(widths, start=1):
+        ws.column_dimensions[get_column_letter(i)].width = min(width + 2, MAX_COLUMN_WIDTH)
+
+    ws.append(_header_cells(ws, headers))
+    for row in chain(sample, rows):
+        ws.append(row)
+    wb.save(output)
+
+
+def stream_excel(rows, headers, title, filename, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Write rows to Excel and return the workbook as a file download.
+
+    The finished file is held in a spooled temporary file that moves to disk
+    once it grows past SPOOL_MAX_SIZE.
+
+    Returns:
+        FileResponse: The .xlsx attachment
+    """
+    output = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+    write_excel(rows, headers, title, output, chunk_size)
+    output.seek(0)
+    return FileResponse(output, as_attachment=True, filename=filename, content_type='application/ms-excel')
+
+
+def export_queryset_excel(queryset, columns, title, filename):
+    """Stream a queryset to Excel using a list of export columns"""
+    headers = [header for header, _, _ in columns]
+    return stream_excel(export_rows(queryset, columns), headers, title, filename)
+
+
+class _Echo:
+    """Pseudo-buffer for csv.writer: write() hands the formatted line back"""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(rows, headers, filename):
+    """
+    Stream rows to the client as CSV while they are read from the database.
+
+    The header goes out before the first query runs; after that the text is
+    flushed every CSV_FLUSH_SIZE characters, so memory stays flat however
+    many rows are exported.
+
+    Args:
+        rows: Iterable of row value lists, e.g. from export_rows()
+        headers: Column headers
+        filename: Download file name
+
+    Returns:
+        StreamingHttpResponse: The .csv attachment
+    """
+    writer = csv.writer(_Echo())
+
+    def content():
+        yield writer.writerow(headers)
+        buffer = []
+        size = 0
+        for row in rows:
+            line = writer.writerow(row)
+            buffer.append(line)
+            size += len(line)
+            if size >= CSV_FLUSH_SIZE:
+                yield ''.join(buffer)
+                buffer = []
+                size = 0
+        if buffer:
+            yield ''.join(buffer)
+
+    response = StreamingHttpResponse(content(), content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+def export_queryset_csv(queryset, columns, filename):
+    """Stream a queryset to CSV using a list of export columns"""
+    headers = [header for header, _, _ in columns]
+    return stream_csv(export_rows(queryset, columns), headers, filename)
 
 
 def export_members_excel(members, filename=None, selected_columns=None):
     """Export members to Excel with enhanced formatting and column selection"""
     if filename is None:
         filename = f"Members_Export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-    
-    # Column mapping
-    column_map = {
-        'member_id': ('Member ID', lambda m: m.member_id),
-        'initials': ('Initials', lambda m: m.member_initials),
-        'first_name': ('First Name', lambda m: m.member_first_name),
-        'last_name': ('Last Name', lambda m: m.member_last_name),
-        'address': ('Address', lambda m: m.member_address),
-        'dob': ('Date of Birth', lambda m: m.member_dob.strftime("%d/%m/%Y") if m.member_dob else ""),
-        'telephone': ('Telephone', lambda m: m.member_tp_number),
-        'account': ('Account Number', lambda m: m.member_acc_number or ""),
-        'guardian': ('Guardian Name', lambda m: m.member_guardian_name),
-        'role': ('Role', lambda m: m.get_member_role_display() if m.member_role else "No Role"),
-        'status': ('Status', lambda m: "Active" if m.member_is_active else "Inactive"),
-        'join_date': ('Join Date', lambda m: m.member_join_at.strftime("%d/%m/%Y") if m.member_join_at else "")
-    }
-    
-    # Default columns if none selected
-    if selected_columns is None:
-        selected_columns = list(column_map.keys())
-    
-    # Filter to only include valid columns
-    selected_columns = [col for col in selected_columns if col in column_map]
-    if not selected_columns:
-        selected_columns = list(column_map.keys())
-    
-    response = HttpResponse(content_type='application/ms-excel')
-    response['Content-Disposition'] = f'attachment; filename="{filename}"'
-    
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Members"
-    
-    # Build headers and data based on selected columns
-    headers = [column_map[col][0] for col in selected_columns]
-    ws.append(headers)
-    
-    for member in members:
-        row = [column_map[col][1](member) for col in selected_columns]
-        ws.append(row)
-    
-    style_excel_worksheet(ws, "Members")
-    wb.save(response)
-    return response
+    return export_queryset_excel(members, select_columns(MEMBER_COLUMNS, selected_columns), "Members", filename)
+
+
+def export_members_csv(members, filename=None, selected_columns=None):
+    """Export members to CSV with column selection"""
+    if filename is None:
+        filename = f"Members_Export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+    return export_queryset_csv(members, select_columns(MEMBER_COLUMNS, selected_columns), filename)
+
+
+PDF_DEFAULT_MEMBER_COLUMNS = ['member_id', 'first_name', 'last_name', 'telephone', 'role', 'status']
+
+
+def _pdf_chunks(rows, layout):
+    """Split rows into runs of PDF_PAGES_PER_CHUNK whole pages"""
+    size = layout.first_page_rows + (PDF_PAGES_PER_CHUNK - 1) * layout.page_rows
+    chunk = list(islice(rows, size))
+    yield chunk  # Always at least one chunk, so an empty export still gets its header
+    size = PDF_PAGES_PER_CHUNK * layout.page_rows
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _rendered_chunks(chunks, layout, workers):
+    """Partial PDFs in document order, rendered by up to workers processes"""
+    first = next(chunks)
+    second = next(chunks, None)
+    if workers <= 1 or second is None:
+        # A single chunk is not worth starting a pool for
+        yield render_pages(layout, first, True)
+        for chunk in [] if second is None else chain([second], chunks):
+            yield render_pages(layout, chunk, False)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # Only a few chunks in flight, so memory stays bounded however many rows there are
+        pending = deque()
+        for index, chunk in enumerate(chain([first, second], chunks)):
+            pending.append(pool.submit(render_pages, layout, chunk, index == 0))
+            if len(pending) >= workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def write_members_pdf(rows, headers, output, workers=1):
+    """
+    Write a members table to a PDF document.
+
+    Rows are laid out as one fixed-height table per page and rendered
+    PDF_PAGES_PER_CHUNK pages at a time; the partial PDFs are joined with
+    pypdf.
+
+    Chunks are rendered in-process unless workers > 1 and there is more than
+    one chunk. Only the export worker passes EXPORT_PDF_WORKERS, so web
+    requests never fork a process pool.
+
+    Args:
+        rows: Iterable of row value lists, e.g. from export_rows()
+        headers: Column headers
+        output: Binary file object to build the document into
+        workers: Number of rendering processes (default: 1)
+    """
+    rows = iter(rows)
+    sample = list(islice(rows, EXPORT_CHUNK_SIZE))
+    layout = plan_layout("Members Export Report", headers, sample)
+    rows = chain(sample, rows)
+
+    writer = PdfWriter()
+    for part in _rendered_chunks(_pdf_chunks(rows, layout), layout, workers):
+        writer.append(PdfReader(BytesIO(part)))
+    writer.write(output)
 
 
 def export_members_pdf(members, filename=None, selected_columns=None):
-    """Export members to PDF with column selection"""
+    """Export members to PDF with column selection (limited to 6 columns by default for readability)"""
     if filename is None:
         filename = f"Members_Export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
     
-    # Column mapping
-    column_map = {
-        'member_id': ('Member ID', lambda m: m.member_id),
-        'initials': ('Initials', lambda m: m.member_initials),
-        'first_name': ('First Name', lambda m: m.member_first_name),
-        'last_name': ('Last Name', lambda m: m.member_last_name),
-        'address': ('Address', lambda m: m.member_address),
-        'dob': ('Date of Birth', lambda m: m.member_dob.strftime("%d/%m/%Y") if m.member_dob else ""),
-        'telephone': ('Telephone', lambda m: m.member_tp_number),
-        'account': ('Account Number', lambda m: m.member_acc_number or ""),
-        'guardian': ('Guardian Name', lambda m: m.member_guardian_name),
-        'role': ('Role', lambda m: m.get_member_role_display() if m.member_role else "No Role"),
-        'status': ('Status', lambda m: "Active" if m.member_is_active else "Inactive"),
-        'join_date': ('Join Date', lambda m: m.member_join_at.strftime("%d/%m/%Y") if m.member_join_at else "")
-    }
-    
-    # Default columns if none selected (limit to 6 for PDF readability)
-    if selected_columns is None:
-        selected_columns = ['member_id', 'first_name', 'last_name', 'telephone', 'role', 'status']
+    selected_columns = [col for col in selected_columns or [] if col in MEMBER_COLUMNS]
+    columns = select_columns(MEMBER_COLUMNS, selected_columns or PDF_DEFAULT_MEMBER_COLUMNS)
     
-    # Filter to only include valid columns
-    selected_columns = [col for col in selected_columns if col in column_map]
-    if not selected_columns:
-        selected_columns = ['member_id', 'first_name', 'last_name', 'telephone', 'role', 'status']
-    
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="{filename}"'
-    
-    doc = SimpleDocTemplate(response, pagesize=A4)
-    elements = []
-    styles = getSampleStyleSheet()
-    
-    # Title
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=18,
-        textColor=colors.HexColor('#1f2937'),
-        spaceAfter=30,
-        alignment=1  # Center
-    )
-    title = Paragraph("Members Export Report", title_style)
-    elements.append(title)
-    elements.append(Spacer(1, 0.2*inch))
-    
-    # Build table data based on selected columns
-    headers = [column_map[col][0] for col in selected_columns]
-    data = [headers]
-    
-    for member in members:
-        row = [column_map[col][1](member) for col in selected_columns]
-        data.append(row)
-    
-    # Create table
-    table = Table(data, repeatRows=1)
-    table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#366092')),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 10),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#374151')),
-        ('TEXTCOLOR', (0, 1), (-1, -1), colors.whitesmoke),
-        ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#4b5563')),
-        ('FONTSIZE', (0, 1), (-1, -1), 9),
-    ]))
-    
-    elements.append(table)
-    doc.build(elements)
-    return response
+    output = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+    write_members_pdf(export_rows(members, columns), [header for header, _, _ in columns], output)
+    output.seek(0)
+    return FileResponse(output, as_attachment=True, filename=filename, content_type='application/pdf')
 
 
 def export_meetings_excel(meetings, filename=None):
     """Export meetings to Excel"""
     if filename is None:
         filename = f"Meetings_Export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-    
-    response = HttpResponse(content_type='application/ms-excel')
-    response['Content-Disposition'] = f'attachment; filename="{filename}"'
-    
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Meetings"
-    
-    headers = ["Meeting ID", "Date", "Fee", "Created At"]
-    ws.append(headers)
-    
-    for meeting in meetings:
-        ws.append([
-            meeting.meeting_id,
-            meeting.meeting_date.strftime("%d/%m/%Y") if meeting.meeting_date else "",
-            meeting.meeting_fee,
-            meeting.meeting_created_at.strftime("%d/%m/%Y %H:%M") if meeting.meeting_created_at else ""
-        ])
-    
-    style_excel_worksheet(ws, "Meetings")
-    wb.save(response)
-    return response
+    return export_queryset_excel(meetings, select_columns(MEETING_COLUMNS), "Meetings", filename)
+
+
+def export_meetings_csv(meetings, filename=None):
+    """Export meetings to CSV"""
+    if filename is None:
+        filename = f"Meetings_Export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+    return export_queryset_csv(meetings, select_columns(MEETING_COLUMNS), filename)
 
 
 def export_attendance_excel(attendances, filename=None):
     """Export attendance records to Excel"""
     if filename is None:
         filename = f"Attendance_Export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-    
-    response = HttpResponse(content_type='application/ms-excel')
-    response['Content-Disposition'] = f'attachment; filename="{filename}"'
-    
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Attendance"
-    
-    headers = ["Member ID", "Member Name", "Meeting Date", "Attendance", "Fee Paid"]
-    ws.append(headers)
-    
-    for attendance in attendances.select_related('member_id', 'meeting_date'):
-        member = attendance.member_id
-        full_name = f"{member.member_initials} {member.member_first_name} {member.member_last_name}"
-        meeting_date = attendance.meeting_date.meeting_date.strftime("%d/%m/%Y") if attendance.meeting_date.meeting_date else ""
-        attendance_status = "Present" if attendance.attendance_status else "Absent"
-        fee_status = "Paid" if attendance.attendance_fee_status else "Not Paid"
-        
-        ws.append([
-            member.member_id,
-            full_name,
-            meeting_date,
-            attendance_status,
-            fee_status
-        ])
-    
-    style_excel_worksheet(ws, "Attendance")
-    wb.save(response)
-    return response
+    return export_queryset_excel(attendances, select_columns(ATTENDANCE_COLUMNS), "Attendance", filename)
+
 
+def export_attendance_csv(attendances, filename=None):
+    """Export attendance records to CSV"""
+    if filename is None:
+        filename = f"Attendance_Export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+    return export_queryset_csv(attendances, select_columns(ATTENDANCE_COLUMNS), filename)
+
+
+def export_payments_excel(payments, filename=None):
+    """Export payments to Excel"""
+    if filename is None:
+        filename = f"Payments_Report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
+    return export_queryset_excel(payments, select_columns(PAYMENT_COLUMNS), "Payments", filename)
+
+
+def export_payments_csv(payments, filename=None):
+    """Export payments to CSV"""
+    if filename is None:
+        filename = f"Payments_Report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+    return export_queryset_csv(payments, select_columns(PAYMENT_COLUMNS), filename)
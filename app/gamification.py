@@ -3,7 +3,9 @@ Gamification System - Badge Awarding Logic
 Automatically awards badges to members based on their achievements
 """
 from django.db.models import Count, Q, Min
-from .models import Member, MemberBadge, MemberAttendance, MeetingInfo, BadgeType
+from .models import Member, MemberBadge, MemberAttendance, MeetingInfo, BadgeType, MemberAttendanceState
+from .member_state import get_member_state
+from .constants import MAIN_ROLES, SUB_ROLES
 from datetime import date, timedelta
 
 
@@ -12,179 +14,200 @@ def check_and_award_badges(member):
     Check if a member qualifies for any badges and award them
     Returns list of newly awarded badges
     """
-    newly_awarded = []
-    
     # Get member's existing badges
     existing_badges = set(MemberBadge.objects.filter(member=member).values_list('badge_type', flat=True))
+    state = get_member_state(member)
+    total_meetings = MeetingInfo.objects.count()
     
-    # 1. Check Attendance Badges
-    attendance_badges = check_attendance_badges(member, existing_badges)
-    newly_awarded.extend(attendance_badges)
-    
-    # 2. Check Payment Badges
-    payment_badges = check_payment_badges(member, existing_badges)
-    newly_awarded.extend(payment_badges)
-    
-    # 3. Check Membership Badges
-    membership_badges = check_membership_badges(member, existing_badges)
-    newly_awarded.extend(membership_badges)
+    newly_awarded = badges_due(member, state, existing_badges, total_meetings)
+    if newly_awarded:
+        MemberBadge.objects.bulk_create(newly_awarded, ignore_conflicts=True)
+    return newly_awarded
+
+
+def evaluate_badges(member_ids=None, batch_size=500):
+    """
+    Award every badge that active members qualify for, in batches.
+    
+    Reads the meeting count and the members with their attendance state once,
+    then per batch the members' existing badges and a single bulk insert,
+    however many members or badges are involved.
+    
+    Args:
+        member_ids: Members to evaluate (default: all active members)
+        batch_size: Members per batch
+        
+    Returns:
+        list: Newly awarded MemberBadge objects
+    """
+    total_meetings = MeetingInfo.objects.count()
+    members = Member.objects.filter(member_is_active=True).select_related('attendance_state').order_by('member_id')
+    if member_ids is not None:
+        members = members.filter(member_id__in=list(member_ids))
+    members = list(members)
     
-    # 4. Check Leadership Badges
-    leadership_badges = check_leadership_badges(member, existing_badges)
-    newly_awarded.extend(leadership_badges)
+    newly_awarded = []
+    for start in range(0, len(members), batch_size):
+        batch = members[start:start + batch_size]
+        existing = {}
+        badge_rows = MemberBadge.objects.filter(member__in=batch).values_list('member_id', 'badge_type')
+        for member_id, badge_type in badge_rows:
+            existing.setdefault(member_id, set()).add(badge_type)
+        
+        batch_awarded = []
+        for member in batch:
+            try:
+                state = member.attendance_state
+            except MemberAttendanceState.DoesNotExist:
+                state = MemberAttendanceState(member_id=member.member_id)
+            batch_awarded.extend(badges_due(member, state, existing.get(member.member_id, set()), total_meetings))
+        if batch_awarded:
+            MemberBadge.objects.bulk_create(batch_awarded, ignore_conflicts=True)
+        newly_awarded.extend(batch_awarded)
     
     return newly_awarded
 
 
-def check_attendance_badges(member, existing_badges):
-    """Check and award attendance-related badges"""
-    newly_awarded = []
+def badges_due(member, state, existing_badges, total_meetings):
+    """
+    Badges a member qualifies for but does not have yet (unsaved)
     
-    # Get all attendance records for the member
-    attendances = MemberAttendance.objects.filter(member_id=member)
-    total_meetings = MeetingInfo.objects.count()
-    member_attendances = attendances.filter(attendance_status=True)
+    Args:
+        member: Member object
+        state: The member's MemberAttendanceState
+        existing_badges: Set of badge types the member already has
+        total_meetings: Number of meetings held
+    """
+    return (
+        check_attendance_badges(member, existing_badges, state, total_meetings)
+        + check_payment_badges(member, existing_badges, state)
+        + check_membership_badges(member, existing_badges)
+        + check_leadership_badges(member, existing_badges)
+    )
+
+
+def check_attendance_badges(member, existing_badges, state, total_meetings):
+    """Attendance-related badges the member now qualifies for"""
+    newly_awarded = []
     
     # Perfect Attendance - attended all meetings
     if BadgeType.PERFECT_ATTENDANCE not in existing_badges:
-        if total_meetings > 0 and member_attendances.count() == total_meetings:
-            badge = MemberBadge.objects.create(
+        if total_meetings > 0 and state.attended_count == total_meetings:
+            newly_awarded.append(MemberBadge(
                 member=member,
                 badge_type=BadgeType.PERFECT_ATTENDANCE,
                 description=f"Attended all {total_meetings} meetings"
-            )
-            newly_awarded.append(badge)
+            ))
     
     # Attendance Streaks
     if BadgeType.ATTENDANCE_STREAK_10 not in existing_badges:
-        if check_attendance_streak(member, 10):
-            badge = MemberBadge.objects.create(
+        if state.current_streak >= 10:
+            newly_awarded.append(MemberBadge(
                 member=member,
                 badge_type=BadgeType.ATTENDANCE_STREAK_10,
                 description="Attended 10 consecutive meetings"
-            )
-            newly_awarded.append(badge)
+            ))
     elif BadgeType.ATTENDANCE_STREAK_5 not in existing_badges:
-        if check_attendance_streak(member, 5):
-            badge = MemberBadge.objects.create(
+        if state.current_streak >= 5:
+            newly_awarded.append(MemberBadge(
                 member=member,
                 badge_type=BadgeType.ATTENDANCE_STREAK_5,
                 description="Attended 5 consecutive meetings"
-            )
-            newly_awarded.append(badge)
+            ))
     
     return newly_awarded
 
 
 def check_attendance_streak(member, streak_length):
-    """Check if member has a consecutive attendance streak"""
-    meetings = MeetingInfo.objects.order_by('-meeting_date')[:streak_length]
-    if meetings.count() < streak_length:
-        return False
-    
-    attendances = MemberAttendance.objects.filter(
-        member_id=member,
-        meeting_date__in=meetings,
-        attendance_status=True
-    ).values_list('meeting_date_id', flat=True)
-    
-    return len(attendances) == streak_length
+    """Check if member attended each of the latest streak_length meetings"""
+    return get_member_state(member).current_streak >= streak_length
 
 
-def check_payment_badges(member, existing_badges):
-    """Check and award payment-related badges"""
+def check_payment_badges(member, existing_badges, state):
+    """Payment-related badges the member now qualifies for"""
     newly_awarded = []
     
-    attendances = MemberAttendance.objects.filter(member_id=member)
-    total_paid = attendances.filter(attendance_fee_status=True).count()
-    total_attended = attendances.filter(attendance_status=True).count()
+    total_paid = state.paid_count
+    total_attended = state.attended_count
     
     # Always Paid - paid fees for all attended meetings
     if BadgeType.ALWAYS_PAID not in existing_badges:
         if total_attended > 0 and total_paid == total_attended:
-            badge = MemberBadge.objects.create(
+            newly_awarded.append(MemberBadge(
                 member=member,
                 badge_type=BadgeType.ALWAYS_PAID,
                 description="Paid fees for all attended meetings"
-            )
-            newly_awarded.append(badge)
+            ))
     
     # Payment Champion - paid fees for 20+ meetings
     if BadgeType.PAYMENT_CHAMPION not in existing_badges:
         if total_paid >= 20:
-            badge = MemberBadge.objects.create(
+            newly_awarded.append(MemberBadge(
                 member=member,
                 badge_type=BadgeType.PAYMENT_CHAMPION,
                 description=f"Paid fees for {total_paid} meetings"
-            )
-            newly_awarded.append(badge)
+            ))
     
     return newly_awarded
 
 
 def check_membership_badges(member, existing_badges):
-    """Check and award membership-related badges"""
+    """Membership-related badges the member now qualifies for"""
     newly_awarded = []
     
     # Founding Member - joined in the first year (2023)
     if BadgeType.FOUNDING_MEMBER not in existing_badges:
         if member.member_join_at and member.member_join_at.year == 2023:
-            badge = MemberBadge.objects.create(
+            newly_awarded.append(MemberBadge(
                 member=member,
                 badge_type=BadgeType.FOUNDING_MEMBER,
                 description="One of the founding members"
-            )
-            newly_awarded.append(badge)
+            ))
     
     # Veteran Member - member for 2+ years
     if BadgeType.VETERAN_MEMBER not in existing_badges:
         if member.member_join_at:
             years_as_member = (date.today() - member.member_join_at).days / 365.25
             if years_as_member >= 2:
-                badge = MemberBadge.objects.create(
+                newly_awarded.append(MemberBadge(
                     member=member,
                     badge_type=BadgeType.VETERAN_MEMBER,
                     description=f"Member for {int(years_as_member)} years"
-                )
-                newly_awarded.append(badge)
+                ))
     
     # Active Member - currently active
     if BadgeType.ACTIVE_MEMBER not in existing_badges:
         if member.member_is_active:
-            badge = MemberBadge.objects.create(
+            newly_awarded.append(MemberBadge(
                 member=member,
                 badge_type=BadgeType.ACTIVE_MEMBER,
                 description="Active member"
-            )
-            newly_awarded.append(badge)
+            ))
     
     return newly_awarded
 
 
 def check_leadership_badges(member, existing_badges):
-    """Check and award leadership-related badges"""
+    """Leadership-related badges the member now qualifies for"""
     newly_awarded = []
     
     # Leader - has a main or vice role
     if BadgeType.LEADER not in existing_badges:
-        from .constants import MAIN_ROLES, SUB_ROLES
         if member.member_role in MAIN_ROLES + SUB_ROLES:
-            badge = MemberBadge.objects.create(
+            newly_awarded.append(MemberBadge(
                 member=member,
                 badge_type=BadgeType.LEADER,
                 description=f"Leadership role: {member.get_member_role_display()}"
-            )
-            newly_awarded.append(badge)
+            ))
     
     # Committee - is a committee member
     if BadgeType.COMMITTEE not in existing_badges:
         if member.member_role == 'COMMITTEE_MEMBER':
-            badge = MemberBadge.objects.create(
+            newly_awarded.append(MemberBadge(
                 member=member,
                 badge_type=BadgeType.COMMITTEE,
                 description="Committee member"
-            )
-            newly_awarded.append(badge)
+            ))
     
     return newly_awarded
 
@@ -0,0 +1,74 @@
+"""
+Time the members PDF export at different sizes
+"""
+import time
+from io import BytesIO
+from reportlab.platypus import Table
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from app.export_utils import write_members_pdf
+from app.pdf_render import TABLE_STYLE, new_document, title_flowables
+
+
+HEADERS = ['Member ID', 'First Name', 'Last Name', 'Telephone', 'Role', 'Status']
+
+
+def synthetic_rows(count):
+    return [
+        [f'M{i:06d}', f'First{i % 997}', f'Last{i % 991}', f'07{i % 100000000:08d}', 'Committee Member', 'Active']
+        for i in range(count)
+    ]
+
+
+def single_table_pdf(rows, output):
+    """The previous renderer: every row in one Table, one doc.build"""
+    table = Table([HEADERS] + rows, repeatRows=1)
+    table.setStyle(TABLE_STYLE)
+    new_document(output).build(title_flowables("Members Export Report") + [table])
+
+
+class Command(BaseCommand):
+    help = 'Benchmark members PDF rendering (single table vs chunked vs parallel) on synthetic rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows',
+            type=int,
+            nargs='+',
+            default=[1000, 10000, 50000],
+            help='Row counts to benchmark (default: 1000 10000 50000)',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=settings.EXPORT_PDF_WORKERS,
+            help='Processes for the parallel run (default: EXPORT_PDF_WORKERS)',
+        )
+        parser.add_argument(
+            '--single-table-max',
+            type=int,
+            default=10000,
+            help='Skip the single-table renderer above this many rows - it grows quadratically (default: 10000)',
+        )
+
+    def run(self, render):
+        output = BytesIO()
+        started = time.perf_counter()
+        render(output)
+        return time.perf_counter() - started, len(output.getvalue())
+
+    def handle(self, *args, **options):
+        workers = options['workers']
+
+        self.stdout.write(f'{"Rows":>8}  {"Renderer":<22}{"Seconds":>10}{"Size (KB)":>12}')
+        for count in options['rows']:
+            rows = synthetic_rows(count)
+            runs = [('chunked, 1 process', lambda output: write_members_pdf(rows, HEADERS, output, workers=1))]
+            if workers > 1:
+                runs.append((f'chunked, {workers} processes', lambda output: write_members_pdf(rows, HEADERS, output, workers=workers)))
+            if count <= options['single_table_max']:
+                runs.insert(0, ('single table', lambda output: single_table_pdf(rows, output)))
+
+            for name, render in runs:
+                seconds, size = self.run(render)
+                self.stdout.write(f'{count:>8}  {name:<22}{seconds:>10.2f}{size / 1024:>12.0f}')
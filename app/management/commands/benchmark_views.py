@@ -0,0 +1,265 @@
+"""
+Benchmark key views through the Django test client
+"""
+import json
+import logging
+import math
+import os
+import platform
+import time
+import tracemalloc
+from collections import namedtuple
+from datetime import date
+import django
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from app.models import Member, MeetingInfo, MemberAttendance, Payment
+
+
+DEFAULT_BASELINE = os.path.join(settings.BASE_DIR, 'benchmarks', 'baseline.json')
+BENCHMARK_USERNAME = 'benchmark'
+
+Scenario = namedtuple('Scenario', ['name', 'method', 'url', 'data'])
+
+
+def build_scenarios(bulk_size):
+    """
+    Requests to time, against the latest meeting and the first active members.
+
+    bulk_mark_submit re-posts the current statuses of `bulk_size` members, so
+    after the first run (which adds absent rows for members without one) it
+    changes nothing.
+    """
+    meeting = MeetingInfo.objects.order_by('-meeting_date', '-meeting_id').first()
+    if meeting is None:
+        raise CommandError('No meetings found - seed some data first (manage.py seed_club).')
+    today = date.today()
+    members = list(Member.objects.filter(member_is_active=True).order_by('member_id').values_list('member_id', flat=True)[:bulk_size])
+    statuses = dict(
+        MemberAttendance.objects.filter(meeting_date=meeting, member_id__in=members)
+        .values_list('member_id', 'attendance_status')
+    )
+    paid = set(
+        MemberAttendance.objects.filter(meeting_date=meeting, member_id__in=members, attendance_fee_status=True)
+        .values_list('member_id', flat=True)
+    )
+    bulk_url = f"{reverse('attendance_bulk_mark')}?meeting_id={meeting.meeting_id}"
+
+    return [
+        Scenario('dashboard', 'GET', reverse('dashboard'), {}),
+        Scenario('member_list', 'GET', reverse('member_list'), {}),
+        Scenario('bulk_mark', 'GET', bulk_url, {}),
+        Scenario('bulk_mark_submit', 'POST', bulk_url, {
+            'member_ids': members,
+            'attendance_status': [str(statuses.get(member_id, False)) for member_id in members],
+            'fee_status': [str(member_id in paid) for member_id in members],
+        }),
+        Scenario('heatmap', 'GET', reverse('attendance_heatmap'), {'year': meeting.meeting_date.year}),
+        Scenario('calendar', 'GET', reverse('calendar_view'), {'year': today.year, 'month': today.month}),
+        Scenario('payment_statistics', 'GET', reverse('payment_statistics'), {'year': today.year}),
+        Scenario('export_members_csv', 'POST', reverse('member_info_export'), {'format': 'csv', 'is_adults': 'true'}),
+        Scenario('export_attendance_csv', 'GET', reverse('export_attendance_report', args=[meeting.meeting_id]), {'format': 'csv'}),
+    ]
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a non-empty list"""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+def request(client, scenario):
+    """
+    Make one request and read the whole body.
+
+    Returns:
+        tuple: (seconds, status code, queries)
+    """
+    started = time.perf_counter()
+    if scenario.method == 'POST':
+        response = client.post(scenario.url, scenario.data)
+    else:
+        response = client.get(scenario.url, scenario.data)
+    if response.streaming:
+        for _chunk in response.streaming_content:
+            pass
+    else:
+        response.content
+    seconds = time.perf_counter() - started
+    metrics = getattr(response.wsgi_request, 'metrics', None)
+    return seconds, response.status_code, metrics.db_queries if metrics else None
+
+
+def compare(report, baseline, tolerance):
+    """
+    Compare a report with a baseline report.
+
+    Returns:
+        dict: {view name: list of regression messages}, views missing from the baseline are skipped
+    """
+    regressions = {}
+    for name, result in report['views'].items():
+        previous = baseline.get('views', {}).get(name)
+        if previous is None:
+            continue
+        problems = []
+        if result['p95_ms'] > previous['p95_ms'] * (1 + tolerance):
+            problems.append(f"p95 {previous['p95_ms']:.1f} -> {result['p95_ms']:.1f} ms")
+        if previous['queries'] is not None and result['queries'] is not None and result['queries'] > previous['queries']:
+            problems.append(f"queries {previous['queries']} -> {result['queries']}")
+        if problems:
+            regressions[name] = problems
+    return regressions
+
+
+class Command(BaseCommand):
+    help = (
+        'Time key views (p50/p95 latency, queries, peak memory) and compare them with a stored baseline. '
+        'It posts attendance and creates (then deletes) a temporary superuser, so it only runs on a database '
+        'with seed_club data (members with --prefix) unless --allow-writes is given.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--view', action='append', dest='views', help='Only run this scenario (can be given multiple times)')
+        parser.add_argument('--repeat', type=int, default=20, help='Timed requests per view (default: 20)')
+        parser.add_argument('--warmup', type=int, default=2, help='Untimed requests per view first (default: 2)')
+        parser.add_argument('--bulk-size', type=int, default=200, help='Members in the bulk mark submission (default: 200)')
+        parser.add_argument('--output', default='benchmark_report.json', help='Where to write the JSON report (default: benchmark_report.json)')
+        parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='Baseline report to compare with (default: benchmarks/baseline.json)')
+        parser.add_argument('--save-baseline', action='store_true', help='Also write this report as the new baseline')
+        parser.add_argument('--tolerance', type=float, default=0.2, help='Allowed p95 slowdown against the baseline (default: 0.2 = 20%%)')
+        parser.add_argument('--fail-on-regression', action='store_true', help='Exit with an error if any view regressed')
+        parser.add_argument('--prefix', default='S', help='Member ID prefix of the seed_club data to look for (default: S)')
+        parser.add_argument(
+            '--allow-writes',
+            action='store_true',
+            help='Run without seed_club data, e.g. on a copy of real data (attendance is posted and a temporary user is added)',
+        )
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 1:
+            raise CommandError('--repeat must be at least 1.')
+        if not options['allow_writes'] and not Member.objects.filter(member_id__startswith=options['prefix']).exists():
+            raise CommandError(
+                f'No seeded members (prefix "{options["prefix"]}") found. The benchmark writes to the database - '
+                'run it on seed_club data or pass --allow-writes.'
+            )
+        scenarios = build_scenarios(options['bulk_size'])
+        if options['views']:
+            unknown = set(options['views']) - {scenario.name for scenario in scenarios}
+            if unknown:
+                raise CommandError(f'Unknown view(s): {", ".join(sorted(unknown))}')
+            scenarios = [scenario for scenario in scenarios if scenario.name in options['views']]
+
+        user, created = User.objects.get_or_create(username=BENCHMARK_USERNAME, defaults={'is_superuser': True, 'is_staff': True})
+        if created:
+            user.set_unusable_password()
+            user.save()
+
+        # Rate limits would block repeated posts; request audit records would drown the output
+        audit_logger = logging.getLogger('audit')
+        audit_level = audit_logger.level
+        audit_logger.setLevel(logging.WARNING)
+        try:
+            with override_settings(
+                RATE_LIMITS=[],
+                REQUEST_METRICS_ENABLED=True,
+                ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'],
+            ):
+                client = Client()
+                client.force_login(user)
+                views = {scenario.name: self.run_scenario(client, scenario, options) for scenario in scenarios}
+        finally:
+            audit_logger.setLevel(audit_level)
+            if created:
+                user.delete()
+
+        report = {
+            'generated_at': timezone.now().isoformat(),
+            'environment': {
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'database': connection.vendor,
+            },
+            'data': {
+                'members': Member.objects.count(),
+                'meetings': MeetingInfo.objects.count(),
+                'attendance': MemberAttendance.objects.count(),
+                'payments': Payment.objects.count(),
+            },
+            'repeat': options['repeat'],
+            'views': views,
+        }
+
+        baseline = None
+        if os.path.exists(options['baseline']) and not options['save_baseline']:
+            with open(options['baseline']) as f:
+                baseline = json.load(f)
+        regressions = compare(report, baseline, options['tolerance']) if baseline else {}
+        if baseline:
+            report['baseline'] = {'path': options['baseline'], 'generated_at': baseline.get('generated_at'), 'regressions': regressions}
+
+        self.write_table(views, baseline)
+        self.write_json(options['output'], report)
+        self.stdout.write(f"Report written to {options['output']}")
+        if options['save_baseline']:
+            self.write_json(options['baseline'], report)
+            self.stdout.write(self.style.SUCCESS(f"Baseline saved to {options['baseline']}"))
+
+        for name, problems in regressions.items():
+            self.stdout.write(self.style.WARNING(f'{name}: {", ".join(problems)}'))
+        if regressions and options['fail_on_regression']:
+            raise CommandError(f'{len(regressions)} view{"" if len(regressions) == 1 else "s"} regressed against the baseline.')
+
+    def run_scenario(self, client, scenario, options):
+        for _ in range(options['warmup']):
+            request(client, scenario)
+
+        timings, queries, statuses = [], [], set()
+        for _ in range(options['repeat']):
+            seconds, status, query_count = request(client, scenario)
+            timings.append(seconds * 1000)
+            if query_count is not None:
+                queries.append(query_count)
+            statuses.add(status)
+
+        # Peak memory in a separate run - tracing slows every allocation down
+        tracemalloc.start()
+        try:
+            request(client, scenario)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+        return {
+            'p50_ms': round(percentile(timings, 50), 2),
+            'p95_ms': round(percentile(timings, 95), 2),
+            'mean_ms': round(sum(timings) / len(timings), 2),
+            'queries': max(queries) if queries else None,
+            'peak_memory_kb': round(peak / 1024),
+            'status_codes': sorted(statuses),
+        }
+
+    def write_table(self, views, baseline):
+        previous = baseline.get('views', {}) if baseline else {}
+        self.stdout.write(f'{"View":<24}{"p50 ms":>10}{"p95 ms":>10}{"Queries":>9}{"Peak KB":>10}{"Status":>9}  Baseline p95')
+        for name, result in views.items():
+            before = previous.get(name)
+            change = f"{(result['p95_ms'] / before['p95_ms'] - 1) * 100:+.0f}%" if before and before['p95_ms'] else '-'
+            status = ','.join(str(code) for code in result['status_codes'])
+            self.stdout.write(
+                f"{name:<24}{result['p50_ms']:>10.1f}{result['p95_ms']:>10.1f}{str(result['queries']):>9}"
+                f"{result['peak_memory_kb']:>10}{status:>9}  {change}"
+            )
+
+    def write_json(self, path, data):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(data, f, indent=2)
@@ -0,0 +1,45 @@
+"""
+Rebuild or verify per-meeting attendance summaries
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from app.meeting_summary import rebuild_meeting_summaries, verify_meeting_summaries
+
+
+class Command(BaseCommand):
+    help = 'Recount MeetingSummary rows from MemberAttendance, or verify them with --verify'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--meeting',
+            type=int,
+            action='append',
+            dest='meeting_ids',
+            help='Only process this meeting ID (can be given multiple times)',
+        )
+        parser.add_argument(
+            '--verify',
+            action='store_true',
+            help='Report summaries that differ from a fresh count without changing anything',
+        )
+
+    def handle(self, *args, **options):
+        meeting_ids = options['meeting_ids']
+
+        if options['verify']:
+            mismatches = verify_meeting_summaries(meeting_ids)
+            if not mismatches:
+                self.stdout.write(self.style.SUCCESS('All meeting summaries match attendance records.'))
+                return
+            for meeting_id, actual, expected in mismatches:
+                self.stdout.write(self.style.WARNING(
+                    f'Meeting {meeting_id}: stored {actual if actual else "missing"}, expected {expected}'
+                ))
+            raise CommandError(
+                f'{len(mismatches)} meeting summar{"y" if len(mismatches) == 1 else "ies"} out of date. '
+                'Run without --verify to rebuild.'
+            )
+
+        with transaction.atomic():
+            count = rebuild_meeting_summaries(meeting_ids)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {count} meeting summaries.'))
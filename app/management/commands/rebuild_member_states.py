@@ -0,0 +1,44 @@
+"""
+Rebuild or verify per-member rolling attendance state
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from app.member_state import rebuild_member_states, verify_member_states
+
+
+class Command(BaseCommand):
+    help = 'Recompute MemberAttendanceState rows from attendance history, or verify them with --verify'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--member',
+            action='append',
+            dest='member_ids',
+            help='Only process this member ID (can be given multiple times)',
+        )
+        parser.add_argument(
+            '--verify',
+            action='store_true',
+            help='Report states that differ from a fresh walk without changing anything',
+        )
+
+    def handle(self, *args, **options):
+        member_ids = options['member_ids']
+
+        if options['verify']:
+            mismatches = verify_member_states(member_ids)
+            if not mismatches:
+                self.stdout.write(self.style.SUCCESS('All member states match attendance records.'))
+                return
+            for member_id, actual, expected in mismatches:
+                self.stdout.write(self.style.WARNING(
+                    f'Member {member_id}: stored {actual if actual else "missing"}, expected {expected}'
+                ))
+            raise CommandError(
+                f'{len(mismatches)} member state{"" if len(mismatches) == 1 else "s"} out of date. '
+                'Run without --verify to rebuild.'
+            )
+
+        with transaction.atomic():
+            count = rebuild_member_states(member_ids)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {count} member states.'))
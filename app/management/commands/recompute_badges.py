@@ -0,0 +1,24 @@
+"""
+Award any badges members qualify for but do not have yet
+"""
+from django.core.management.base import BaseCommand
+from app.gamification import evaluate_badges
+
+
+class Command(BaseCommand):
+    help = 'Evaluate badge eligibility for active members and award missing badges in bulk'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--member',
+            action='append',
+            dest='member_ids',
+            help='Only evaluate this member ID (can be given multiple times)',
+        )
+
+    def handle(self, *args, **options):
+        awarded = evaluate_badges(options['member_ids'])
+        member_count = len({badge.member_id for badge in awarded})
+        self.stdout.write(self.style.SUCCESS(
+            f'Awarded {len(awarded)} new badges to {member_count} members.'
+        ))
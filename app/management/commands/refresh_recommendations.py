@@ -0,0 +1,28 @@
+"""
+Recompute the cached dashboard recommendations
+"""
+from django.core.management.base import BaseCommand, CommandError
+from app.recommendations import PROVIDERS, refresh_provider
+
+
+class Command(BaseCommand):
+    help = 'Recompute recommendation providers into the shared cache (e.g. from cron, so dashboards never wait for them)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--provider',
+            action='append',
+            dest='providers',
+            help=f'Only refresh this provider (can be given multiple times): {", ".join(PROVIDERS)}',
+        )
+
+    def handle(self, *args, **options):
+        names = options['providers'] or list(PROVIDERS)
+        unknown = set(names) - set(PROVIDERS)
+        if unknown:
+            raise CommandError(f'Unknown provider(s): {", ".join(sorted(unknown))}')
+
+        failed = [name for name in names if refresh_provider(PROVIDERS[name]) is None]
+        if failed:
+            raise CommandError(f'Provider(s) failed: {", ".join(failed)}')
+        self.stdout.write(self.style.SUCCESS(f'Refreshed {len(names)} recommendation providers.'))
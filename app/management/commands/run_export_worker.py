@@ -0,0 +1,64 @@
+"""
+Generate queued report exports outside the web workers
+"""
+import signal
+import time
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from app.export_jobs import cleanup_expired_jobs, process_jobs
+
+
+class Command(BaseCommand):
+    help = 'Poll the ExportJob table, generate queued exports into MEDIA_ROOT/exports/ and remove expired ones'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Run the queued jobs and cleanup once, then exit (for cron)',
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=5.0,
+            help='Seconds to wait between polls when the queue is empty (default: 5)',
+        )
+        parser.add_argument(
+            '--cleanup-interval',
+            type=float,
+            default=600.0,
+            help='Seconds between expired-export cleanups (default: 600)',
+        )
+
+    def handle(self, *args, **options):
+        self.stopping = False
+        if not options['once']:
+            signal.signal(signal.SIGTERM, self.stop)
+            signal.signal(signal.SIGINT, self.stop)
+
+        last_cleanup = None
+        while True:
+            # The worker runs for days; drop connections MySQL may have timed out
+            close_old_connections()
+
+            if last_cleanup is None or time.monotonic() - last_cleanup >= options['cleanup_interval']:
+                removed = cleanup_expired_jobs()
+                if removed:
+                    self.stdout.write(f'Removed {removed} expired export{"" if removed == 1 else "s"}.')
+                last_cleanup = time.monotonic()
+
+            # One job per pass so a stop request is honoured between jobs
+            ran = process_jobs(limit=None if options['once'] else 1)
+            if ran:
+                self.stdout.write(self.style.SUCCESS(f'Finished {ran} export job{"" if ran == 1 else "s"}.'))
+
+            if options['once'] or self.stopping:
+                break
+            if not ran:
+                time.sleep(options['poll_interval'])
+            if self.stopping:
+                break
+
+    def stop(self, signum, frame):
+        self.stdout.write('Stopping after the current job...')
+        self.stopping = True
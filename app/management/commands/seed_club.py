@@ -0,0 +1,139 @@
+"""
+Seed a synthetic club for load testing and benchmarks
+"""
+import random
+import time
+from datetime import date, datetime, time as dt_time, timedelta
+from decimal import Decimal
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+from app.meeting_summary import rebuild_meeting_summaries
+from app.member_ledger import rebuild_ledgers
+from app.member_state import rebuild_member_states
+from app.models import Member, MeetingInfo, MemberAttendance, MemberRole, Payment
+
+
+FIRST_NAMES = ['Amal', 'Kamal', 'Nimal', 'Sunil', 'Chathura', 'Dilani', 'Kumari', 'Ishara', 'Ruwan', 'Sanduni']
+LAST_NAMES = ['Perera', 'Fernando', 'Silva', 'Jayasinghe', 'Bandara', 'Wijesinghe', 'Dissanayake', 'Herath']
+TOWNS = ['Colombo', 'Kandy', 'Galle', 'Matara', 'Kurunegala', 'Negombo', 'Jaffna', 'Badulla']
+
+
+class Command(BaseCommand):
+    help = 'Create synthetic members, meetings, attendance and payments with bulk_create (for benchmarks, not production)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--members', type=int, default=20000, help='Members to create (default: 20000)')
+        parser.add_argument('--meetings', type=int, default=500, help='Weekly meetings up to today (default: 500)')
+        parser.add_argument(
+            '--attendance',
+            type=int,
+            default=5000000,
+            help='Attendance rows, spread evenly over the meetings (default: 5000000, at most members x meetings)',
+        )
+        parser.add_argument('--present-rate', type=float, default=0.8, help='Share of attendance rows marked present (default: 0.8)')
+        parser.add_argument('--paid-rate', type=float, default=0.7, help='Share of present rows with the fee paid (default: 0.7)')
+        parser.add_argument('--payment-rate', type=float, default=0.1, help='Share of paid rows that also have a Payment (default: 0.1)')
+        parser.add_argument('--prefix', default='S', help='Member ID prefix, so seeded members are easy to tell apart (default: S)')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows per INSERT (default: 5000)')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed, for repeatable data (default: 42)')
+        parser.add_argument(
+            '--skip-derived',
+            action='store_true',
+            help='Do not rebuild meeting summaries, member states and ledgers afterwards',
+        )
+
+    def handle(self, *args, **options):
+        members, meetings = options['members'], options['meetings']
+        prefix, batch_size = options['prefix'], options['batch_size']
+        if members < 1 or meetings < 1:
+            raise CommandError('--members and --meetings must be at least 1.')
+        if len(prefix) + len(str(members - 1)) > Member._meta.get_field('member_id').max_length:
+            raise CommandError('Member IDs would be too long - use a shorter --prefix.')
+        if Member.objects.filter(member_id__startswith=prefix).exists():
+            raise CommandError(f'Members with the prefix "{prefix}" already exist - use another --prefix or an empty database.')
+        rows_per_meeting = min(members, options['attendance'] // meetings)
+        rng = random.Random(options['seed'])
+        started = time.perf_counter()
+
+        # 1. Members
+        width = len(str(members - 1))
+        member_ids = [f'{prefix}{i:0{width}d}' for i in range(members)]
+        today = date.today()
+        for start in range(0, members, batch_size):
+            Member.objects.bulk_create([
+                Member(
+                    member_id=member_id,
+                    member_initials=rng.choice('ABCDEFGHJKLMNPRSTW'),
+                    member_first_name=rng.choice(FIRST_NAMES),
+                    member_last_name=rng.choice(LAST_NAMES),
+                    member_address=rng.choice(TOWNS),
+                    member_dob=today - timedelta(days=rng.randint(6 * 365, 70 * 365)),
+                    member_tp_number=f'07{rng.randint(0, 99999999):08d}',
+                    member_acc_number=f'{rng.randint(0, 9999999999):010d}',
+                    member_guardian_name=f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}',
+                    member_is_active=rng.random() < 0.9,
+                    # Unique roles are left out - only one member may hold each
+                    member_role=MemberRole.COMMITTEE_MEMBER if rng.random() < 0.02 else MemberRole.NONE,
+                )
+                for member_id in member_ids[start:start + batch_size]
+            ], batch_size=batch_size)
+        self.stdout.write(f'Created {members} members ({time.perf_counter() - started:.1f}s)')
+
+        # 2. Meetings, weekly up to today
+        first_date = today - timedelta(weeks=meetings - 1)
+        last_meeting_id = MeetingInfo.objects.aggregate(last=Max('meeting_id'))['last'] or 0
+        meeting_objects = MeetingInfo.objects.bulk_create([
+            MeetingInfo(meeting_date=first_date + timedelta(weeks=i), meeting_fee=rng.choice([50, 100, 150, 200]))
+            for i in range(meetings)
+        ], batch_size=batch_size)
+        if meeting_objects[0].pk is None:
+            # Backends that do not return primary keys from bulk_create (MySQL)
+            meeting_objects = list(MeetingInfo.objects.filter(meeting_id__gt=last_meeting_id).order_by('meeting_id'))
+        self.stdout.write(f'Created {meetings} meetings ({time.perf_counter() - started:.1f}s)')
+
+        # 3. Attendance and payments, one transaction per meeting
+        attendance_count = payment_count = 0
+        for meeting in meeting_objects:
+            attendance = []
+            payments = []
+            for member_id in rng.sample(member_ids, rows_per_meeting):
+                present = rng.random() < options['present_rate']
+                paid = present and rng.random() < options['paid_rate']
+                attendance.append(MemberAttendance(
+                    meeting_date_id=meeting.pk,
+                    member_id_id=member_id,
+                    attendance_status=present,
+                    attendance_fee_status=paid,
+                ))
+                if paid and rng.random() < options['payment_rate']:
+                    payments.append(Payment(
+                        member_id=member_id,
+                        meeting_id=meeting.pk,
+                        amount=Decimal(meeting.meeting_fee),
+                        payment_method=rng.choice(['CASH', 'CASH', 'BANK', 'CARD']),
+                    ))
+            with transaction.atomic():
+                MemberAttendance.objects.bulk_create(attendance, batch_size=batch_size)
+                if payments:
+                    Payment.objects.bulk_create(payments, batch_size=batch_size)
+                    # payment_date is auto_now_add - date the payments on the meeting day instead
+                    Payment.objects.filter(meeting_id=meeting.pk).update(
+                        payment_date=timezone.make_aware(datetime.combine(meeting.meeting_date, dt_time(18)))
+                    )
+            attendance_count += len(attendance)
+            payment_count += len(payments)
+        self.stdout.write(
+            f'Created {attendance_count} attendance rows and {payment_count} payments ({time.perf_counter() - started:.1f}s)'
+        )
+
+        # 4. bulk_create skips post_save - rebuild the derived tables once
+        if not options['skip_derived']:
+            with transaction.atomic():
+                rebuild_meeting_summaries([meeting.pk for meeting in meeting_objects])
+                rebuild_member_states()
+                rebuild_ledgers()
+            self.stdout.write(f'Rebuilt meeting summaries, member states and ledgers ({time.perf_counter() - started:.1f}s)')
+
+        self.stdout.write(self.style.SUCCESS(f'Seeded a synthetic club in {time.perf_counter() - started:.1f}s.'))
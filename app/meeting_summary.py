@@ -0,0 +1,179 @@
+"""
+Per-meeting attendance summaries
+Keeps MeetingSummary counters in step with MemberAttendance so per-meeting
+statistics are a primary-key read instead of a COUNT over attendance rows
+"""
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from .models import MeetingInfo, MeetingSummary
+
+
+SUMMARY_COUNTER_FIELDS = ['total_count', 'present_count', 'paid_count', 'unpaid_present_count', 'fee_revenue']
+
+
+def _counter_values(present, paid):
+    """Contribution of a single attendance row to each counter"""
+    return {
+        'total_count': 1,
+        'present_count': 1 if present else 0,
+        'paid_count': 1 if paid else 0,
+        'unpaid_present_count': 1 if present and not paid else 0,
+    }
+
+
+def _apply_delta(meeting_id, delta):
+    """
+    Add delta to a meeting's counters in a single UPDATE.
+
+    Returns:
+        int: Number of summary rows updated (0 if the summary is missing)
+    """
+    if not any(delta.values()):
+        return 1
+    fee = Subquery(MeetingInfo.objects.filter(meeting_id=OuterRef('meeting_id')).values('meeting_fee')[:1])
+    updates = {name: F(name) + value for name, value in delta.items() if value}
+    if delta['paid_count']:
+        # Only reference fee_revenue itself: MySQL evaluates SET clauses left to right
+        updates['fee_revenue'] = F('fee_revenue') + delta['paid_count'] * fee
+    return MeetingSummary.objects.filter(meeting_id=meeting_id).update(**updates)
+
+
+def _adjust(state, sign, delta_by_meeting):
+    meeting_id, _, present, paid = state
+    delta = delta_by_meeting.setdefault(meeting_id, dict.fromkeys(_counter_values(False, False), 0))
+    for name, value in _counter_values(present, paid).items():
+        delta[name] += sign * value
+
+
+def record_attendance_saved(previous, current, created):
+    """
+    Apply the change made by saving one attendance row.
+
+    Called from post_save inside the save transaction.
+
+    Args:
+        previous: counted_state() as loaded from the database, or None if unknown
+        current: counted_state() as saved
+        created: True if the row was inserted
+    """
+    if not created and previous is None:
+        # Saved without the original values being loaded - recount the meeting
+        rebuild_meeting_summaries([current[0]])
+        return
+
+    delta_by_meeting = {}
+    if previous is not None:
+        _adjust(previous, -1, delta_by_meeting)
+    _adjust(current, 1, delta_by_meeting)
+    for meeting_id, delta in delta_by_meeting.items():
+        if not _apply_delta(meeting_id, delta):
+            rebuild_meeting_summaries([meeting_id])
+
+
+def record_attendance_deleted(state):
+    """
+    Remove one deleted attendance row from its meeting's counters.
+
+    A missing summary (e.g. the meeting itself is being deleted) is ignored.
+    """
+    delta_by_meeting = {}
+    _adjust(state, -1, delta_by_meeting)
+    _apply_delta(state[0], delta_by_meeting[state[0]])
+
+
+def compute_meeting_summaries(meeting_ids=None):
+    """
+    Count attendance for meetings straight from MemberAttendance.
+
+    Args:
+        meeting_ids: Meetings to count (default: all meetings)
+
+    Returns:
+        dict: {meeting_id: {counter_name: value}}
+    """
+    meetings = MeetingInfo.objects.all()
+    if meeting_ids is not None:
+        meetings = meetings.filter(meeting_id__in=list(meeting_ids))
+
+    present = Q(memberattendance__attendance_status=True)
+    paid = Q(memberattendance__attendance_fee_status=True)
+    rows = meetings.order_by().annotate(
+        total=Count('memberattendance'),
+        present=Count('memberattendance', filter=present),
+        paid=Count('memberattendance', filter=paid),
+        unpaid_present=Count('memberattendance', filter=present & ~paid),
+    ).values_list('meeting_id', 'meeting_fee', 'total', 'present', 'paid', 'unpaid_present')
+
+    return {
+        meeting_id: {
+            'total_count': total,
+            'present_count': present_count,
+            'paid_count': paid_count,
+            'unpaid_present_count': unpaid_present,
+            'fee_revenue': paid_count * fee,
+        }
+        for meeting_id, fee, total, present_count, paid_count, unpaid_present in rows
+    }
+
+
+def rebuild_meeting_summaries(meeting_ids=None):
+    """
+    Recount and store summaries for the given meetings (default: all).
+
+    Bulk write paths that bypass post_save call this for the meetings they touched.
+
+    Returns:
+        int: Number of summaries written
+    """
+    computed = compute_meeting_summaries(meeting_ids)
+    if not computed:
+        return 0
+    summaries = [MeetingSummary(meeting_id=meeting_id, **values) for meeting_id, values in computed.items()]
+    MeetingSummary.objects.bulk_create(
+        summaries,
+        update_conflicts=True,
+        unique_fields=['meeting'],
+        update_fields=SUMMARY_COUNTER_FIELDS,
+    )
+    return len(summaries)
+
+
+def verify_meeting_summaries(meeting_ids=None):
+    """
+    Compare stored summaries with a fresh count.
+
+    Returns:
+        list: (meeting_id, stored_values or None, expected_values) for each mismatch
+    """
+    computed = compute_meeting_summaries(meeting_ids)
+    stored = {
+        row['meeting_id']: row
+        for row in MeetingSummary.objects.filter(meeting_id__in=list(computed)).values('meeting_id', *SUMMARY_COUNTER_FIELDS)
+    }
+    mismatches = []
+    for meeting_id, expected in computed.items():
+        row = stored.get(meeting_id)
+        actual = {name: row[name] for name in SUMMARY_COUNTER_FIELDS} if row else None
+        if actual != expected:
+            mismatches.append((meeting_id, actual, expected))
+    return mismatches
+
+
+def refresh_fee_revenue(meeting):
+    """Recalculate fee revenue after a meeting's fee changes"""
+    MeetingSummary.objects.filter(meeting_id=meeting.meeting_id).update(
+        fee_revenue=F('paid_count') * meeting.meeting_fee
+    )
+
+
+def get_meeting_summaries(meetings):
+    """
+    Summaries for a list of meetings, keyed by meeting_id.
+
+    Meetings without a stored summary get an unsaved all-zero summary.
+    """
+    meeting_ids = [meeting.meeting_id for meeting in meetings]
+    summaries = MeetingSummary.objects.in_bulk(meeting_ids)
+    return {
+        meeting_id: summaries.get(meeting_id) or MeetingSummary(meeting_id=meeting_id)
+        for meeting_id in meeting_ids
+    }
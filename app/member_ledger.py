@@ -0,0 +1,267 @@
+"""
+Per-member dues ledger
+Keeps MemberLedger in step with MemberAttendance, meeting fees and Payment so
+outstanding dues, dashboard finance totals and the arrears list are indexed
+reads instead of a SUM over every unpaid attendance row
+"""
+from django.db.models import Count, F, Max, Q, Subquery, Sum
+from .models import Member, MeetingInfo, MemberAttendance, MemberLedger, Payment
+
+
+LEDGER_FIELDS = [
+    'fees_charged', 'fees_settled', 'outstanding', 'unpaid_meetings',
+    'payments_received', 'payment_count', 'last_payment_at',
+]
+
+
+def _empty_ledger():
+    return {
+        'fees_charged': 0,
+        'fees_settled': 0,
+        'outstanding': 0,
+        'unpaid_meetings': 0,
+        'payments_received': 0,
+        'payment_count': 0,
+        'last_payment_at': None,
+    }
+
+
+def compute_ledgers(member_ids=None, batch_size=500):
+    """
+    Compute ledgers straight from attendance and payments, one batch of members at a time.
+
+    Args:
+        member_ids: Members to compute (default: all members)
+        batch_size: Members per query
+
+    Yields:
+        dict: {member_id: ledger values} for each batch
+    """
+    if member_ids is None:
+        member_ids = Member.objects.order_by('member_id').values_list('member_id', flat=True)
+    member_ids = list(member_ids)
+    paid = Q(attendance_fee_status=True)
+
+    for start in range(0, len(member_ids), batch_size):
+        ledgers = {member_id: _empty_ledger() for member_id in member_ids[start:start + batch_size]}
+
+        # 1. Fees for attended meetings
+        attendance = MemberAttendance.objects.filter(
+            member_id__in=list(ledgers),
+            attendance_status=True,
+        ).values('member_id').annotate(
+            charged=Sum('meeting_date__meeting_fee'),
+            settled=Sum('meeting_date__meeting_fee', filter=paid),
+            unpaid=Count('attendance_id', filter=~paid),
+        ).order_by()
+        for row in attendance:
+            ledger = ledgers[row['member_id']]
+            ledger['fees_charged'] = row['charged'] or 0
+            ledger['fees_settled'] = row['settled'] or 0
+            ledger['outstanding'] = ledger['fees_charged'] - ledger['fees_settled']
+            ledger['unpaid_meetings'] = row['unpaid']
+
+        # 2. Payments received
+        payments = Payment.objects.filter(member_id__in=list(ledgers)).values('member_id').annotate(
+            total=Sum('amount'),
+            count=Count('payment_id'),
+            last=Max('payment_date'),
+        ).order_by()
+        for row in payments:
+            ledger = ledgers[row['member_id']]
+            ledger['payments_received'] = row['total'] or 0
+            ledger['payment_count'] = row['count']
+            ledger['last_payment_at'] = row['last']
+
+        yield ledgers
+
+
+def rebuild_ledgers(member_ids=None):
+    """
+    Recompute and store ledgers for the given members (default: all).
+
+    Used for changes that are not a simple delta (moved rows, fee changes,
+    deleted meetings) and by bulk write paths that bypass post_save.
+
+    Returns:
+        int: Number of ledgers written
+    """
+    written = 0
+    for batch in compute_ledgers(member_ids):
+        ledgers = [MemberLedger(member_id=member_id, **values) for member_id, values in batch.items()]
+        MemberLedger.objects.bulk_create(
+            ledgers,
+            update_conflicts=True,
+            unique_fields=['member'],
+            update_fields=LEDGER_FIELDS + ['updated_at'],
+        )
+        written += len(ledgers)
+    return written
+
+
+def verify_ledgers(member_ids=None):
+    """
+    Compare stored ledgers with a fresh computation.
+
+    Returns:
+        list: (member_id, stored_values or None, expected_values) for each mismatch
+    """
+    mismatches = []
+    for batch in compute_ledgers(member_ids):
+        stored = {
+            row['member_id']: row
+            for row in MemberLedger.objects.filter(member_id__in=list(batch)).values('member_id', *LEDGER_FIELDS)
+        }
+        for member_id, expected in batch.items():
+            row = stored.get(member_id)
+            actual = {name: row[name] for name in LEDGER_FIELDS} if row else None
+            if actual != expected:
+                mismatches.append((member_id, actual, expected))
+    return mismatches
+
+
+def _apply_updates(member_id, updates):
+    """Apply F() updates to one ledger, rebuilding it if the row is missing"""
+    if not updates:
+        return
+    if not MemberLedger.objects.filter(member_id=member_id).update(**updates):
+        rebuild_ledgers([member_id])
+
+
+def _attendance_change(previous, current):
+    """
+    Apply one attendance row change, given (meeting_id, member_id, present, paid)
+    before and after (None for a row that did not exist).
+    """
+    if previous is not None and current is not None and previous[:2] != current[:2]:
+        # Moved to another meeting or member - the fee differs, recompute both
+        rebuild_ledgers({previous[1], current[1]})
+        return
+
+    meeting_id, member_id = (current or previous)[:2]
+    was_present, was_paid = previous[2:] if previous is not None else (False, False)
+    is_present, is_paid = current[2:] if current is not None else (False, False)
+
+    # Change in the number of attended, settled and unsettled meetings (-1, 0 or 1)
+    charged = int(is_present) - int(was_present)
+    settled = int(is_present and is_paid) - int(was_present and was_paid)
+    unpaid = int(is_present and not is_paid) - int(was_present and not was_paid)
+    if not (charged or settled or unpaid):
+        return
+
+    fee = Subquery(MeetingInfo.objects.filter(meeting_id=meeting_id).values('meeting_fee')[:1])
+    # Each field only references itself, so MySQL's left-to-right SET order does not matter
+    updates = {}
+    if charged:
+        updates['fees_charged'] = F('fees_charged') + charged * fee
+    if settled:
+        updates['fees_settled'] = F('fees_settled') + settled * fee
+    if unpaid:
+        updates['outstanding'] = F('outstanding') + unpaid * fee
+        updates['unpaid_meetings'] = F('unpaid_meetings') + unpaid
+    _apply_updates(member_id, updates)
+
+
+def record_attendance_saved(previous, current, created):
+    """
+    Apply the change made by saving one attendance row.
+
+    Args:
+        previous: counted_state() as loaded from the database, or None if unknown
+        current: counted_state() as saved
+        created: True if the row was inserted
+    """
+    if not created and previous is None:
+        # Saved without the original values being loaded - recompute the member
+        rebuild_ledgers([current[1]])
+        return
+    _attendance_change(previous, current)
+
+
+def record_attendance_deleted(state):
+    """Remove one deleted attendance row from its member's ledger"""
+    _attendance_change(state, None)
+
+
+def record_payment_saved(previous, payment, created):
+    """
+    Apply the change made by saving one payment.
+
+    Args:
+        previous: ledger_state() as loaded from the database, or None if unknown
+        payment: The saved Payment
+        created: True if the payment was inserted
+    """
+    current = payment.ledger_state()
+    if created:
+        # payment_date is set on insert, so a new payment is always the latest
+        _apply_updates(payment.member_id, {
+            'payments_received': F('payments_received') + current[1],
+            'payment_count': F('payment_count') + 1,
+            'last_payment_at': payment.payment_date,
+        })
+    elif previous is None or previous[0] != current[0]:
+        # Unknown original values, or moved to another member
+        member_ids = {current[0]}
+        if previous is not None:
+            member_ids.add(previous[0])
+        rebuild_ledgers(member_ids)
+    elif previous[1] != current[1]:
+        _apply_updates(payment.member_id, {
+            'payments_received': F('payments_received') + (current[1] - previous[1]),
+        })
+
+
+def record_payment_deleted(payment):
+    """Remove a deleted payment from its member's ledger"""
+    # The latest payment date may have changed - recompute the member's ledger
+    if MemberLedger.objects.filter(member_id=payment.member_id).exists():
+        rebuild_ledgers([payment.member_id])
+
+
+def record_fee_changed(meeting):
+    """
+    Re-price ledgers after a meeting's fee changes.
+
+    Only members who attended the meeting are affected.
+    """
+    loaded_fee = getattr(meeting, '_loaded_meeting_fee', None)
+    meeting._loaded_meeting_fee = meeting.meeting_fee
+    if loaded_fee == meeting.meeting_fee:
+        return
+    rebuild_ledgers(affected_member_ids(meeting))
+
+
+def affected_member_ids(meeting):
+    """Members whose ledger depends on a meeting (attendance or payments)"""
+    attended = MemberAttendance.objects.filter(meeting_date=meeting).values_list('member_id', flat=True)
+    paid = Payment.objects.filter(meeting=meeting).values_list('member_id', flat=True)
+    return set(attended) | set(paid)
+
+
+def get_member_ledger(member):
+    """Ledger for a member, or an unsaved all-zero ledger if none is stored yet"""
+    return (
+        MemberLedger.objects.filter(member_id=member.pk).first()
+        or MemberLedger(member_id=member.pk)
+    )
+
+
+def ledger_totals():
+    """
+    Totals across all ledgers in one aggregate.
+
+    Returns:
+        dict: total_outstanding, members_in_arrears, total_received
+    """
+    totals = MemberLedger.objects.aggregate(
+        total_outstanding=Sum('outstanding'),
+        members_in_arrears=Count('member', filter=Q(outstanding__gt=0)),
+        total_received=Sum('payments_received'),
+    )
+    return {name: value or 0 for name, value in totals.items()}
+
+
+def members_in_arrears():
+    """Ledgers with unpaid fees, largest balance first (served from the outstanding index)"""
+    return MemberLedger.objects.filter(outstanding__gt=0).select_related('member').order_by('-outstanding', 'member_id')
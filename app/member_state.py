@@ -0,0 +1,238 @@
+"""
+Per-member rolling attendance state
+Keeps MemberAttendanceState in step with MemberAttendance and MeetingInfo so
+streak, consecutive-miss and count checks are a primary-key read instead of a
+walk over the member's attendance history
+"""
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from .models import Member, MeetingInfo, MemberAttendance, MemberAttendanceState
+
+
+STATE_FIELDS = [
+    'attended_count', 'paid_count', 'paid_attended_count',
+    'current_streak', 'longest_streak', 'consecutive_misses',
+    'previous_streak', 'previous_misses', 'last_attended_meeting',
+]
+
+
+def ordered_meeting_ids():
+    """All meeting IDs, oldest first (same-day meetings ordered by ID)"""
+    return list(MeetingInfo.objects.order_by('meeting_date', 'meeting_id').values_list('meeting_id', flat=True))
+
+
+def latest_meeting_id():
+    """ID of the newest meeting, or None if there are no meetings"""
+    return MeetingInfo.objects.order_by('-meeting_date', '-meeting_id').values_list('meeting_id', flat=True).first()
+
+
+def compute_state(meeting_ids, rows):
+    """
+    Walk one member's attendance over the ordered meetings.
+
+    Args:
+        meeting_ids: Meeting IDs oldest first, as returned by ordered_meeting_ids()
+        rows: List of (meeting_id, present, paid) for the member
+
+    Returns:
+        dict: MemberAttendanceState field values
+    """
+    attended = {meeting_id for meeting_id, present, _ in rows if present}
+    streak = longest = misses = previous_streak = previous_misses = 0
+    last_attended = None
+    for meeting_id in meeting_ids:
+        previous_streak, previous_misses = streak, misses
+        if meeting_id in attended:
+            streak += 1
+            misses = 0
+            longest = max(longest, streak)
+            last_attended = meeting_id
+        else:
+            streak = 0
+            misses += 1
+
+    return {
+        'attended_count': len(attended),
+        'paid_count': sum(1 for _, _, paid in rows if paid),
+        'paid_attended_count': sum(1 for _, present, paid in rows if present and paid),
+        'current_streak': streak,
+        'longest_streak': longest,
+        'consecutive_misses': misses,
+        'previous_streak': previous_streak,
+        'previous_misses': previous_misses,
+        'last_attended_meeting_id': last_attended,
+    }
+
+
+def compute_member_states(member_ids=None, batch_size=500):
+    """
+    Compute states straight from MemberAttendance, one batch of members at a time.
+
+    Args:
+        member_ids: Members to compute (default: all members)
+        batch_size: Members per attendance query
+
+    Yields:
+        dict: {member_id: state values} for each batch
+    """
+    meeting_ids = ordered_meeting_ids()
+    if member_ids is None:
+        member_ids = Member.objects.order_by('member_id').values_list('member_id', flat=True)
+    member_ids = list(member_ids)
+
+    for start in range(0, len(member_ids), batch_size):
+        rows_by_member = {member_id: [] for member_id in member_ids[start:start + batch_size]}
+        rows = MemberAttendance.objects.filter(member_id__in=list(rows_by_member)).order_by().values_list(
+            'member_id', 'meeting_date_id', 'attendance_status', 'attendance_fee_status'
+        )
+        for member_id, meeting_id, present, paid in rows:
+            rows_by_member[member_id].append((meeting_id, present, paid))
+        yield {member_id: compute_state(meeting_ids, member_rows) for member_id, member_rows in rows_by_member.items()}
+
+
+def rebuild_member_states(member_ids=None):
+    """
+    Recompute and store states for the given members (default: all).
+
+    Used for out-of-order changes (backdated meetings, edits to old attendance)
+    and by bulk write paths that bypass post_save.
+
+    Returns:
+        int: Number of states written
+    """
+    written = 0
+    for batch in compute_member_states(member_ids):
+        states = [MemberAttendanceState(member_id=member_id, **values) for member_id, values in batch.items()]
+        MemberAttendanceState.objects.bulk_create(
+            states,
+            update_conflicts=True,
+            unique_fields=['member'],
+            update_fields=STATE_FIELDS + ['updated_at'],
+        )
+        written += len(states)
+    return written
+
+
+def verify_member_states(member_ids=None):
+    """
+    Compare stored states with a fresh walk.
+
+    Returns:
+        list: (member_id, stored_values or None, expected_values) for each mismatch
+    """
+    value_names = [name if name != 'last_attended_meeting' else 'last_attended_meeting_id' for name in STATE_FIELDS]
+    mismatches = []
+    for batch in compute_member_states(member_ids):
+        stored = {
+            row['member_id']: row
+            for row in MemberAttendanceState.objects.filter(member_id__in=list(batch)).values('member_id', *value_names)
+        }
+        for member_id, expected in batch.items():
+            row = stored.get(member_id)
+            actual = {name: row[name] for name in value_names} if row else None
+            if actual != expected:
+                mismatches.append((member_id, actual, expected))
+    return mismatches
+
+
+def schedule_full_rebuild():
+    """Rebuild every state once the current transaction commits"""
+    transaction.on_commit(rebuild_member_states)
+
+
+def _apply_change(previous, current):
+    """
+    Apply one attendance row change, given (meeting_id, member_id, present, paid)
+    before and after (None for a row that did not exist).
+    """
+    meeting_id, member_id = (current or previous)[:2]
+    if previous is not None and current is not None and previous[:2] != current[:2]:
+        rebuild_member_states({previous[1], current[1]})
+        return
+
+    was_present, was_paid = previous[2:] if previous is not None else (False, False)
+    is_present, is_paid = current[2:] if current is not None else (False, False)
+    extends_streak = is_present and not was_present
+
+    # Losing a present mark, or gaining one before the latest meeting, changes
+    # the streak history itself - walk it again for this member
+    if (was_present and not is_present) or (extends_streak and meeting_id != latest_meeting_id()):
+        if current is not None or MemberAttendanceState.objects.filter(member_id=member_id).exists():
+            rebuild_member_states([member_id])
+        return
+
+    updates = {}
+    for name, before, after in (
+        ('attended_count', was_present, is_present),
+        ('paid_count', was_paid, is_paid),
+        ('paid_attended_count', was_present and was_paid, is_present and is_paid),
+    ):
+        if before != after:
+            updates[name] = F(name) + (int(after) - int(before))
+    if extends_streak:
+        # Present at the latest meeting: continue the run that ended one meeting ago.
+        # Only previous_streak is read, which is never written here, so MySQL's
+        # left-to-right SET order does not matter
+        updates['longest_streak'] = Greatest(F('longest_streak'), F('previous_streak') + 1)
+        updates['current_streak'] = F('previous_streak') + 1
+        updates['consecutive_misses'] = 0
+        updates['last_attended_meeting_id'] = meeting_id
+    if not updates:
+        return
+
+    if not MemberAttendanceState.objects.filter(member_id=member_id).update(**updates) and current is not None:
+        rebuild_member_states([member_id])
+
+
+def record_attendance_saved(previous, current, created):
+    """
+    Apply the change made by saving one attendance row.
+
+    Args:
+        previous: counted_state() as loaded from the database, or None if unknown
+        current: counted_state() as saved
+        created: True if the row was inserted
+    """
+    if not created and previous is None:
+        # Saved without the original values being loaded - walk the member again
+        rebuild_member_states([current[1]])
+        return
+    _apply_change(previous, current)
+
+
+def record_attendance_deleted(state):
+    """Remove one deleted attendance row from its member's state"""
+    _apply_change(state, None)
+
+
+def record_meeting_saved(meeting, created):
+    """
+    Advance every member's state when a new latest meeting is added.
+
+    Nobody has attended a meeting that was just created, so the latest run of
+    each member becomes a miss. A backdated meeting or a changed meeting date
+    reorders history and schedules a full rebuild instead.
+    """
+    loaded_date = getattr(meeting, '_loaded_meeting_date', None)
+    meeting._loaded_meeting_date = meeting.meeting_date
+
+    if created and meeting.meeting_id == latest_meeting_id():
+        # previous_* copy the old values before they are overwritten; MySQL
+        # evaluates SET left to right, other backends use the old row - same result
+        MemberAttendanceState.objects.update(
+            previous_streak=F('current_streak'),
+            previous_misses=F('consecutive_misses'),
+            current_streak=0,
+            consecutive_misses=F('consecutive_misses') + 1,
+        )
+    elif created or loaded_date != meeting.meeting_date:
+        schedule_full_rebuild()
+
+
+def get_member_state(member):
+    """State for a member, or an unsaved all-zero state if none is stored yet"""
+    return (
+        MemberAttendanceState.objects.filter(member_id=member.pk).first()
+        or MemberAttendanceState(member_id=member.pk)
+    )
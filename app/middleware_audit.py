@@ -5,6 +5,7 @@ Captures all HTTP requests and logs them as JSON audit logs
 import logging
 from django.utils.deprecation import MiddlewareMixin
 from .audit_logger import audit_log, get_client_ip, get_user_agent, get_username
+from .request_metrics import streams_lazily
 
 
 class AuditLoggingMiddleware(MiddlewareMixin):
@@ -26,35 +27,42 @@ class AuditLoggingMiddleware(MiddlewareMixin):
         '/dashboard/',
     ]
     
-    def process_request(self, request):
-        """Log incoming request"""
+    def process_response(self, request, response):
+        """Log the request with its status and metrics, and error responses separately"""
         # Skip excluded paths
         if any(request.path.startswith(path) for path in self.EXCLUDED_PATHS):
-            return None
+            return response
         
+        metrics = getattr(request, 'metrics', None)
+        if metrics is not None and streams_lazily(response):
+            # Log once the body has been sent, so the queries it runs are counted
+            metrics.finish_callbacks.append(lambda: self.log_response(request, response))
+        else:
+            self.log_response(request, response)
+        return response
+    
+    def log_response(self, request, response):
+        """Log the request and, for error responses, the error"""
         # Determine log level based on path
-        log_level = 'DEBUG' if any(request.path.startswith(path) for path in self.DEBUG_PATHS) else 'INFO'
+        log_level = 'DEBUG' if request.path in self.DEBUG_PATHS else 'INFO'
         
-        # Log the request
+        # Log the request once the response is known, with its metrics (see RequestMetricsMiddleware)
+        extra_details = {
+            'query_params': dict(request.GET),
+            'content_type': request.content_type,
+            'status_code': response.status_code,
+        }
+        metrics = getattr(request, 'metrics', None)
+        if metrics is not None:
+            extra_details.update(metrics.as_dict())
         audit_log(
             request=request,
             action='http_request',
             severity=log_level,
             target=None,
-            extra_details={
-                'query_params': dict(request.GET),
-                'content_type': request.content_type,
-            }
+            extra_details=extra_details
         )
         
-        return None
-    
-    def process_response(self, request, response):
-        """Log response status for important requests"""
-        # Skip excluded paths
-        if any(request.path.startswith(path) for path in self.EXCLUDED_PATHS):
-            return response
-        
         # Log error responses
         if response.status_code >= 400:
             severity = 'ERROR' if response.status_code >= 500 else 'WARNING'
@@ -68,8 +76,6 @@ class AuditLoggingMiddleware(MiddlewareMixin):
                     'status_text': response.reason_phrase,
                 }
             )
-        
-        return response
     
     def process_exception(self, request, exception):
         """Log exceptions"""
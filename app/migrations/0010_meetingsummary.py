@@ -0,0 +1,53 @@
+# Generated by Django 4.2.5
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count, Q
+
+
+def populate_meeting_summaries(apps, schema_editor):
+    """Build summaries for meetings that already have attendance"""
+    MeetingInfo = apps.get_model('app', 'MeetingInfo')
+    MeetingSummary = apps.get_model('app', 'MeetingSummary')
+    present = Q(memberattendance__attendance_status=True)
+    paid = Q(memberattendance__attendance_fee_status=True)
+    rows = MeetingInfo.objects.order_by().annotate(
+        total=Count('memberattendance'),
+        present=Count('memberattendance', filter=present),
+        paid=Count('memberattendance', filter=paid),
+        unpaid_present=Count('memberattendance', filter=present & ~paid),
+    ).values_list('meeting_id', 'meeting_fee', 'total', 'present', 'paid', 'unpaid_present')
+    MeetingSummary.objects.bulk_create([
+        MeetingSummary(
+            meeting_id=meeting_id,
+            total_count=total,
+            present_count=present_count,
+            paid_count=paid_count,
+            unpaid_present_count=unpaid_present,
+            fee_revenue=paid_count * fee,
+        )
+        for meeting_id, fee, total, present_count, paid_count, unpaid_present in rows
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0009_alter_memberattendance_options'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MeetingSummary',
+            fields=[
+                ('meeting', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='summary', serialize=False, to='app.meetinginfo')),
+                ('total_count', models.IntegerField(default=0)),
+                ('present_count', models.IntegerField(default=0)),
+                ('paid_count', models.IntegerField(default=0)),
+                ('unpaid_present_count', models.IntegerField(default=0)),
+                ('fee_revenue', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(populate_meeting_summaries, migrations.RunPython.noop),
+    ]
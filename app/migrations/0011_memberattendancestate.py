@@ -0,0 +1,79 @@
+# Generated by Django 4.2.5
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def populate_member_states(apps, schema_editor):
+    """Walk each member's attendance over all meetings, oldest first"""
+    Member = apps.get_model('app', 'Member')
+    MeetingInfo = apps.get_model('app', 'MeetingInfo')
+    MemberAttendance = apps.get_model('app', 'MemberAttendance')
+    MemberAttendanceState = apps.get_model('app', 'MemberAttendanceState')
+
+    meeting_ids = list(MeetingInfo.objects.order_by('meeting_date', 'meeting_id').values_list('meeting_id', flat=True))
+    rows_by_member = {member_id: [] for member_id in Member.objects.values_list('member_id', flat=True)}
+    rows = MemberAttendance.objects.order_by().values_list(
+        'member_id', 'meeting_date_id', 'attendance_status', 'attendance_fee_status'
+    )
+    for member_id, meeting_id, present, paid in rows.iterator():
+        rows_by_member[member_id].append((meeting_id, present, paid))
+
+    states = []
+    for member_id, member_rows in rows_by_member.items():
+        attended = {meeting_id for meeting_id, present, _ in member_rows if present}
+        streak = longest = misses = previous_streak = previous_misses = 0
+        last_attended = None
+        for meeting_id in meeting_ids:
+            previous_streak, previous_misses = streak, misses
+            if meeting_id in attended:
+                streak += 1
+                misses = 0
+                longest = max(longest, streak)
+                last_attended = meeting_id
+            else:
+                streak = 0
+                misses += 1
+        states.append(MemberAttendanceState(
+            member_id=member_id,
+            attended_count=len(attended),
+            paid_count=sum(1 for _, _, paid in member_rows if paid),
+            paid_attended_count=sum(1 for _, present, paid in member_rows if present and paid),
+            current_streak=streak,
+            longest_streak=longest,
+            consecutive_misses=misses,
+            previous_streak=previous_streak,
+            previous_misses=previous_misses,
+            last_attended_meeting_id=last_attended,
+        ))
+    MemberAttendanceState.objects.bulk_create(states, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0010_meetingsummary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MemberAttendanceState',
+            fields=[
+                ('member', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='attendance_state', serialize=False, to='app.member')),
+                ('attended_count', models.IntegerField(default=0)),
+                ('paid_count', models.IntegerField(default=0)),
+                ('paid_attended_count', models.IntegerField(default=0)),
+                ('current_streak', models.IntegerField(default=0)),
+                ('longest_streak', models.IntegerField(default=0)),
+                ('consecutive_misses', models.IntegerField(default=0)),
+                ('previous_streak', models.IntegerField(default=0)),
+                ('previous_misses', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('last_attended_meeting', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='app.meetinginfo')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['consecutive_misses'], name='app_membera_consecu_c31659_idx'), models.Index(fields=['current_streak'], name='app_membera_current_9102c6_idx')],
+            },
+        ),
+        migrations.RunPython(populate_member_states, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 4.2.5
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count, Max, Q, Sum
+
+
+def populate_member_ledgers(apps, schema_editor):
+    """Total each member's attended fees and payments"""
+    Member = apps.get_model('app', 'Member')
+    MemberAttendance = apps.get_model('app', 'MemberAttendance')
+    MemberLedger = apps.get_model('app', 'MemberLedger')
+    Payment = apps.get_model('app', 'Payment')
+
+    ledgers = {member_id: MemberLedger(member_id=member_id) for member_id in Member.objects.values_list('member_id', flat=True)}
+    paid = Q(attendance_fee_status=True)
+    attendance = MemberAttendance.objects.filter(attendance_status=True).values('member_id').annotate(
+        charged=Sum('meeting_date__meeting_fee'),
+        settled=Sum('meeting_date__meeting_fee', filter=paid),
+        unpaid=Count('attendance_id', filter=~paid),
+    ).order_by()
+    for row in attendance:
+        ledger = ledgers[row['member_id']]
+        ledger.fees_charged = row['charged'] or 0
+        ledger.fees_settled = row['settled'] or 0
+        ledger.outstanding = ledger.fees_charged - ledger.fees_settled
+        ledger.unpaid_meetings = row['unpaid']
+    payments = Payment.objects.values('member_id').annotate(
+        total=Sum('amount'),
+        count=Count('payment_id'),
+        last=Max('payment_date'),
+    ).order_by()
+    for row in payments:
+        ledger = ledgers[row['member_id']]
+        ledger.payments_received = row['total'] or 0
+        ledger.payment_count = row['count']
+        ledger.last_payment_at = row['last']
+    MemberLedger.objects.bulk_create(ledgers.values(), batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0012_exportjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MemberLedger',
+            fields=[
+                ('member', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='ledger', serialize=False, to='app.member')),
+                ('fees_charged', models.IntegerField(default=0)),
+                ('fees_settled', models.IntegerField(default=0)),
+                ('outstanding', models.IntegerField(default=0)),
+                ('unpaid_meetings', models.IntegerField(default=0)),
+                ('payments_received', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('payment_count', models.IntegerField(default=0)),
+                ('last_payment_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-outstanding', 'member'], name='app_memberl_outstan_c75b64_idx')],
+            },
+        ),
+        migrations.RunPython(populate_member_ledgers, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 4.2.5
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0014_alter_activitylog_action_type_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RateLimitCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=191)),
+                ('window_start', models.BigIntegerField()),
+                ('count', models.IntegerField(default=0)),
+                ('expires_at', models.BigIntegerField()),
+            ],
+            options={
+                'indexes': [models.Index(fields=['expires_at'], name='app_ratelim_expires_088361_idx')],
+                'unique_together': {('key', 'window_start')},
+            },
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.2.5
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0015_ratelimitcounter'),
+    ]
+
+    operations = [
+        # Added first so member_id stays indexed in between
+        migrations.AddIndex(
+            model_name='memberattendance',
+            index=models.Index(fields=['member_id', 'attendance_status', 'meeting_date'], name='app_membera_member__055e06_idx'),
+        ),
+        migrations.RemoveIndex(
+            model_name='memberattendance',
+            name='app_membera_member__9dc1be_idx',
+        ),
+    ]
@@ -1,4 +1,5 @@
-from django.db import models
+from django.db import models, transaction
+from django.utils import timezone
 from django.core.exceptions import ValidationError
 from .constants import UNIQUE_ROLES
 
@@ -53,6 +54,14 @@ class Member(models.Model):
             models.Index(fields=['member_role']),
         ]
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the loaded name so post_save can tell when a member is renamed
+        if 'member_first_name' in field_names and 'member_last_name' in field_names:
+            instance._loaded_name = (instance.member_first_name, instance.member_last_name)
+        return instance
+
     def clean(self):
         """Validate that unique roles (main 3 and sub 3) are not assigned to multiple members"""
         if self.member_role and self.member_role in UNIQUE_ROLES:
@@ -91,6 +100,17 @@ class MeetingInfo(models.Model):
     def __str__(self):
         return str(f"{self.meeting_id} - {self.meeting_date}")
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the loaded date so post_save can tell when meetings are reordered
+        if 'meeting_date' in field_names:
+            instance._loaded_meeting_date = instance.meeting_date
+        # ...and the loaded fee so member ledgers are only re-priced when it changes
+        if 'meeting_fee' in field_names:
+            instance._loaded_meeting_fee = instance.meeting_fee
+        return instance
+
 
 class MemberAttendance(models.Model):
     attendance_id = models.AutoField(primary_key=True)
@@ -105,7 +125,8 @@ class MemberAttendance(models.Model):
         unique_together = [['meeting_date', 'member_id']]
         indexes = [
             models.Index(fields=['meeting_date', 'member_id']),
-            models.Index(fields=['member_id', 'attendance_status']),
+            # Covers per-member counts by meeting (see attendance_analytics) without reading the rows
+            models.Index(fields=['member_id', 'attendance_status', 'meeting_date']),
             models.Index(fields=['attendance_status', 'attendance_fee_status']),
         ]
         ordering = ['-attendance_created_at']
@@ -118,9 +139,109 @@ class MemberAttendance(models.Model):
         # No validation needed - members can pay fees regardless of attendance status
         pass
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the loaded values so post_save can apply counter deltas
+        if all(name in field_names for name in cls.COUNTED_FIELDS):
+            instance._counted_state = instance.counted_state()
+        return instance
+
+    # Fields that feed MeetingSummary and MemberAttendanceState counters
+    COUNTED_FIELDS = ('meeting_date_id', 'member_id_id', 'attendance_status', 'attendance_fee_status')
+
+    def counted_state(self):
+        """Return (meeting_id, member_id, present, paid) as counted by the summaries"""
+        return (self.meeting_date_id, self.member_id_id, self.attendance_status, self.attendance_fee_status)
+
     def save(self, *args, **kwargs):
         self.full_clean()  # Run validation
-        super().save(*args, **kwargs)
+        # Atomic so the summary counters updated in post_save commit with the row
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+
+class MeetingSummary(models.Model):
+    """Per-meeting attendance counters, kept in step with MemberAttendance"""
+    meeting = models.OneToOneField(MeetingInfo, on_delete=models.CASCADE, primary_key=True, related_name='summary')
+    total_count = models.IntegerField(default=0)
+    present_count = models.IntegerField(default=0)
+    paid_count = models.IntegerField(default=0)
+    unpaid_present_count = models.IntegerField(default=0)
+    fee_revenue = models.IntegerField(default=0)  # paid_count * meeting_fee
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Summary {self.meeting_id}: {self.present_count}/{self.total_count} present"
+
+    @property
+    def present_paid_count(self):
+        return self.present_count - self.unpaid_present_count
+
+    @property
+    def absent_count(self):
+        return self.total_count - self.present_count
+
+
+class MemberAttendanceState(models.Model):
+    """
+    Rolling attendance state per member, kept in step with MemberAttendance.
+
+    Streaks run over all meetings ordered by date; a missing attendance row
+    counts as a missed meeting. The previous_* fields hold the streak and miss
+    run as of the meeting before the latest, so marking someone present at the
+    latest meeting is an O(1) update.
+    """
+    member = models.OneToOneField(Member, on_delete=models.CASCADE, primary_key=True, related_name='attendance_state')
+    attended_count = models.IntegerField(default=0)
+    paid_count = models.IntegerField(default=0)  # rows with the fee paid, present or not
+    paid_attended_count = models.IntegerField(default=0)  # present and paid
+    current_streak = models.IntegerField(default=0)  # latest meetings attended in a row
+    longest_streak = models.IntegerField(default=0)
+    consecutive_misses = models.IntegerField(default=0)  # latest meetings missed in a row
+    previous_streak = models.IntegerField(default=0)
+    previous_misses = models.IntegerField(default=0)
+    last_attended_meeting = models.ForeignKey(
+        MeetingInfo, on_delete=models.SET_NULL, null=True, blank=True, related_name='+'
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['consecutive_misses']),
+            models.Index(fields=['current_streak']),
+        ]
+
+    def __str__(self):
+        return f"State {self.member_id}: streak {self.current_streak}, missed {self.consecutive_misses}"
+
+
+class MemberLedger(models.Model):
+    """
+    Running dues and payment totals per member, kept in step with
+    MemberAttendance, MeetingInfo fees and Payment.
+
+    Fees are charged for meetings attended; a fee is settled when the
+    attendance row is marked paid. Payments are recorded separately and are
+    not matched against individual meetings.
+    """
+    member = models.OneToOneField(Member, on_delete=models.CASCADE, primary_key=True, related_name='ledger')
+    fees_charged = models.IntegerField(default=0)  # meeting fees for meetings attended
+    fees_settled = models.IntegerField(default=0)  # of those, marked paid
+    outstanding = models.IntegerField(default=0)  # attended but not paid
+    unpaid_meetings = models.IntegerField(default=0)
+    payments_received = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    payment_count = models.IntegerField(default=0)
+    last_payment_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-outstanding', 'member']),
+        ]
+
+    def __str__(self):
+        return f"Ledger {self.member_id}: Rs.{self.outstanding} outstanding"
 
 
 class ActivityLog(models.Model):
@@ -131,6 +252,7 @@ class ActivityLog(models.Model):
         ('DELETE', 'Deleted'),
         ('VIEW', 'Viewed'),
         ('EXPORT', 'Exported'),
+        ('SECURITY', 'Security Event'),
     ]
     
     activity_id = models.AutoField(primary_key=True)
@@ -139,7 +261,7 @@ class ActivityLog(models.Model):
     target_model = models.CharField(max_length=50)  # Member, Meeting, etc.
     target_id = models.CharField(max_length=50)
     description = models.TextField()
-    created_at = models.DateTimeField(auto_now_add=True)
+    created_at = models.DateTimeField(default=timezone.now)  # When the event happened, not when the batch was written
     
     class Meta:
         ordering = ['-created_at']
@@ -153,6 +275,23 @@ class ActivityLog(models.Model):
         return f"{self.user} {self.action_type} {self.target_model} at {self.created_at}"
 
 
+class RateLimitCounter(models.Model):
+    """Requests from one client to one rate-limited route in one fixed window"""
+    key = models.CharField(max_length=191)  # route prefix and client IP
+    window_start = models.BigIntegerField()  # Unix time, a multiple of the window length
+    count = models.IntegerField(default=0)
+    expires_at = models.BigIntegerField()  # Unix time after which the row is no longer read
+
+    class Meta:
+        unique_together = [['key', 'window_start']]
+        indexes = [
+            models.Index(fields=['expires_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.key} @ {self.window_start}: {self.count}"
+
+
 class Payment(models.Model):
     """Track member payments separately from attendance"""
     PAYMENT_METHOD_CHOICES = [
@@ -183,7 +322,20 @@ class Payment(models.Model):
         ]
     
     def __str__(self):
-        return f"Payment {self.payment_id} - {self.member.member_id} - Rs.{self.amount}"
+        return f"Payment {self.payment_id} - {self.member_id} - Rs.{self.amount}"  # member_id is the key, no query
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the loaded member and amount so post_save can adjust the ledger
+        if 'member_id' in field_names and 'amount' in field_names:
+            instance._ledger_state = instance.ledger_state()
+        return instance
+
+    def ledger_state(self):
+        """Return (member_id, amount) as counted by MemberLedger"""
+        # Views assign the posted string; compare and add it as a Decimal
+        return (self.member_id, self._meta.get_field('amount').to_python(self.amount))
 
 
 class BadgeType(models.TextChoices):
@@ -225,3 +377,62 @@ class MemberBadge(models.Model):
     
     def __str__(self):
         return f"{self.member.member_id} - {self.get_badge_type_display()}"
+
+
+class ExportJob(models.Model):
+    """
+    Report export generated outside the web request by the export worker
+    (manage.py run_export_worker). The finished file is kept under
+    MEDIA_ROOT/exports/ until expires_at.
+    """
+    STATUS_PENDING = 'PENDING'
+    STATUS_RUNNING = 'RUNNING'
+    STATUS_DONE = 'DONE'
+    STATUS_FAILED = 'FAILED'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Queued'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_DONE, 'Ready'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+    FORMAT_CHOICES = [
+        ('excel', 'Excel (.xlsx)'),
+        ('pdf', 'PDF (.pdf)'),
+    ]
+
+    job_id = models.AutoField(primary_key=True)
+    user = models.ForeignKey('auth.User', on_delete=models.CASCADE, related_name='export_jobs')
+    report_type = models.CharField(max_length=20)
+    export_format = models.CharField(max_length=10, choices=FORMAT_CHOICES)
+    params = models.JSONField(default=dict, blank=True)  # filters and selected columns
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    rows_done = models.IntegerField(default=0)
+    rows_total = models.IntegerField(null=True, blank=True)
+    file = models.FileField(upload_to='exports/', blank=True)
+    error = models.TextField(blank=True)
+    attempts = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)  # refreshed while the worker makes progress
+    finished_at = models.DateTimeField(null=True, blank=True)
+    expires_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+            models.Index(fields=['user', '-created_at']),
+            models.Index(fields=['expires_at']),
+        ]
+
+    def __str__(self):
+        return f"Export {self.job_id} ({self.report_type} {self.export_format}) {self.status}"
+
+    @property
+    def progress(self):
+        """Percentage of rows written, or None while the total is unknown"""
+        if self.status == self.STATUS_DONE:
+            return 100
+        if not self.rows_total:
+            return None
+        return min(int(self.rows_done * 100 / self.rows_total), 99)
@@ -0,0 +1,203 @@
+"""
+Keyset (cursor) pagination for large list views
+Pages are fetched with a WHERE on the last row's ordering values instead of
+OFFSET, so page 500 costs the same as page 1, and there is no COUNT(*) per
+request - the total shown under the list is an approximate, cached count.
+"""
+import base64
+import hashlib
+import json
+import operator
+from functools import reduce
+from django.core.cache import cache
+from django.db.models import Q
+
+
+CURSOR_PARAM = 'cursor'
+
+
+def seek(ordering, values, forward=True):
+    """
+    Q for the rows strictly after (forward) or before the given ordering values.
+
+    Args:
+        ordering: Field names, '-' prefix for descending (unique as a whole)
+        values: The ordering values of the row to seek from
+    """
+    fields = [name.lstrip('-') for name in ordering]
+    conditions = []
+    for i, (field, name) in enumerate(zip(fields, ordering)):
+        lookup = 'lt' if name.startswith('-') == forward else 'gt'
+        tie = {fields[j]: values[j] for j in range(i)}
+        conditions.append(Q(**tie, **{f'{field}__{lookup}': values[i]}))
+    return reduce(operator.or_, conditions)
+
+
+class KeysetPage:
+    """
+    One page of results, iterable like a Django Page.
+
+    Exposes what pagination.html needs: has_previous/has_next, the cursors
+    for the neighbouring pages, start_index/end_index and paginator.count.
+    """
+    is_keyset = True
+
+    def __init__(self, object_list, paginator, start, has_previous, has_next):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.start = start
+        self.has_previous_page = has_previous
+        self.has_next_page = has_next
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_previous(self):
+        return self.has_previous_page
+
+    def has_next(self):
+        return self.has_next_page
+
+    def has_other_pages(self):
+        return self.has_previous_page or self.has_next_page
+
+    def start_index(self):
+        return self.start + 1 if self.object_list else 0
+
+    def end_index(self):
+        return self.start + len(self.object_list)
+
+    @property
+    def next_cursor(self):
+        if not self.has_next_page:
+            return None
+        return self.paginator.encode_cursor(self.object_list[-1], self.end_index(), reverse=False)
+
+    @property
+    def previous_cursor(self):
+        if not self.has_previous_page:
+            return None
+        return self.paginator.encode_cursor(self.object_list[0], self.start, reverse=True)
+
+
+class KeysetPaginator:
+    """
+    Paginate a queryset by its ordering values.
+
+    The ordering must be unique (end it with the primary key or another
+    unique column) and should match an index. Fields may follow relations
+    ('-meeting_date__meeting_date') as long as the related object is loaded
+    with select_related.
+
+    Usage:
+        paginator = KeysetPaginator(queryset, 25, ordering=('-member_join_at', 'member_id'))
+        page = paginator.page(request.GET.get('cursor'))
+    """
+
+    def __init__(self, queryset, per_page, ordering, count=None, count_timeout=300):
+        """
+        Args:
+            queryset: Filtered queryset (its own ordering is replaced)
+            per_page: Rows per page
+            ordering: Field names, '-' prefix for descending
+            count: Known total, if the view already computed one
+            count_timeout: Seconds to cache the approximate total
+        """
+        self.queryset = queryset
+        self.per_page = per_page
+        self.ordering = tuple(ordering)
+        self.fields = [name.lstrip('-') for name in self.ordering]
+        self.descending = [name.startswith('-') for name in self.ordering]
+        self.count_timeout = count_timeout
+        self._count = count
+
+    @property
+    def count(self):
+        """Approximate total, cached per query for count_timeout seconds"""
+        if self._count is None:
+            try:
+                key = 'keyset_count:' + hashlib.md5(str(self.queryset.query).encode()).hexdigest()
+            except Exception:
+                # Some queries cannot be rendered to SQL text - count directly
+                self._count = self.queryset.count()
+            else:
+                self._count = cache.get_or_set(key, self.queryset.count, self.count_timeout)
+        return self._count
+
+    def page(self, cursor=None):
+        """
+        Return the page a cursor points at (the first page for a missing or invalid cursor).
+        """
+        position = self.decode_cursor(cursor) if cursor else None
+        if position is None:
+            rows = list(self.queryset.order_by(*self.ordering)[:self.per_page + 1])
+            return KeysetPage(rows[:self.per_page], self, 0, False, len(rows) > self.per_page)
+
+        values, start, reverse = position
+        if reverse:
+            # Walk backwards from the first row of the current page
+            ordering = [name[1:] if name.startswith('-') else '-' + name for name in self.ordering]
+            queryset = self.queryset.filter(self._seek(values, forward=False)).order_by(*ordering)
+            rows = list(queryset[:self.per_page + 1])
+            has_previous = len(rows) > self.per_page
+            rows = rows[:self.per_page]
+            rows.reverse()
+            return KeysetPage(rows, self, max(start - len(rows), 0) if has_previous else 0, has_previous, True)
+
+        queryset = self.queryset.filter(self._seek(values, forward=True)).order_by(*self.ordering)
+        rows = list(queryset[:self.per_page + 1])
+        return KeysetPage(rows[:self.per_page], self, start, True, len(rows) > self.per_page)
+
+    def _seek(self, values, forward):
+        return seek(self.ordering, values, forward)
+
+    def _row_values(self, obj):
+        values = []
+        for field in self.fields:
+            value = obj
+            for part in field.split('__'):
+                value = getattr(value, part)
+            values.append(value)
+        return values
+
+    def _model_field(self, path):
+        model = self.queryset.model
+        for part in path.split('__'):
+            field = model._meta.get_field(part)
+            model = field.related_model
+        return field
+
+    def encode_cursor(self, obj, start, reverse):
+        values = [value.isoformat() if hasattr(value, 'isoformat') else value for value in self._row_values(obj)]
+        payload = json.dumps({'v': values, 's': start, 'r': reverse}, separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        """
+        Returns:
+            tuple: (ordering values, start index, reverse) or None if the cursor is invalid
+        """
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            if len(payload['v']) != len(self.fields):
+                return None
+            values = [
+                self._model_field(field).to_python(value)
+                for field, value in zip(self.fields, payload['v'])
+            ]
+            return values, max(int(payload['s']), 0), bool(payload['r'])
+        except Exception:
+            # Tampered or stale cursor (e.g. after a deploy changed the ordering)
+            return None
+
+
+def paginate(request, queryset, per_page, ordering, **kwargs):
+    """Keyset page for the cursor in the request's querystring"""
+    return KeysetPaginator(queryset, per_page, ordering, **kwargs).page(request.GET.get(CURSOR_PARAM))
@@ -0,0 +1,121 @@
+"""
+Payment statistics per year
+Three grouped queries (monthly via TruncMonth, by method, top members) instead
+of two queries per month, cached per year. A year's snapshot is dropped
+whenever a payment in that year is saved or deleted, and when a member who
+paid in that year is renamed (the top members list shows names). Deleting a
+member deletes their payments, which drops the snapshot the same way.
+"""
+from datetime import datetime
+from django.core.cache import cache
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+from .models import Payment
+
+
+CACHE_KEY = 'payment_stats:{year}'
+CURRENT_YEAR_TIMEOUT = 300  # Safety net in case an invalidation is missed
+PAST_YEAR_TIMEOUT = 60 * 60 * 24  # Past years rarely change, but are not kept forever
+
+
+def compute_payment_stats(year):
+    """
+    Compute the figures shown on the payment statistics page.
+
+    Args:
+        year: Calendar year (local time)
+
+    Returns:
+        dict: total_amount, total_count, average_amount, by_method, monthly_data, top_members
+    """
+    payments = Payment.objects.filter(payment_date__year=year)
+
+    # 1. Monthly breakdown in one GROUP BY (order_by() drops Meta ordering from the grouping)
+    by_month = {
+        row['month'].month: row
+        for row in payments.annotate(month=TruncMonth('payment_date')).values('month').annotate(
+            total=Sum('amount'),
+            count=Count('payment_id'),
+        ).order_by()
+    }
+    monthly_data = [
+        {
+            'month': datetime(year, month, 1).strftime('%B'),
+            'amount': by_month[month]['total'] if month in by_month else 0,
+            'count': by_month[month]['count'] if month in by_month else 0,
+        }
+        for month in range(1, 13)
+    ]
+
+    # 2. By payment method
+    by_method = list(payments.values('payment_method').annotate(
+        total=Sum('amount'),
+        count=Count('payment_id')
+    ).order_by('-total'))
+
+    # 3. Top paying members
+    top_members = list(payments.values(
+        'member__member_id',
+        'member__member_first_name',
+        'member__member_last_name'
+    ).annotate(
+        total=Sum('amount'),
+        count=Count('payment_id')
+    ).order_by('-total')[:10])
+
+    total_amount = sum(row['total'] for row in by_month.values()) if by_month else 0
+    total_count = sum(row['count'] for row in by_month.values())
+    return {
+        'total_amount': total_amount,
+        'total_count': total_count,
+        'average_amount': total_amount / total_count if total_count else 0,
+        'by_method': by_method,
+        'monthly_data': monthly_data,
+        'top_members': top_members,
+    }
+
+
+def get_payment_stats(year):
+    """Statistics for a year, from cache when available"""
+    key = CACHE_KEY.format(year=year)
+    try:
+        stats = cache.get(key)
+    except Exception:
+        # Cache might not be configured - compute directly
+        stats = None
+    if stats is not None:
+        return stats
+
+    stats = compute_payment_stats(year)
+    timeout = PAST_YEAR_TIMEOUT if year < timezone.localdate().year else CURRENT_YEAR_TIMEOUT
+    try:
+        cache.set(key, stats, timeout)
+    except Exception:
+        pass
+    return stats
+
+
+def _local_year(moment):
+    return timezone.localtime(moment).year if timezone.is_aware(moment) else moment.year
+
+
+def invalidate_payment_stats(payment):
+    """Drop the cached statistics for the year of a saved or deleted payment"""
+    if payment.payment_date is None:
+        return
+    try:
+        cache.delete(CACHE_KEY.format(year=_local_year(payment.payment_date)))
+    except Exception:
+        # Silently fail - the snapshot expires on its own
+        pass
+
+
+def invalidate_member_payment_stats(member):
+    """Drop the cached statistics for every year a renamed member paid in"""
+    try:
+        years = {_local_year(moment) for moment in Payment.objects.filter(member=member).datetimes('payment_date', 'year')}
+        cache.delete_many([CACHE_KEY.format(year=year) for year in years])
+    except Exception:
+        # Silently fail - the snapshot expires on its own
+        pass
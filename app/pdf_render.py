@@ -0,0 +1,128 @@
+"""
+Members table PDF rendering
+Plain reportlab code with no Django imports, so chunks of a large export can
+be rendered in worker processes and the partial PDFs joined afterwards
+"""
+from collections import namedtuple
+from io import BytesIO
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.units import inch
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.platypus import LongTable, Paragraph, SimpleDocTemplate, Spacer, TableStyle
+
+
+HEADER_HEIGHT = 24  # 10pt bold header with 12pt bottom padding
+ROW_HEIGHT = 16  # 9pt body rows
+CELL_PADDING = 12  # Left + right cell padding
+FRAME_PADDING = 6  # SimpleDocTemplate frame padding on each side
+
+TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#366092')),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, 0), 10),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+    ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#374151')),
+    ('TEXTCOLOR', (0, 1), (-1, -1), colors.whitesmoke),
+    ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#4b5563')),
+    ('FONTSIZE', (0, 1), (-1, -1), 9),
+])
+
+# Everything a worker needs to render its share of the pages
+PdfLayout = namedtuple('PdfLayout', ['title', 'headers', 'col_widths', 'first_page_rows', 'page_rows'])
+
+
+def new_document(output):
+    return SimpleDocTemplate(output, pagesize=A4)
+
+
+def title_flowables(title):
+    styles = getSampleStyleSheet()
+    title_style = ParagraphStyle(
+        'CustomTitle',
+        parent=styles['Heading1'],
+        fontSize=18,
+        textColor=colors.HexColor('#1f2937'),
+        spaceAfter=30,
+        alignment=1  # Center
+    )
+    return [Paragraph(title, title_style), Spacer(1, 0.2*inch)]
+
+
+def plan_layout(title, headers, sample_rows):
+    """
+    Fix column widths and rows per page for the whole document.
+
+    Every page holds one table with fixed row heights, so no table ever has to
+    be split - splitting a long table re-measures all its remaining rows on
+    every page, which is what makes one big Table quadratic. Widths come from
+    the header and a sample of rows, scaled down to the page width if needed.
+
+    Args:
+        title: Document title (first page only)
+        headers: Column headers
+        sample_rows: First rows of the export
+
+    Returns:
+        PdfLayout
+    """
+    doc = new_document(BytesIO())
+    frame_width = doc.width - 2 * FRAME_PADDING
+    frame_height = doc.height - 2 * FRAME_PADDING
+
+    widths = [stringWidth(str(header), 'Helvetica-Bold', 10) for header in headers]
+    for row in sample_rows:
+        for i, value in enumerate(row):
+            widths[i] = max(widths[i], stringWidth(str(value), 'Helvetica', 9))
+    widths = [width + CELL_PADDING for width in widths]
+    if sum(widths) > frame_width:
+        scale = frame_width / sum(widths)
+        widths = [width * scale for width in widths]
+
+    title_height = 0
+    for flowable in title_flowables(title):
+        title_height += flowable.wrap(frame_width, frame_height)[1] + flowable.getSpaceBefore() + flowable.getSpaceAfter()
+
+    page_rows = int((frame_height - HEADER_HEIGHT) // ROW_HEIGHT)
+    first_page_rows = int((frame_height - title_height - HEADER_HEIGHT) // ROW_HEIGHT)
+    return PdfLayout(title, list(headers), widths, max(first_page_rows, 1), max(page_rows, 1))
+
+
+def render_pages(layout, rows, first):
+    """
+    Render rows as whole pages of a members PDF.
+
+    Args:
+        layout: PdfLayout from plan_layout()
+        rows: Row value lists; a multiple of layout.page_rows (after the
+            first page when first is True) except for the final chunk
+        first: True for the chunk that starts the document (adds the title)
+
+    Returns:
+        bytes: A standalone PDF of the chunk's pages
+    """
+    elements = title_flowables(layout.title) if first else []
+    start = 0
+    page_size = layout.first_page_rows if first else layout.page_rows
+    while True:
+        page = rows[start:start + page_size]
+        data = [layout.headers] + [list(row) for row in page]
+        table = LongTable(
+            data,
+            colWidths=layout.col_widths,
+            rowHeights=[HEADER_HEIGHT] + [ROW_HEIGHT] * len(page),
+            repeatRows=1,
+        )
+        table.setStyle(TABLE_STYLE)
+        elements.append(table)
+        start += page_size
+        page_size = layout.page_rows
+        if start >= len(rows):
+            break
+
+    output = BytesIO()
+    new_document(output).build(elements)
+    return output.getvalue()
@@ -0,0 +1,105 @@
+"""
+Sliding-window rate limiting shared by all worker processes
+Counters live in the RateLimitCounter table and are bumped with a single
+atomic UPDATE, so every gunicorn worker sees the same counts. The limit is
+checked against a sliding window estimated from the current and previous
+fixed windows, and expired rows are purged now and then with one indexed DELETE.
+"""
+import random
+import re
+import time
+from collections import namedtuple
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from .models import RateLimitCounter
+
+
+PURGE_PROBABILITY = 0.01  # Share of hits that also delete expired counters
+
+RateLimitRule = namedtuple('RateLimitRule', ['prefix', 'max_requests', 'window'])
+
+
+class RouteTable:
+    """
+    Rate limit rules compiled into one regular expression.
+
+    Prefixes are tried in order and the first match wins, as with a list of
+    startswith() checks, but a path is matched with a single regex call.
+    """
+
+    def __init__(self, limits):
+        """
+        Args:
+            limits: (path prefix, max requests, window seconds) tuples, e.g. settings.RATE_LIMITS
+        """
+        self.rules = [RateLimitRule(*limit) for limit in limits]
+        if self.rules:
+            alternatives = '|'.join(f'(?P<r{i}>{re.escape(rule.prefix)})' for i, rule in enumerate(self.rules))
+            self.pattern = re.compile(f'^(?:{alternatives})')
+        else:
+            self.pattern = None
+
+    def match(self, path):
+        """The rule for a request path, or None if it is not rate limited"""
+        if self.pattern is None:
+            return None
+        match = self.pattern.match(path)
+        if match is None:
+            return None
+        return self.rules[int(match.lastgroup[1:])]
+
+
+def _increment(key, window_start, expires_at):
+    """Add one to a window's counter, creating the row on first use"""
+    counters = RateLimitCounter.objects.filter(key=key, window_start=window_start)
+    if counters.update(count=F('count') + 1):
+        return
+    try:
+        # Own savepoint: losing the insert race must not break an outer transaction
+        with transaction.atomic():
+            RateLimitCounter.objects.create(key=key, window_start=window_start, count=1, expires_at=expires_at)
+    except IntegrityError:
+        # Another worker created it first
+        counters.update(count=F('count') + 1)
+
+
+def hit(key, window, now=None):
+    """
+    Count one request and estimate the requests in the last `window` seconds.
+
+    The previous fixed window is weighted by how much of it still overlaps
+    the sliding window.
+
+    Args:
+        key: Client and route identifier
+        window: Window length in seconds
+        now: Unix time (default: current time)
+
+    Returns:
+        float: Estimated requests in the sliding window, including this one
+    """
+    now = time.time() if now is None else now
+    window_start = int(now // window) * window
+    _increment(key, window_start, expires_at=window_start + 2 * window)
+
+    counts = dict(
+        RateLimitCounter.objects.filter(key=key, window_start__in=[window_start - window, window_start])
+        .values_list('window_start', 'count')
+    )
+    overlap = 1 - (now - window_start) / window
+    estimate = counts.get(window_start, 0) + counts.get(window_start - window, 0) * overlap
+
+    if random.random() < PURGE_PROBABILITY:
+        purge_expired(now)
+    return estimate
+
+
+def purge_expired(now=None):
+    """
+    Delete counters no sliding window can read any more.
+
+    Returns:
+        int: Number of rows deleted
+    """
+    now = time.time() if now is None else now
+    return RateLimitCounter.objects.filter(expires_at__lt=int(now)).delete()[0]
@@ -1,10 +1,54 @@
 """
 Smart Recommendations System
 Provides context-aware suggestions for actions based on current system state
+
+Each provider is registered with a TTL and a time budget. Its results are kept
+in the shared cache and served stale-while-revalidate: a stale entry is still
+shown and recomputed once the response has been sent (request_finished),
+usually by one worker (the claim is a cache.add(), which the file cache does
+not make atomic). On a cold cache a provider is computed inline only while its
+budget fits in what is left of RECOMMENDATIONS_TIME_BUDGET_MS, otherwise it is
+left out of this page and computed after the response too.
 """
-from django.db.models import Count, Q, Sum, Avg
+import logging
+import threading
+import time
+from collections import namedtuple
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max, Min, Q, Sum, Avg
 from datetime import date, timedelta
+from .attendance_analytics import declining_members
 from .models import Member, MeetingInfo, MemberAttendance, MemberBadge
+from .member_ledger import ledger_totals
+
+
+logger = logging.getLogger(__name__)
+
+CACHE_PREFIX = 'recommendations:'
+STALE_FOR = 24 * 3600  # Seconds past its TTL a result is still served while it is recomputed
+REFRESH_LOCK_TIMEOUT = 60  # A claimed refresh that never ran is retried after this long
+
+# ttl: seconds a result is fresh, budget: seconds it is expected to take
+Provider = namedtuple('Provider', ['name', 'func', 'ttl', 'budget'])
+PROVIDERS = {}
+
+_local = threading.local()
+
+
+def register_provider(name, ttl, budget):
+    """
+    Register a recommendation provider (a function returning a list of recommendations).
+
+    Usage:
+        @register_provider('meetings', ttl=300, budget=0.05)
+        def get_meeting_recommendations():
+            ...
+    """
+    def decorator(func):
+        PROVIDERS[name] = Provider(name, func, ttl, budget)
+        return func
+    return decorator
 
 
 def get_smart_recommendations(user, context=None):
@@ -13,26 +57,20 @@ def get_smart_recommendations(user, context=None):
     Returns a list of recommendation dictionaries
     """
     recommendations = []
-    
-    # 1. Meeting-related recommendations
-    meeting_recs = get_meeting_recommendations()
-    recommendations.extend(meeting_recs)
-    
-    # 2. Member-related recommendations
-    member_recs = get_member_recommendations()
-    recommendations.extend(member_recs)
-    
-    # 3. Attendance-related recommendations
-    attendance_recs = get_attendance_recommendations()
-    recommendations.extend(attendance_recs)
-    
-    # 4. Payment-related recommendations
-    payment_recs = get_payment_recommendations()
-    recommendations.extend(payment_recs)
-    
-    # 5. Badge-related recommendations
-    badge_recs = get_badge_recommendations()
-    recommendations.extend(badge_recs)
+    deadline = time.monotonic() + settings.RECOMMENDATIONS_TIME_BUDGET_MS / 1000
+    
+    for provider in PROVIDERS.values():
+        entry = _cached_entry(provider)
+        if entry is None:
+            if time.monotonic() + provider.budget > deadline:
+                schedule_refresh(provider)
+                continue
+            entry = refresh_provider(provider)
+            if entry is None:
+                continue
+        elif entry['fresh_until'] <= time.time():
+            schedule_refresh(provider)
+        recommendations.extend(entry['items'])
     
     # Sort by priority (higher priority first)
     recommendations.sort(key=lambda x: x.get('priority', 5), reverse=True)
@@ -40,35 +78,102 @@ def get_smart_recommendations(user, context=None):
     return recommendations[:10]  # Return top 10 recommendations
 
 
+def _cached_entry(provider):
+    try:
+        return cache.get(CACHE_PREFIX + provider.name)
+    except Exception:
+        # Cache might not be configured - compute directly
+        return None
+
+
+def refresh_provider(provider):
+    """
+    Recompute one provider and store its results.
+
+    Returns:
+        dict: The cache entry ({'items': [...], 'fresh_until': timestamp}), None if the provider failed
+    """
+    started = time.perf_counter()
+    try:
+        items = provider.func()
+    except Exception:
+        logger.exception('Recommendation provider %s failed', provider.name)
+        return None
+    elapsed = time.perf_counter() - started
+    if elapsed > provider.budget:
+        logger.warning('Recommendation provider %s took %.3fs (budget %.3fs)', provider.name, elapsed, provider.budget)
+
+    entry = {'items': items, 'fresh_until': time.time() + provider.ttl}
+    try:
+        cache.set(CACHE_PREFIX + provider.name, entry, provider.ttl + STALE_FOR)
+    except Exception:
+        pass
+    return entry
+
+
+def schedule_refresh(provider):
+    """Recompute a provider after the current response, unless another worker already is"""
+    try:
+        claimed = cache.add(f'{CACHE_PREFIX}{provider.name}:refreshing', True, REFRESH_LOCK_TIMEOUT)
+    except Exception:
+        # Cache might not be configured - refresh anyway
+        claimed = True
+    if claimed:
+        _pending_refreshes().add(provider.name)
+
+
+def _pending_refreshes():
+    if not hasattr(_local, 'pending'):
+        _local.pending = set()
+    return _local.pending
+
+
+def refresh_pending_recommendations():
+    """Recompute the providers scheduled by this thread (called once the response is sent)"""
+    pending = _pending_refreshes()
+    names = sorted(pending)
+    pending.clear()
+    for name in names:
+        refresh_provider(PROVIDERS[name])
+        try:
+            cache.delete(f'{CACHE_PREFIX}{name}:refreshing')
+        except Exception:
+            # Silently fail - the claim expires on its own
+            pass
+
+
+@register_provider('meetings', ttl=300, budget=0.05)
 def get_meeting_recommendations():
     """Get recommendations related to meetings with scheduling insights"""
     recommendations = []
+    today = date.today()
+    last_three_months = today - timedelta(days=90)
     
-    # Check if no meetings scheduled for next 30 days
-    upcoming_meetings = MeetingInfo.objects.filter(
-        meeting_date__gte=date.today(),
-        meeting_date__lte=date.today() + timedelta(days=30)
-    ).count()
+    # Upcoming, recent and overall meeting figures in one query, so the count doesn't depend on the data
+    counts = MeetingInfo.objects.aggregate(
+        upcoming=Count('meeting_id', filter=Q(meeting_date__gte=today, meeting_date__lte=today + timedelta(days=30))),
+        recent=Count('meeting_id', filter=Q(meeting_date__gte=last_three_months)),
+        total=Count('meeting_id'),
+        first_date=Min('meeting_date'),
+        last_date=Max('meeting_date'),
+    )
     
-    if upcoming_meetings == 0:
+    # Check if no meetings scheduled for next 30 days
+    if counts['upcoming'] == 0:
         # Check average meeting frequency
-        all_meetings = MeetingInfo.objects.all().order_by('meeting_date')
-        if all_meetings.count() > 1:
-            first_meeting = all_meetings.first()
-            last_meeting = all_meetings.last()
-            if first_meeting and last_meeting:
-                days_diff = (last_meeting.meeting_date - first_meeting.meeting_date).days
-                avg_days = days_diff / all_meetings.count() if all_meetings.count() > 0 else 30
-                
-                recommendations.append({
-                    'type': 'warning',
-                    'title': 'Schedule Upcoming Meeting',
-                    'message': f'No meetings scheduled for the next 30 days. Based on your average meeting frequency ({avg_days:.0f} days), it\'s time to schedule the next meeting.',
-                    'action': 'Add Meeting',
-                    'url': '/meeting/add/',
-                    'priority': 9,
-                    'icon': 'calendar-plus'
-                })
+        if counts['total'] > 1:
+            days_diff = (counts['last_date'] - counts['first_date']).days
+            avg_days = days_diff / counts['total']
+            
+            recommendations.append({
+                'type': 'warning',
+                'title': 'Schedule Upcoming Meeting',
+                'message': f'No meetings scheduled for the next 30 days. Based on your average meeting frequency ({avg_days:.0f} days), it\'s time to schedule the next meeting.',
+                'action': 'Add Meeting',
+                'url': '/meeting/add/',
+                'priority': 9,
+                'icon': 'calendar-plus'
+            })
         else:
             recommendations.append({
                 'type': 'info',
@@ -84,10 +189,11 @@ def get_meeting_recommendations():
     recent_meetings = MeetingInfo.objects.filter(
         meeting_date__lte=date.today(),
         meeting_date__gte=date.today() - timedelta(days=7)
-    )
+    ).select_related('summary')
     
     for meeting in recent_meetings:
-        attendance_count = MemberAttendance.objects.filter(meeting_date=meeting).count()
+        summary = getattr(meeting, 'summary', None)  # Meetings without a stored summary have no attendance
+        attendance_count = summary.total_count if summary else 0
         if attendance_count == 0:
             recommendations.append({
                 'type': 'warning',
@@ -101,11 +207,7 @@ def get_meeting_recommendations():
             break  # Only show one at a time
     
     # Meeting frequency optimization
-    today = date.today()
-    last_three_months = today - timedelta(days=90)
-    recent_meeting_count = MeetingInfo.objects.filter(
-        meeting_date__gte=last_three_months
-    ).count()
+    recent_meeting_count = counts['recent']
     
     if recent_meeting_count < 2:
         recommendations.append({
@@ -121,6 +223,7 @@ def get_meeting_recommendations():
     return recommendations
 
 
+@register_provider('members', ttl=900, budget=0.05)
 def get_member_recommendations():
     """Get recommendations related to members with growth insights"""
     recommendations = []
@@ -211,6 +314,7 @@ def get_member_recommendations():
     return recommendations
 
 
+@register_provider('attendance', ttl=900, budget=0.2)
 def get_attendance_recommendations():
     """Get recommendations related to attendance with trend analysis"""
     recommendations = []
@@ -278,32 +382,16 @@ def get_attendance_recommendations():
                 'icon': 'arrow-up'
             })
     
-    # Check for members with declining attendance
-    active_members = Member.objects.filter(member_is_active=True)
-    declining_members = []
-    for member in active_members[:10]:  # Check first 10
-        recent_count = MemberAttendance.objects.filter(
-            member_id=member,
-            meeting_date__meeting_date__gte=three_months_ago,
-            attendance_status=True
-        ).count()
-        previous_count = MemberAttendance.objects.filter(
-            member_id=member,
-            meeting_date__meeting_date__gte=six_months_ago,
-            meeting_date__meeting_date__lt=three_months_ago,
-            attendance_status=True
-        ).count()
-        
-        if previous_count > 0 and recent_count < previous_count * 0.7:  # 30% decline
-            declining_members.append(member)
+    # Check for members with declining attendance (30% drop, over the whole membership)
+    declining_count = len(declining_members(days=90))
     
-    if len(declining_members) >= 3:
+    if declining_count >= 3:
         recommendations.append({
             'type': 'warning',
             'title': 'Multiple Members Showing Declining Attendance',
-            'message': f'{len(declining_members)} members have shown declining attendance. Consider reaching out to understand their needs and improve engagement.',
-            'action': 'View Members',
-            'url': '/member/list/',
+            'message': f'{declining_count} members have shown declining attendance. Consider reaching out to understand their needs and improve engagement.',
+            'action': 'View Report',
+            'url': '/reports/declining-attendance/',
             'priority': 7,
             'icon': 'user-friends'
         })
@@ -311,30 +399,24 @@ def get_attendance_recommendations():
     return recommendations
 
 
+@register_provider('payments', ttl=600, budget=0.1)
 def get_payment_recommendations():
     """Get recommendations related to payments with trend analysis"""
     recommendations = []
     
-    # Check for unpaid fees
-    unpaid_fees = MemberAttendance.objects.filter(
-        attendance_status=True,
-        attendance_fee_status=False
-    ).select_related('meeting_date').aggregate(
-        total=Sum('meeting_date__meeting_fee')
-    )['total'] or 0
+    # Check for unpaid fees (from the member ledgers)
+    dues = ledger_totals()
+    unpaid_fees = dues['total_outstanding']
     
     if unpaid_fees > 0:
-        unpaid_count = MemberAttendance.objects.filter(
-            attendance_status=True,
-            attendance_fee_status=False
-        ).values('member_id').distinct().count()
+        unpaid_count = dues['members_in_arrears']
         
         recommendations.append({
             'type': 'warning',
             'title': f'Collect Outstanding Fees',
             'message': f'Rs. {unpaid_fees:,} in unpaid fees from {unpaid_count} member(s). Implement payment reminders or flexible payment plans to improve collection rate.',
-            'action': 'View Payments',
-            'url': '/payment/list/',
+            'action': 'View Arrears',
+            'url': '/payment/arrears/',
             'priority': 8,
             'icon': 'money-bill-wave'
         })
@@ -387,33 +469,40 @@ def get_payment_recommendations():
     return recommendations
 
 
+@register_provider('badges', ttl=1800, budget=0.1)
 def get_badge_recommendations():
     """Get recommendations related to badges"""
     recommendations = []
     
-    # Check for members close to earning badges
-    active_members = Member.objects.filter(member_is_active=True)
-    
-    for member in active_members[:5]:  # Check first 5 active members
-        badges = MemberBadge.objects.filter(member=member)
-        if badges.count() == 0:
-            # Check if they're close to earning a badge
-            attendances = MemberAttendance.objects.filter(
-                member_id=member,
-                attendance_status=True
-            ).count()
-            
-            if attendances >= 3:
-                recommendations.append({
-                    'type': 'badge',
-                    'title': 'Award Badges',
-                    'message': f'{member.member_first_name} {member.member_last_name} may qualify for badges. Check their achievements.',
-                    'action': 'View Member',
-                    'url': f'/member/view/{member.member_id}',
-                    'priority': 3,
-                    'icon': 'award'
-                })
-                break  # Only show one at a time
+    # Check for members close to earning badges (3+ meetings attended, no badge yet)
+    candidates = Member.objects.filter(
+        member_is_active=True,
+        badges__isnull=True,
+        attendance_state__attended_count__gte=3,
+    )
+    candidate_count = candidates.count()
+    
+    if candidate_count == 1:
+        member = candidates.get()
+        recommendations.append({
+            'type': 'badge',
+            'title': 'Award Badges',
+            'message': f'{member.member_first_name} {member.member_last_name} may qualify for badges. Check their achievements.',
+            'action': 'View Member',
+            'url': f'/member/view/{member.member_id}',
+            'priority': 3,
+            'icon': 'award'
+        })
+    elif candidate_count:
+        recommendations.append({
+            'type': 'badge',
+            'title': 'Award Badges',
+            'message': f'{candidate_count} members have attended 3 or more meetings without earning a badge. Check their achievements.',
+            'action': 'View Members',
+            'url': '/member/list/',
+            'priority': 3,
+            'icon': 'award'
+        })
     
     return recommendations
 
@@ -0,0 +1,287 @@
+"""
+Per-request performance metrics
+Counts database queries and time, cache hits and misses, template render time
+and view time for each request. They are sent back in a Server-Timing header
+and added to the request's JSON audit record, and requests slower than
+SLOW_REQUEST_MS also log their slowest SQL statements.
+
+A streamed body (e.g. a CSV export) runs its queries while it is sent, so it
+is measured too, and the request is logged and checked once the body has been
+consumed. Its headers are sent first, so it has no Server-Timing header.
+
+With QUERY_REPEAT_CHECK on, a SELECT run QUERY_REPEAT_THRESHOLD or more times
+with the same shape in one request (an N+1 loop) is logged, or raised as
+RepeatedQueriesError - the test runner (app.test_runner) turns that on.
+"""
+import heapq
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack
+from contextvars import ContextVar
+from django.conf import settings
+from django.db import connections
+from django.template.backends.django import DjangoTemplates, Template
+from .audit_logger import audit_log
+
+
+SLOW_SQL_LENGTH = 500  # Characters of each slow statement that are logged
+PLACEHOLDER_LIST = re.compile(r'\bIN \(%s(?:\s*,\s*%s)*\)', re.IGNORECASE)
+
+_current = ContextVar('request_metrics', default=None)
+
+
+class RepeatedQueriesError(Exception):
+    """A request ran the same query shape too many times (see QUERY_REPEAT_CHECK)"""
+
+
+def query_shape(sql):
+    """SQL with IN (...) placeholder lists collapsed, so the same query with more IDs has the same shape"""
+    return PLACEHOLDER_LIST.sub('IN (%s...)', sql)
+
+
+class RequestMetrics:
+    """Counters for one request, kept in a ContextVar while it is handled"""
+
+    def __init__(self, keep_slowest=5, track_shapes=False):
+        self.started = time.perf_counter()
+        self.db_queries = 0
+        self.db_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.template_time = 0.0
+        self.view_started = None
+        self.view_finished = None
+        self.keep_slowest = keep_slowest
+        self.slowest = []  # min-heap of (seconds, sql)
+        self.shapes = Counter() if track_shapes else None  # SELECT shape -> times run
+        self.finish_callbacks = []  # Run once a streamed body has been consumed
+        self._template_depth = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        """Database execute wrapper (see connection.execute_wrapper)"""
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            self.db_queries += 1
+            self.db_time += duration
+            if self.keep_slowest:
+                entry = (duration, sql)
+                if len(self.slowest) < self.keep_slowest:
+                    heapq.heappush(self.slowest, entry)
+                elif entry > self.slowest[0]:
+                    heapq.heapreplace(self.slowest, entry)
+            if self.shapes is not None and sql.lstrip()[:6].upper() == 'SELECT':
+                self.shapes[query_shape(sql)] += 1
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    @property
+    def view_time(self):
+        """Seconds since the view was called (until the response got back here), 0 if it was not"""
+        if self.view_started is None:
+            return 0.0
+        return (self.view_finished or time.perf_counter()) - self.view_started
+
+    def repeated_queries(self, threshold):
+        """
+        SELECT shapes run at least `threshold` times, most repeated first.
+
+        Returns:
+            list: (times run, shape) tuples
+        """
+        if self.shapes is None:
+            return []
+        return sorted(
+            ((count, shape) for shape, count in self.shapes.items() if count >= threshold),
+            reverse=True,
+        )
+
+    def slowest_queries(self):
+        """Slowest statements, slowest first (parameters are left out of the log)"""
+        return [
+            {'duration_ms': round(duration * 1000, 2), 'sql': sql[:SLOW_SQL_LENGTH]}
+            for duration, sql in sorted(self.slowest, reverse=True)
+        ]
+
+    def as_dict(self):
+        """Metrics as audit record fields (times in milliseconds)"""
+        return {
+            'duration_ms': round(self.elapsed() * 1000, 2),
+            'db_queries': self.db_queries,
+            'db_time_ms': round(self.db_time * 1000, 2),
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses,
+            'template_time_ms': round(self.template_time * 1000, 2),
+            'view_time_ms': round(self.view_time * 1000, 2),
+        }
+
+    def server_timing(self):
+        """Server-Timing header value"""
+        return ', '.join([
+            f'db;dur={self.db_time * 1000:.1f};desc="{self.db_queries} queries"',
+            f'cache;desc="{self.cache_hits} hits, {self.cache_misses} misses"',
+            f'template;dur={self.template_time * 1000:.1f}',
+            f'view;dur={self.view_time * 1000:.1f}',
+            f'total;dur={self.elapsed() * 1000:.1f}',
+        ])
+
+
+def streams_lazily(response):
+    """Whether the response body is generated while it is sent (files are not)"""
+    return response.streaming and getattr(response, 'file_to_stream', None) is None
+
+
+def get_request_metrics():
+    """Metrics of the request being handled, or None outside a request"""
+    return _current.get()
+
+
+def record_cache_lookup(hit):
+    """Count one cache read for the current request"""
+    metrics = _current.get()
+    if metrics is not None:
+        if hit:
+            metrics.cache_hits += 1
+        else:
+            metrics.cache_misses += 1
+
+
+class TimedTemplate(Template):
+    """Template that adds its render time to the current request's metrics"""
+
+    def render(self, context=None, request=None):
+        metrics = _current.get()
+        if metrics is None:
+            return super().render(context, request)
+        # Only the outermost render is counted, so nested renders are not added twice
+        metrics._template_depth += 1
+        start = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            metrics._template_depth -= 1
+            if not metrics._template_depth:
+                metrics.template_time += time.perf_counter() - start
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """Django template backend whose templates are timed (see TimedTemplate)"""
+
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code).template, self)
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name).template, self)
+
+
+class RequestMetricsMiddleware:
+    """
+    Collect RequestMetrics for every request.
+
+    Should be the first middleware so the time and queries of all the others
+    are included.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.REQUEST_METRICS_ENABLED:
+            return self.get_response(request)
+
+        repeat_check = settings.QUERY_REPEAT_CHECK
+        metrics = RequestMetrics(keep_slowest=settings.SLOW_REQUEST_QUERY_COUNT, track_shapes=repeat_check != 'off')
+        request.metrics = metrics
+        response = self.measured(metrics, self.get_response, request)
+        metrics.view_finished = time.perf_counter()
+
+        if streams_lazily(response):
+            response.streaming_content = self.stream(request, response, metrics, response.streaming_content)
+            return response
+
+        if settings.SERVER_TIMING_HEADER:
+            response['Server-Timing'] = metrics.server_timing()
+        self.finish(request, response, metrics)
+        return response
+
+    @staticmethod
+    def measured(metrics, func, *args):
+        """Call func with metrics current and counting the queries of every connection"""
+        token = _current.set(metrics)
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(metrics))
+                return func(*args)
+        finally:
+            _current.reset(token)
+
+    def stream(self, request, response, metrics, content):
+        """Yield a streamed body chunk by chunk, then finish the request's metrics"""
+        content = iter(content)
+        try:
+            while True:
+                chunk = self.measured(metrics, next, content, None)
+                if chunk is None:
+                    return
+                yield chunk
+        finally:
+            self.finish(request, response, metrics)
+
+    def finish(self, request, response, metrics):
+        """Log the request (via finish_callbacks), a slow request and repeated queries"""
+        for callback in metrics.finish_callbacks:
+            callback()
+
+        if metrics.elapsed() * 1000 >= settings.SLOW_REQUEST_MS:
+            try:
+                audit_log(
+                    request=request,
+                    action='slow_request',
+                    severity='WARNING',
+                    target=None,
+                    extra_details={
+                        'status_code': response.status_code,
+                        **metrics.as_dict(),
+                        'slowest_queries': metrics.slowest_queries(),
+                    }
+                )
+            except Exception:
+                # Don't let logging errors break the application
+                pass
+
+        if metrics.shapes is not None:
+            self.check_repeated_queries(request, metrics, settings.QUERY_REPEAT_CHECK)
+
+    def check_repeated_queries(self, request, metrics, mode):
+        """Report SELECTs repeated QUERY_REPEAT_THRESHOLD or more times ('log' or 'raise')"""
+        repeated = metrics.repeated_queries(settings.QUERY_REPEAT_THRESHOLD)
+        if not repeated:
+            return
+        if mode == 'raise':
+            lines = '\n'.join(f'  {count}x {shape[:SLOW_SQL_LENGTH]}' for count, shape in repeated)
+            raise RepeatedQueriesError(f'{request.method} {request.path} repeated queries (N+1?):\n{lines}')
+        try:
+            audit_log(
+                request=request,
+                action='repeated_queries',
+                severity='WARNING',
+                target=None,
+                extra_details={
+                    'repeated_queries': [{'count': count, 'sql': shape[:SLOW_SQL_LENGTH]} for count, shape in repeated],
+                }
+            )
+        except Exception:
+            # Don't let logging errors break the application
+            pass
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        """Start the view timer once the URL has been resolved to a view"""
+        metrics = getattr(request, 'metrics', None)
+        if metrics is not None:
+            metrics.view_started = time.perf_counter()
+        return None
@@ -8,6 +8,7 @@ from django.utils.deprecation import MiddlewareMixin
 from django.conf import settings
 import logging
 from .audit_logger import audit_log_security_event
+from .rate_limit import RouteTable, hit
 
 logger = logging.getLogger('security')
 
@@ -78,50 +79,44 @@ class RateLimitMiddleware(MiddlewareMixin):
     """
     Rate limiting middleware
     OWASP: Identification and Authentication Failures
+    Limits come from settings.RATE_LIMITS and are counted per client IP in
+    the database, so they hold across all worker processes
     """
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        # Compiled once per process
+        self.routes = RouteTable(getattr(settings, 'RATE_LIMITS', []))
+    
     def process_request(self, request):
-        # Skip rate limiting for static files and admin
-        if request.path.startswith('/static/') or request.path.startswith('/media/'):
+        rule = self.routes.match(request.path)
+        if rule is None:
             return None
         
-        # Different rate limits for different endpoints
-        rate_limits = {
-            '/login/': (5, 300),  # 5 attempts per 5 minutes
-            '/staff/register/': (3, 600),  # 3 attempts per 10 minutes
-            '/member/register/': (10, 60),  # 10 attempts per minute
-            '/attendance/mark/': (20, 60),  # 20 attempts per minute
-        }
+        ip_address = self.get_client_ip(request)
+        try:
+            count = hit(f'{rule.prefix}:{ip_address}', rule.window)
+        except Exception:
+            # Silently fail - never block requests because the counter store is unavailable
+            return None
         
-        for path, (max_requests, window) in rate_limits.items():
-            if request.path.startswith(path):
-                ip_address = self.get_client_ip(request)
-                cache_key = f'rate_limit:{path}:{ip_address}'
-                
-                # Get current count
-                current_count = cache.get(cache_key, 0)
-                
-                if current_count >= max_requests:
-                    # Log using audit logger
-                    audit_log_security_event(
-                        request=request,
-                        event_type='rate_limit_exceeded',
-                        severity='WARNING',
-                        target=path,
-                        extra_details={
-                            'ip_address': ip_address,
-                            'max_requests': max_requests,
-                            'window_seconds': window,
-                        }
-                    )
-                    logger.warning(f'Rate limit exceeded for {ip_address} on {path}')
-                    return HttpResponseForbidden(
-                        'Too many requests. Please try again later.',
-                        content_type='text/plain'
-                    )
-                
-                # Increment counter
-                cache.set(cache_key, current_count + 1, window)
-                break
+        if count > rule.max_requests:
+            # Log using audit logger
+            audit_log_security_event(
+                request=request,
+                event_type='rate_limit_exceeded',
+                severity='WARNING',
+                target=rule.prefix,
+                extra_details={
+                    'ip_address': ip_address,
+                    'max_requests': rule.max_requests,
+                    'window_seconds': rule.window,
+                }
+            )
+            logger.warning(f'Rate limit exceeded for {ip_address} on {rule.prefix}')
+            return HttpResponseForbidden(
+                'Too many requests. Please try again later.',
+                content_type='text/plain'
+            )
         
         return None
     
@@ -1,93 +1,212 @@
 """
-Django signals for automatic member deactivation and badge awarding
+Django signals for meeting summaries, member attendance state, member ledgers,
+automatic member deactivation, badge awarding, payment statistics, engagement
+scores, the batched activity log and stale recommendations
 """
-from django.db.models.signals import post_save
+from django.core.signals import request_finished
+from django.db.models.signals import post_save, post_delete, pre_delete
 from django.dispatch import receiver
-from django.core.cache import cache
-from .models import MemberAttendance, Member
-from .utils import check_and_deactivate_inactive_members
-from .constants import CONSECUTIVE_MEETINGS_FOR_DEACTIVATION
-from .gamification import check_and_award_badges
-
-
-# Cache key to prevent running the check too frequently
-CACHE_KEY_DEACTIVATION_CHECK = 'last_deactivation_check'
-CACHE_TIMEOUT = 300  # 5 minutes - prevents running check more than once per 5 minutes
+from .models import MemberAttendance, Member, MeetingInfo, MeetingSummary, MemberLedger, Payment
+from . import activity_log, attendance_followup, engagement, meeting_summary, member_ledger, member_state, payment_stats, recommendations
 
 
 @receiver(post_save, sender=MemberAttendance)
-def auto_deactivate_inactive_members(sender, instance, created, **kwargs):
+def update_attendance_aggregates_on_save(sender, instance, created, raw=False, **kwargs):
     """
-    Automatically check and deactivate members who missed 3 consecutive meetings
-    after attendance is saved.
-    
-    This runs in the background automatically without needing cron jobs.
-    Uses caching to prevent running too frequently.
+    Keep MeetingSummary counters and MemberAttendanceState in step with attendance changes.
     
-    Works in shared hosting/cPanel environments - no cron jobs needed!
+    Runs inside the save transaction (MemberAttendance.save is atomic), so errors
+    propagate and roll back the attendance change rather than leaving stale counters.
     """
-    try:
-        # Check cache to prevent running too frequently
-        # If cache is not available, it will return None and proceed
-        cache_value = None
-        try:
-            cache_value = cache.get(CACHE_KEY_DEACTIVATION_CHECK)
-        except Exception:
-            # Cache might not be configured - continue anyway
-            pass
-        
-        if cache_value:
-            return
-        
-        # Run the deactivation check
-        result = check_and_deactivate_inactive_members(
-            consecutive_meetings=CONSECUTIVE_MEETINGS_FOR_DEACTIVATION,
-            dry_run=False
-        )
-        
-        # Set cache to prevent running again for 5 minutes
-        try:
-            cache.set(CACHE_KEY_DEACTIVATION_CHECK, True, CACHE_TIMEOUT)
-        except Exception:
-            # If cache fails, continue anyway
-            pass
-        
-        # Log if members were deactivated (optional - can be removed if not needed)
-        if result['deactivated_count'] > 0:
-            # You can add logging here if needed
-            pass
-            
-    except Exception:
-        # Silently fail to not interrupt the attendance saving process
-        # This ensures attendance saving always works, even if deactivation check fails
-        pass
+    if raw:
+        return
+    previous = None if created else getattr(instance, '_counted_state', None)
+    current = instance.counted_state()
+    instance._counted_state = current
+    batch = attendance_followup.current_batch()
+    if batch is not None:
+        # Recomputed once when the bulk operation finishes
+        batch.track(*current[:2])
+        if previous is not None:
+            batch.track(*previous[:2])
+        return
+    meeting_summary.record_attendance_saved(previous, current, created)
+    member_state.record_attendance_saved(previous, current, created)
+    member_ledger.record_attendance_saved(previous, current, created)
+
+
+@receiver(post_delete, sender=MemberAttendance)
+def update_attendance_aggregates_on_delete(sender, instance, origin=None, **kwargs):
+    """Remove a deleted attendance row from its meeting's counters, member's state and ledger"""
+    state = instance.counted_state()
+    # Deleting a meeting rebuilds every state and the attendees' ledgers, and
+    # deleting a member drops both, so rows cascading from either only need
+    # the meeting counters
+    cascaded = getattr(origin, 'model', type(origin)) in (MeetingInfo, Member)
+    batch = attendance_followup.current_batch()
+    if batch is not None and not cascaded:
+        batch.track(*state[:2])
+        return
+    meeting_summary.record_attendance_deleted(state)
+    if not cascaded:
+        member_state.record_attendance_deleted(state)
+        member_ledger.record_attendance_deleted(state)
+
+
+@receiver(post_save, sender=MeetingInfo)
+def create_meeting_summary(sender, instance, created, raw=False, **kwargs):
+    """Create the summary row for new meetings and re-price revenue on fee changes"""
+    if raw:
+        return
+    if created:
+        MeetingSummary.objects.get_or_create(meeting=instance)
+    else:
+        meeting_summary.refresh_fee_revenue(instance)
+
+
+@receiver(post_save, sender=MeetingInfo)
+def reprice_member_ledgers(sender, instance, created, raw=False, **kwargs):
+    """A changed fee changes what every attendee of the meeting owes"""
+    if raw or created:
+        return
+    member_ledger.record_fee_changed(instance)
+
+
+@receiver(post_save, sender=MeetingInfo)
+def advance_member_states(sender, instance, created, raw=False, **kwargs):
+    """Count a new latest meeting as missed by everyone, or rebuild after reordering"""
+    if raw:
+        return
+    member_state.record_meeting_saved(instance, created)
+
+
+@receiver(post_delete, sender=MeetingInfo)
+def rebuild_member_states_on_meeting_delete(sender, instance, **kwargs):
+    """Removing a meeting changes every member's streak history"""
+    member_state.schedule_full_rebuild()
+
+
+@receiver(pre_delete, sender=MeetingInfo)
+def collect_ledgers_on_meeting_delete(sender, instance, **kwargs):
+    """Remember who attended or paid for the meeting before its rows cascade away"""
+    instance._ledger_member_ids = member_ledger.affected_member_ids(instance)
+
+
+@receiver(post_delete, sender=MeetingInfo)
+def rebuild_ledgers_on_meeting_delete(sender, instance, **kwargs):
+    """Recompute the ledgers of everyone who attended or paid for a deleted meeting"""
+    member_ids = getattr(instance, '_ledger_member_ids', None)
+    if member_ids:
+        member_ledger.rebuild_ledgers(member_ids)
+
+
+@receiver(post_save, sender=Member)
+def create_member_state(sender, instance, created, raw=False, **kwargs):
+    """New members start with every past meeting counted as missed"""
+    if raw or not created:
+        return
+    member_state.rebuild_member_states([instance.member_id])
+
+
+@receiver(post_save, sender=Member)
+def create_member_ledger(sender, instance, created, raw=False, **kwargs):
+    """New members start with an empty ledger"""
+    if raw or not created:
+        return
+    MemberLedger.objects.get_or_create(member=instance)
 
 
 @receiver(post_save, sender=MemberAttendance)
-def auto_award_badges(sender, instance, created, **kwargs):
+def queue_attendance_followup(sender, instance, created, raw=False, **kwargs):
     """
-    Automatically check and award badges when attendance is saved
+    Queue the member for the inactive-member check and badge evaluation.
+    
+    Runs once per transaction after commit (see attendance_followup), so a
+    bulk save of many rows is processed in one deduplicated pass.
     """
-    try:
-        member = instance.member_id
-        if member and member.member_is_active:
-            # Check and award badges
-            newly_awarded = check_and_award_badges(member)
-            # Badges are automatically created, no need to do anything else
-    except Exception:
-        # Silently fail to not interrupt the attendance saving process
-        pass
+    if raw:
+        return
+    attendance_followup.queue_member_followup(instance.member_id_id)
 
 
 @receiver(post_save, sender=Member)
-def check_membership_badges_on_save(sender, instance, created, **kwargs):
+def check_membership_badges_on_save(sender, instance, created, raw=False, **kwargs):
     """
     Check and award membership-related badges when member is saved
     """
-    try:
-        if instance.member_is_active:
-            check_and_award_badges(instance)
-    except Exception:
-        # Silently fail
-        pass
+    if raw:
+        return
+    attendance_followup.queue_member_followup(instance.member_id)
+
+
+@receiver(post_save, sender=Payment)
+@receiver(post_delete, sender=Payment)
+def invalidate_payment_stats(sender, instance, raw=False, **kwargs):
+    """Drop the cached payment statistics for the payment's year"""
+    if raw:
+        return
+    payment_stats.invalidate_payment_stats(instance)
+
+
+@receiver(post_save, sender=Member)
+def invalidate_payment_stats_on_rename(sender, instance, created, raw=False, **kwargs):
+    """Drop the cached payment statistics that list a renamed member"""
+    if raw or created:
+        return
+    name = (instance.member_first_name, instance.member_last_name)
+    if getattr(instance, '_loaded_name', None) != name:
+        payment_stats.invalidate_member_payment_stats(instance)
+    instance._loaded_name = name
+
+
+@receiver(post_save, sender=MeetingInfo)
+@receiver(post_delete, sender=MeetingInfo)
+@receiver(post_delete, sender=Member)
+@receiver(post_delete, sender=MemberAttendance)
+def invalidate_engagement_scores(sender, instance, raw=False, origin=None, **kwargs):
+    """
+    Drop the cached engagement scores.
+    
+    Saved attendance and members already drop them in the follow-up after
+    commit (see attendance_followup), as do deletes inside a bulk operation.
+    Rows cascading from a meeting or member delete are covered by that delete.
+    """
+    if raw:
+        return
+    if sender is MemberAttendance and (
+        attendance_followup.current_batch() is not None
+        or getattr(origin, 'model', type(origin)) in (MeetingInfo, Member)
+    ):
+        return
+    engagement.invalidate_engagement_scores()
+
+
+@receiver(post_save, sender=Payment)
+def update_ledger_on_payment_save(sender, instance, created, raw=False, **kwargs):
+    """Add a new or edited payment to its member's ledger"""
+    if raw:
+        return
+    previous = None if created else getattr(instance, '_ledger_state', None)
+    member_ledger.record_payment_saved(previous, instance, created)
+    instance._ledger_state = instance.ledger_state()
+
+
+@receiver(post_delete, sender=Payment)
+def update_ledger_on_payment_delete(sender, instance, origin=None, **kwargs):
+    """Remove a deleted payment from its member's ledger"""
+    # Member deletes drop the ledger and meeting deletes rebuild it
+    if getattr(origin, 'model', type(origin)) in (MeetingInfo, Member):
+        return
+    member_ledger.record_payment_deleted(instance)
+
+
+@receiver(request_finished)
+def flush_activity_log(sender, **kwargs):
+    """Write buffered audit events once the batch is full or old enough"""
+    activity_log.flush_activity()
+
 
+@receiver(request_finished)
+def refresh_stale_recommendations(sender, **kwargs):
+    """Recompute the stale recommendation providers this request served, after its response"""
+    recommendations.refresh_pending_recommendations()
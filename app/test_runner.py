@@ -0,0 +1,62 @@
+"""
+Test runner that fails requests with N+1 queries
+"""
+import logging
+import os
+import shutil
+import tempfile
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class QueryCheckingTestRunner(DiscoverRunner):
+    """
+    DiscoverRunner with QUERY_REPEAT_CHECK set to 'raise', so a view that runs
+    the same SELECT QUERY_REPEAT_THRESHOLD times in one test request raises
+    RepeatedQueriesError.
+
+    The shared cache is swapped for process memory, so tests neither read
+    nor clear the file cache of a server running on the same host, and log
+    files are written to a temporary directory instead of logs/.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._saved_repeat_check = settings.QUERY_REPEAT_CHECK
+        settings.QUERY_REPEAT_CHECK = 'raise'
+        self._test_caches = override_settings(CACHES={
+            **settings.CACHES,
+            'shared': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'mms-tests'},
+        })
+        self._test_caches.enable()
+        self._log_dir = tempfile.mkdtemp(prefix='mms-test-logs-')
+        self._log_files = {handler: handler.baseFilename for handler in file_handlers()}
+        for handler in self._log_files:
+            move_log_file(handler, os.path.join(self._log_dir, os.path.basename(handler.baseFilename)))
+
+    def teardown_test_environment(self, **kwargs):
+        for handler, filename in self._log_files.items():
+            move_log_file(handler, filename)
+        shutil.rmtree(self._log_dir, ignore_errors=True)
+        self._test_caches.disable()
+        settings.QUERY_REPEAT_CHECK = self._saved_repeat_check
+        super().teardown_test_environment(**kwargs)
+
+
+def file_handlers():
+    """FileHandlers of all configured loggers"""
+    loggers = [logging.getLogger()] + [
+        logger for logger in logging.Logger.manager.loggerDict.values() if isinstance(logger, logging.Logger)
+    ]
+    return {handler for logger in loggers for handler in logger.handlers if isinstance(handler, logging.FileHandler)}
+
+
+def move_log_file(handler, filename):
+    """Point a FileHandler at another file (opened on its next record)"""
+    handler.acquire()
+    try:
+        handler.close()
+        handler.baseFilename = filename
+    finally:
+        handler.release()
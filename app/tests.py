@@ -1,3 +1,1623 @@
-from django.test import TestCase
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+from datetime import date, timedelta
+from decimal import Decimal
 
-# Create your tests here.
+from io import BytesIO, StringIO
+from unittest import mock
+
+from openpyxl import load_workbook
+from pypdf import PdfReader
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection, transaction
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .attendance_analytics import declining_members, member_window_counts, window_meetings
+from .attendance_followup import CACHE_KEY_DEACTIVATION_CHECK, bulk_attendance_changes
+from . import activity_log, recommendations, request_metrics
+from .activity_log import flush_activity
+from .audit_logger import AuditEvent, AuditPipeline, JSONAuditFormatter, audit_log_security_event, audit_log_user_action
+from .bulk_attendance import mark_all_present
+from .dashboard_stats import get_dashboard_stats
+from .engagement import CACHE_KEY as ENGAGEMENT_CACHE_KEY, compute_engagement_scores, get_engagement_scores
+from .export_jobs import STALE_AFTER, claim_next_job, cleanup_expired_jobs, create_export_job, process_jobs
+from .export_utils import (
+    MEETING_COLUMNS, MEMBER_ATTENDANCE_COLUMNS, MEMBER_COLUMNS, export_attendance_excel, export_members_csv, export_members_excel,
+    export_members_pdf, export_rows, select_columns, write_members_pdf,
+)
+from .gamification import check_and_award_badges, check_attendance_streak, evaluate_badges
+from .meeting_summary import verify_meeting_summaries
+from .member_ledger import verify_ledgers
+from .pagination import KeysetPaginator
+from .rate_limit import RouteTable, hit, purge_expired
+from .search_utils import search_members
+from .recommendations import get_smart_recommendations
+from .request_metrics import RepeatedQueriesError, RequestMetrics, record_cache_lookup
+from .two_tier_cache import TwoTierCache
+from .payment_stats import get_payment_stats
+from .member_state import record_attendance_saved, verify_member_states
+from .utils import calculate_member_engagement_score, check_and_deactivate_inactive_members
+from .models import BadgeType, Member, MeetingInfo, MeetingSummary, MemberAttendance, MemberAttendanceState, MemberBadge, MemberLedger, Payment, ExportJob, ActivityLog, RateLimitCounter
+
+
+def make_member(member_id, dob=date(1990, 1, 1), is_active=True, **kwargs):
+    fields = {
+        'member_initials': 'A',
+        'member_first_name': f'First{member_id}',
+        'member_last_name': f'Last{member_id}',
+        'member_address': 'Colombo',
+        'member_tp_number': '0771234567',
+        'member_acc_number': '1234',
+        'member_guardian_name': 'Guardian',
+        **kwargs,
+    }
+    return Member.objects.create(member_id=member_id, member_dob=dob, member_is_active=is_active, **fields)
+
+
+class ClearedCacheTestCase(TestCase):
+    """
+    Starts every test from an empty cache, with the inactive-member check
+    marked as just run so it doesn't fire while fixtures are created
+    """
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        cache.set(CACHE_KEY_DEACTIVATION_CHECK, True, 3600)
+
+
+def make_meeting(meeting_date, fee=100):
+    return MeetingInfo.objects.create(meeting_date=meeting_date, meeting_fee=fee)
+
+
+def mark(meeting, member, present=True, paid=False):
+    return MemberAttendance.objects.create(
+        meeting_date=meeting,
+        member_id=member,
+        attendance_status=present,
+        attendance_fee_status=paid,
+    )
+
+
+class DashboardStatsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        today = date.today()
+        # Run the post-commit badge pass as production would
+        with self.captureOnCommitCallbacks(execute=True):
+            self.adult = make_member('M001')
+            self.minor = make_member('M002', dob=today - timedelta(days=365 * 10))
+            self.inactive = make_member('M003', is_active=False)
+            self.recent = make_meeting(today - timedelta(days=10), fee=200)
+            self.older = make_meeting(today - timedelta(days=40), fee=100)
+            mark(self.recent, self.adult, present=True, paid=True)
+            mark(self.recent, self.minor, present=True, paid=False)
+            mark(self.recent, self.inactive, present=False)
+            mark(self.older, self.adult, present=True, paid=False)
+
+    def test_stats_values(self):
+        stats = get_dashboard_stats()
+        self.assertEqual(stats.all_members, 3)
+        self.assertEqual(stats.active_members, 2)
+        self.assertEqual(stats.passive_members, 1)
+        self.assertEqual(stats.member_status_data, {
+            'active_under_18': 1,
+            'inactive_under_18': 0,
+            'active_18_plus': 1,
+            'inactive_18_plus': 1,
+        })
+        self.assertEqual(stats.all_meeting, 2)
+        self.assertEqual(stats.attendance_vs_fee, {'present_paid': 1, 'present_unpaid': 2, 'absent': 1})
+        self.assertEqual(stats.total_collected, 200)
+        self.assertEqual(stats.total_to_receive, 300)
+        self.assertEqual(stats.latest_meeting, self.recent)
+        self.assertEqual(stats.latest_meeting_member_count, 3)
+        self.assertEqual(len(stats.monthly_labels), 12)
+        self.assertEqual(sum(stats.monthly_attendance_data), 3)
+        self.assertEqual(sum(stats.monthly_payment_data['paid']), 1)
+        self.assertEqual(sum(stats.monthly_payment_data['unpaid']), 2)
+        self.assertEqual(stats.attendance_counts, [1, 2])
+
+    def test_stats_query_count(self):
+        # Outstanding dues come from one aggregate over the member ledgers
+        with self.assertNumQueries(8):
+            get_dashboard_stats()
+
+    def test_dashboard_query_count(self):
+        user = User.objects.create_user('staff', password='pass12345')
+        self.client.force_login(user)
+        # Warm the deactivation throttle so only the page itself is measured
+        cache.set('dashboard_deactivation_check', True, 3600)
+        # The page runs the same queries whatever the data, so this is its budget
+        with self.assertNumQueries(QueryBudgetTests.BUDGETS['dashboard']):
+            response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.status_code, 200)
+
+
+class MeetingSummaryTests(TestCase):
+    def setUp(self):
+        self.meeting = make_meeting(date(2025, 3, 1), fee=150)
+        self.other_meeting = make_meeting(date(2025, 4, 1), fee=50)
+        self.members = [make_member(f'S{i:03d}') for i in range(3)]
+
+    def summary(self, meeting=None):
+        return MeetingSummary.objects.get(meeting=meeting or self.meeting)
+
+    def test_created_with_meeting(self):
+        summary = self.summary()
+        self.assertEqual((summary.total_count, summary.present_count, summary.fee_revenue), (0, 0, 0))
+
+    def test_counters_follow_create_update_delete(self):
+        first = mark(self.meeting, self.members[0], present=True, paid=True)
+        mark(self.meeting, self.members[1], present=True, paid=False)
+        mark(self.meeting, self.members[2], present=False, paid=False)
+        summary = self.summary()
+        self.assertEqual(summary.total_count, 3)
+        self.assertEqual(summary.present_count, 2)
+        self.assertEqual(summary.paid_count, 1)
+        self.assertEqual(summary.unpaid_present_count, 1)
+        self.assertEqual(summary.fee_revenue, 150)
+
+        first.attendance_fee_status = False
+        first.save()
+        summary = self.summary()
+        self.assertEqual((summary.paid_count, summary.unpaid_present_count, summary.fee_revenue), (0, 2, 0))
+
+        loaded = MemberAttendance.objects.get(pk=first.pk)
+        loaded.meeting_date = self.other_meeting
+        loaded.attendance_fee_status = True
+        loaded.save()
+        self.assertEqual(self.summary().total_count, 2)
+        moved = self.summary(self.other_meeting)
+        self.assertEqual((moved.total_count, moved.paid_count, moved.fee_revenue), (1, 1, 50))
+
+        loaded.delete()
+        self.assertEqual(self.summary(self.other_meeting).total_count, 0)
+        self.assertEqual(verify_meeting_summaries(), [])
+
+    def test_fee_change_reprices_revenue(self):
+        mark(self.meeting, self.members[0], present=True, paid=True)
+        self.meeting.meeting_fee = 300
+        self.meeting.save()
+        self.assertEqual(self.summary().fee_revenue, 300)
+
+    def test_summary_read_is_single_query(self):
+        mark(self.meeting, self.members[0])
+        with self.assertNumQueries(1):
+            self.assertEqual(self.summary().present_count, 1)
+
+    def test_rebuild_and_verify_command(self):
+        mark(self.meeting, self.members[0], present=True, paid=True)
+        MeetingSummary.objects.filter(meeting=self.meeting).update(present_count=7)
+        MeetingSummary.objects.filter(meeting=self.other_meeting).delete()
+
+        with self.assertRaises(CommandError):
+            call_command('rebuild_meeting_summaries', '--verify', stdout=StringIO())
+
+        out = StringIO()
+        call_command('rebuild_meeting_summaries', stdout=out)
+        self.assertIn('Rebuilt 2 meeting summaries', out.getvalue())
+        self.assertEqual(self.summary().present_count, 1)
+        self.assertTrue(MeetingSummary.objects.filter(meeting=self.other_meeting).exists())
+        call_command('rebuild_meeting_summaries', '--verify', stdout=StringIO())
+
+
+class InactiveMemberDeactivationTests(ClearedCacheTestCase):
+    def setUp(self):
+        super().setUp()
+        self.meetings = [make_meeting(date(2025, month, 1)) for month in range(1, 6)]
+
+    def populate(self, member_count):
+        """Half the members attend one of the latest 3 meetings, half only older ones"""
+        members = [make_member(f'D{i:04d}') for i in range(member_count)]
+        for i, member in enumerate(members):
+            if i % 2:
+                mark(self.meetings[3], member, present=True)
+            else:
+                mark(self.meetings[0], member, present=True)
+                mark(self.meetings[4], member, present=False)
+        return members
+
+    def test_deactivates_members_missing_latest_meetings(self):
+        members = self.populate(4)
+        result = check_and_deactivate_inactive_members(consecutive_meetings=3)
+        self.assertEqual(result['deactivated_count'], 2)
+        self.assertEqual({m.member_id for m in result['deactivated_members']}, {members[0].member_id, members[2].member_id})
+        self.assertEqual(result['message'], 'Checked 4 active members against 3 latest meetings.')
+        self.assertEqual(Member.objects.filter(member_is_active=True).count(), 2)
+
+    def test_dry_run_reports_without_updating(self):
+        self.populate(4)
+        result = check_and_deactivate_inactive_members(consecutive_meetings=3, dry_run=True)
+        self.assertEqual(result['deactivated_count'], 2)
+        self.assertEqual(Member.objects.filter(member_is_active=True).count(), 4)
+
+    def test_not_enough_meetings(self):
+        result = check_and_deactivate_inactive_members(consecutive_meetings=10)
+        self.assertEqual(result['deactivated_count'], 0)
+        self.assertIn('Need at least 10 meetings', result['message'])
+
+    def test_query_count_is_constant(self):
+        """Benchmark: the same 4 queries for 10 or 200 members"""
+        self.populate(10)
+        with self.assertNumQueries(4):
+            check_and_deactivate_inactive_members(consecutive_meetings=3)
+        for i in range(190):
+            make_member(f'E{i:04d}')
+        with self.assertNumQueries(4):
+            result = check_and_deactivate_inactive_members(consecutive_meetings=3)
+        self.assertEqual(result['deactivated_count'], 190)
+
+
+class MemberAttendanceStateTests(ClearedCacheTestCase):
+    def setUp(self):
+        super().setUp()
+        self.meetings = [make_meeting(date(2025, month, 1)) for month in range(1, 5)]
+        self.member = make_member('T001')
+
+    def state(self):
+        return MemberAttendanceState.objects.get(member=self.member)
+
+    def test_new_member_has_missed_every_meeting(self):
+        state = self.state()
+        self.assertEqual((state.current_streak, state.consecutive_misses), (0, 4))
+
+    def test_streaks_and_counts(self):
+        mark(self.meetings[0], self.member, present=True, paid=True)
+        mark(self.meetings[1], self.member, present=True)
+        mark(self.meetings[2], self.member, present=False, paid=True)
+        mark(self.meetings[3], self.member, present=True, paid=True)
+        state = self.state()
+        self.assertEqual((state.attended_count, state.paid_count, state.paid_attended_count), (3, 3, 2))
+        self.assertEqual((state.current_streak, state.longest_streak, state.consecutive_misses), (1, 2, 0))
+        self.assertEqual(state.last_attended_meeting_id, self.meetings[3].meeting_id)
+        self.assertTrue(check_attendance_streak(self.member, 1))
+        self.assertFalse(check_attendance_streak(self.member, 2))
+        self.assertEqual(verify_member_states(), [])
+
+    def test_new_latest_meeting_then_present_is_incremental(self):
+        mark(self.meetings[2], self.member)
+        mark(self.meetings[3], self.member)
+        latest = make_meeting(date(2025, 6, 1))
+        state = self.state()
+        self.assertEqual((state.current_streak, state.consecutive_misses, state.previous_streak), (0, 1, 2))
+
+        # Latest-meeting lookup and one UPDATE
+        with self.assertNumQueries(2):
+            record_attendance_saved(None, (latest.meeting_id, self.member.member_id, True, False), True)
+        state = self.state()
+        self.assertEqual((state.current_streak, state.longest_streak, state.consecutive_misses), (3, 3, 0))
+        self.assertEqual(state.last_attended_meeting_id, latest.meeting_id)
+
+    def test_out_of_order_changes_are_rebuilt(self):
+        for meeting in self.meetings:
+            mark(meeting, self.member)
+        MemberAttendance.objects.get(meeting_date=self.meetings[3], member_id=self.member).delete()
+        self.assertEqual((self.state().current_streak, self.state().consecutive_misses), (0, 1))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            make_meeting(date(2025, 2, 15))
+        self.assertEqual(self.state().longest_streak, 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.meetings[3].delete()
+        state = self.state()
+        self.assertEqual((state.current_streak, state.longest_streak), (1, 2))
+        self.assertEqual(verify_member_states(), [])
+
+    def test_deactivation_reads_consecutive_misses(self):
+        mark(self.meetings[0], self.member)
+        regular = make_member('T002')
+        mark(self.meetings[3], regular)
+        result = check_and_deactivate_inactive_members(consecutive_meetings=3)
+        self.assertEqual([m.member_id for m in result['deactivated_members']], [self.member.member_id])
+
+    def test_rebuild_and_verify_command(self):
+        mark(self.meetings[3], self.member)
+        MemberAttendanceState.objects.filter(member=self.member).update(current_streak=9)
+        with self.assertRaises(CommandError):
+            call_command('rebuild_member_states', '--verify', stdout=StringIO())
+
+        out = StringIO()
+        call_command('rebuild_member_states', '--member', self.member.member_id, stdout=out)
+        self.assertIn('Rebuilt 1 member states', out.getvalue())
+        self.assertEqual(self.state().current_streak, 1)
+        call_command('rebuild_member_states', '--verify', stdout=StringIO())
+
+
+class BadgeEvaluationTests(ClearedCacheTestCase):
+    def setUp(self):
+        super().setUp()
+        self.meetings = [make_meeting(date(2025, month, 1)) for month in range(1, 3)]
+        self.leader = make_member('B001', member_role='PRESIDENT')
+        self.regular = make_member('B002')
+        self.passive = make_member('B003', is_active=False)
+        for meeting in self.meetings:
+            mark(meeting, self.leader, present=True, paid=True)
+        mark(self.meetings[1], self.regular, present=True)
+
+    def badge_types(self, member):
+        return set(MemberBadge.objects.filter(member=member).values_list('badge_type', flat=True))
+
+    def test_awards_same_badges_as_per_member_check(self):
+        awarded = evaluate_badges()
+        self.assertEqual(self.badge_types(self.leader), {
+            BadgeType.PERFECT_ATTENDANCE, BadgeType.ALWAYS_PAID, BadgeType.ACTIVE_MEMBER, BadgeType.LEADER,
+        })
+        self.assertEqual(self.badge_types(self.regular), {BadgeType.ACTIVE_MEMBER})
+        self.assertEqual(self.badge_types(self.passive), set())
+        self.assertEqual(len(awarded), 5)
+
+        MemberBadge.objects.all().delete()
+        check_and_award_badges(self.leader)
+        self.assertEqual(len(self.badge_types(self.leader)), 4)
+
+    def test_second_run_awards_nothing(self):
+        evaluate_badges()
+        self.assertEqual(evaluate_badges(), [])
+        self.assertEqual(MemberBadge.objects.count(), 5)
+
+    def test_query_count_is_constant(self):
+        """Benchmark: the same 4 queries for 3 or 60 members"""
+        with self.assertNumQueries(4):
+            evaluate_badges()
+        for i in range(57):
+            make_member(f'C{i:03d}')
+        MemberBadge.objects.all().delete()
+        with self.assertNumQueries(4):
+            evaluate_badges()
+        self.assertEqual(MemberBadge.objects.filter(badge_type=BadgeType.ACTIVE_MEMBER).count(), 59)
+
+    def test_recompute_badges_command(self):
+        out = StringIO()
+        call_command('recompute_badges', '--member', self.regular.member_id, stdout=out)
+        self.assertIn('Awarded 1 new badges to 1 members', out.getvalue())
+
+
+class AttendanceFollowupTests(ClearedCacheTestCase):
+    def setUp(self):
+        super().setUp()
+        self.meeting = make_meeting(date(2025, 1, 1))
+        self.members = [make_member(f'F{i:03d}') for i in range(3)]
+
+    def test_followup_runs_once_after_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            with transaction.atomic():
+                for member in self.members:
+                    mark(self.meeting, member, present=True, paid=True)
+                self.assertEqual(MemberBadge.objects.count(), 0)
+
+        callbacks[0]()
+        self.assertEqual(
+            MemberBadge.objects.filter(badge_type=BadgeType.PERFECT_ATTENDANCE).count(), 3
+        )
+        # The first callback drained the queue; the rest have nothing to do
+        with self.assertNumQueries(0):
+            for callback in callbacks[1:]:
+                callback()
+
+    def test_bulk_block_defers_per_row_work(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            with bulk_attendance_changes() as batch:
+                for member in self.members:
+                    mark(self.meeting, member, present=True)
+                # Counters are only brought up to date when the block exits
+                self.assertEqual(MeetingSummary.objects.get(meeting=self.meeting).present_count, 0)
+            self.assertEqual(batch.member_ids, {m.member_id for m in self.members})
+
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(MeetingSummary.objects.get(meeting=self.meeting).present_count, 3)
+        self.assertEqual(verify_meeting_summaries(), [])
+        self.assertEqual(verify_member_states(), [])
+
+    def test_bulk_mark_view_uses_one_pass(self):
+        user = User.objects.create_superuser('admin', password='pass12345')
+        self.client.force_login(user)
+        mark(self.meeting, self.members[0], present=False)
+        data = {
+            'member_ids': [m.member_id for m in self.members],
+            'attendance_status': ['True', 'True', 'False'],
+            'fee_status': ['True', 'False', 'False'],
+        }
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            response = self.client.post(f"{reverse('attendance_bulk_mark')}?meeting_id={self.meeting.meeting_id}", data)
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(len(callbacks), 1)
+        summary = MeetingSummary.objects.get(meeting=self.meeting)
+        self.assertEqual((summary.total_count, summary.present_count, summary.paid_count), (3, 2, 1))
+        self.assertEqual(MemberAttendanceState.objects.get(member=self.members[0]).current_streak, 1)
+        self.assertTrue(MemberBadge.objects.filter(member=self.members[0], badge_type=BadgeType.ALWAYS_PAID).exists())
+
+
+class BulkAttendanceMarkTests(ClearedCacheTestCase):
+    def setUp(self):
+        super().setUp()
+        self.meeting = make_meeting(date(2025, 1, 1))
+        self.url = f"{reverse('attendance_bulk_mark')}?meeting_id={self.meeting.meeting_id}"
+
+    def submit(self, members, present='True', paid='False'):
+        data = {
+            'member_ids': [m.member_id for m in members],
+            'attendance_status': [present] * len(members),
+            'fee_status': [paid] * len(members),
+        }
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(self.url, data)
+        self.assertEqual(response.status_code, 302)
+        # SQLite splits bulk INSERTs by its parameter limit; count everything else
+        return len([q for q in queries if not q['sql'].startswith('INSERT')])
+
+    def test_staff_cannot_edit_existing_rows(self):
+        self.client.force_login(User.objects.create_user('staff', password='pass12345'))
+        members = [make_member(f'K{i:03d}') for i in range(3)]
+        mark(self.meeting, members[0], present=False)
+        self.submit(members)
+        statuses = dict(MemberAttendance.objects.values_list('member_id', 'attendance_status'))
+        self.assertEqual(statuses, {'K000': False, 'K001': True, 'K002': True})
+        self.assertEqual(MeetingSummary.objects.get(meeting=self.meeting).present_count, 2)
+
+    def test_superuser_edits_and_creates(self):
+        self.client.force_login(User.objects.create_superuser('admin', password='pass12345'))
+        members = [make_member(f'K{i:03d}') for i in range(3)]
+        mark(self.meeting, members[0], present=False)
+        self.submit(members, paid='True')
+        self.assertEqual(MemberAttendance.objects.filter(attendance_status=True, attendance_fee_status=True).count(), 3)
+        self.assertEqual(verify_meeting_summaries(), [])
+        self.assertEqual(verify_member_states(), [])
+
+    def test_query_count_is_constant(self):
+        """Benchmark: a 500-member submission costs the same reads and updates as a 10-member one"""
+        self.client.force_login(User.objects.create_superuser('admin', password='pass12345'))
+        small = [make_member(f'S{i:03d}') for i in range(10)]
+        large = [make_member(f'L{i:03d}') for i in range(500)]
+        small_queries = self.submit(small)
+        self.submit(small, paid='True')  # warm the session so both runs do the same writes
+        self.assertEqual(self.submit(large), small_queries)
+        self.assertEqual(MemberAttendance.objects.count(), 510)
+
+
+class MarkAllPresentTests(ClearedCacheTestCase):
+    def setUp(self):
+        super().setUp()
+        self.meeting = make_meeting(date(2025, 1, 1))
+        self.members = [make_member(f'P{i:03d}') for i in range(4)]
+        self.inactive = make_member('P999', is_active=False)
+        mark(self.meeting, self.members[0], present=False, paid=True)
+        mark(self.meeting, self.members[1], present=True)
+
+    def test_inserts_missing_and_updates_absent(self):
+        self.assertEqual(mark_all_present(self.meeting), (2, 1))
+        rows = {
+            member_id: (present, paid)
+            for member_id, present, paid in MemberAttendance.objects.values_list(
+                'member_id', 'attendance_status', 'attendance_fee_status'
+            )
+        }
+        self.assertEqual(rows, {
+            'P000': (True, True),
+            'P001': (True, False),
+            'P002': (True, False),
+            'P003': (True, False),
+        })
+        self.assertEqual(MeetingSummary.objects.get(meeting=self.meeting).present_count, 4)
+        self.assertEqual(verify_meeting_summaries(), [])
+        self.assertEqual(verify_member_states(), [])
+        self.assertEqual(mark_all_present(self.meeting), (0, 0))
+
+    def test_query_count_is_constant(self):
+        """Benchmark: the same statements for 4 or 60 active members"""
+        with CaptureQueriesContext(connection) as small:
+            mark_all_present(self.meeting)
+        for i in range(56):
+            make_member(f'Q{i:03d}')
+        with CaptureQueriesContext(connection) as large:
+            self.assertEqual(mark_all_present(self.meeting), (56, 0))
+        self.assertEqual(len(large), len(small))
+
+
+class KeysetPaginationTests(ClearedCacheTestCase):
+    def setUp(self):
+        super().setUp()
+        # Same join date for everyone, so member_id breaks every tie
+        self.members = [make_member(f'N{i:03d}') for i in range(7)]
+        self.paginator = KeysetPaginator(Member.objects.all(), 3, ('-member_join_at', 'member_id'))
+
+    def ids(self, page):
+        return [member.member_id for member in page]
+
+    def test_walks_forward_and_back(self):
+        first = self.paginator.page()
+        self.assertEqual(self.ids(first), ['N000', 'N001', 'N002'])
+        self.assertFalse(first.has_previous())
+        second = self.paginator.page(first.next_cursor)
+        self.assertEqual(self.ids(second), ['N003', 'N004', 'N005'])
+        last = self.paginator.page(second.next_cursor)
+        self.assertEqual(self.ids(last), ['N006'])
+        self.assertEqual((last.start_index(), last.end_index()), (7, 7))
+        self.assertIsNone(last.next_cursor)
+
+        back = self.paginator.page(last.previous_cursor)
+        self.assertEqual(self.ids(back), ['N003', 'N004', 'N005'])
+        self.assertEqual(back.start_index(), 4)
+        self.assertEqual(self.ids(self.paginator.page(back.previous_cursor)), ['N000', 'N001', 'N002'])
+
+    def test_related_ordering_fields(self):
+        meetings = [make_meeting(date(2025, month, 1)) for month in range(1, 6)]
+        for meeting in meetings:
+            mark(meeting, self.members[0])
+        paginator = KeysetPaginator(
+            MemberAttendance.objects.filter(member_id='N000').select_related('meeting_date'),
+            2, ('-meeting_date__meeting_date', '-meeting_date_id')
+        )
+        first = paginator.page()
+        second = paginator.page(first.next_cursor)
+        self.assertEqual([a.meeting_date.meeting_date.month for a in second], [3, 2])
+        self.assertEqual([a.meeting_date.meeting_date.month for a in paginator.page(second.previous_cursor)], [5, 4])
+
+    def test_invalid_cursor_gives_first_page(self):
+        self.assertEqual(self.ids(self.paginator.page('not-a-cursor')), ['N000', 'N001', 'N002'])
+
+    def test_no_offset_or_count_per_page(self):
+        cursor = self.paginator.page().next_cursor
+        with CaptureQueriesContext(connection) as queries:
+            list(self.paginator.page(cursor))
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('OFFSET', queries[0]['sql'])
+        self.assertNotIn('COUNT', queries[0]['sql'])
+
+    def test_count_is_cached(self):
+        self.assertEqual(self.paginator.count, 7)
+        make_member('N100')
+        paginator = KeysetPaginator(Member.objects.all(), 3, ('-member_join_at', 'member_id'))
+        self.assertEqual(paginator.count, 7)
+
+    def test_list_views_follow_cursors(self):
+        self.client.force_login(User.objects.create_user('staff', password='pass12345'))
+        for i in range(30):
+            make_member(f'J{i:03d}', dob=date(2015, 1, 1))
+        meeting = make_meeting(date(2025, 1, 1))
+        response = self.client.get(reverse('member_list'))
+        page = response.context['page_obj']
+        self.assertEqual(len(page), 25)
+        response = self.client.get(reverse('member_list'), {'cursor': page.next_cursor})
+        self.assertEqual(len(response.context['page_obj']), 5)
+        for name, args in (('member_list_adults', []), ('meeting_list', []), ('payment_list', []),
+                           ('attendance_date', [meeting.meeting_id]), ('member_attendance_report', ['N000'])):
+            self.assertEqual(self.client.get(reverse(name, args=args)).status_code, 200, name)
+
+
+class StreamingExcelExportTests(ClearedCacheTestCase):
+    def setUp(self):
+        super().setUp()
+        self.members = [make_member(f'X{i:03d}', member_role='PRESIDENT' if i == 0 else '') for i in range(3)]
+        self.meeting = make_meeting(date(2025, 3, 1))
+        mark(self.meeting, self.members[0], paid=True)
+        mark(self.meeting, self.members[1], present=False)
+
+    def read_sheet(self, response):
+        sheet = load_workbook(BytesIO(b''.join(response.streaming_content))).active
+        return [list(row) for row in sheet.iter_rows(values_only=True)]
+
+    def test_members_export(self):
+        response = export_members_excel(Member.objects.order_by('member_id'), selected_columns=['member_id', 'role', 'dob'])
+        self.assertIn('attachment; filename="Members_Export_', response['Content-Disposition'])
+        self.assertEqual(self.read_sheet(response), [
+            ['Member ID', 'Role', 'Date of Birth'],
+            ['X000', 'President', '01/01/1990'],
+            ['X001', 'No Role', '01/01/1990'],
+            ['X002', 'No Role', '01/01/1990'],
+        ])
+
+    def test_attendance_export(self):
+        rows = self.read_sheet(export_attendance_excel(MemberAttendance.objects.order_by('member_id')))
+        self.assertEqual(rows, [
+            ['Member ID', 'Member Name', 'Meeting Date', 'Attendance', 'Fee Paid'],
+            ['X000', 'A FirstX000 LastX000', '01/03/2025', 'Present', 'Paid'],
+            ['X001', 'A FirstX001 LastX001', '01/03/2025', 'Absent', 'Not Paid'],
+        ])
+
+    def test_distinct_search_keeps_members_with_the_same_values(self):
+        for i in range(3):
+            make_member(f'S{i}', member_first_name='Same', member_last_name='Name')
+        members = search_members('Same')
+        self.assertEqual(members.count(), 3)
+        rows = self.read_sheet(export_members_excel(members, selected_columns=['first_name', 'last_name']))
+        self.assertEqual(rows, [['First Name', 'Last Name']] + [['Same', 'Name']] * 3)
+
+    def test_single_query_regardless_of_size(self):
+        """Benchmark: one SELECT with the joins for 2 or 42 attendance rows"""
+        with CaptureQueriesContext(connection) as small:
+            export_attendance_excel(MemberAttendance.objects.all())
+        for i in range(40):
+            mark(self.meeting, make_member(f'Y{i:03d}'))
+        with CaptureQueriesContext(connection) as large:
+            rows = self.read_sheet(export_attendance_excel(MemberAttendance.objects.all()))
+        self.assertEqual(len(rows), 43)
+        self.assertEqual(len(small), 1)
+        self.assertEqual(len(large), 1)
+
+    def test_payments_report(self):
+        Payment.objects.create(member=self.members[0], meeting=self.meeting, amount='250.00', payment_method='BANK')
+        self.client.force_login(User.objects.create_superuser('admin', password='pass12345'))
+        response = self.client.post(reverse('reports_builder'), {'report_type': 'payments'})
+        rows = self.read_sheet(response)
+        self.assertEqual(rows[0][:5], ['Payment ID', 'Member ID', 'Member Name', 'Amount', 'Method'])
+        self.assertEqual(rows[1][1:6], ['X000', 'FirstX000 LastX000', 250.0, 'Bank Transfer', '01/03/2025'])
+
+
+class StreamingCsvExportTests(ClearedCacheTestCase):
+    def setUp(self):
+        super().setUp()
+        self.members = [make_member(f'C{i:03d}') for i in range(3)]
+        self.meeting = make_meeting(date(2025, 4, 1))
+        mark(self.meeting, self.members[0], paid=True)
+        mark(self.meeting, self.members[1], present=False)
+        self.client.force_login(User.objects.create_superuser('admin', password='pass12345'))
+
+    def read_csv(self, response):
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode().splitlines()
+
+    def test_rows_are_read_in_keyset_slices(self):
+        for i in range(3, 5):
+            make_member(f'C{i:03d}')
+        with CaptureQueriesContext(connection) as queries:
+            rows = list(export_rows(Member.objects.all(), select_columns(MEMBER_COLUMNS, ['member_id']), chunk_size=2))
+        self.assertEqual(rows, [[f'C{i:03d}'] for i in range(5)])
+        self.assertEqual(len(queries), 3)
+        self.assertNotIn('OFFSET', queries[-1]['sql'])
+
+    def test_slices_keep_the_queryset_ordering(self):
+        # Meetings are ordered by date, newest first; the primary key breaks the tie
+        extra = [make_meeting(date(2025, 4, 1)), make_meeting(date(2025, 5, 1)), make_meeting(date(2025, 3, 1))]
+        expected = [[meeting.meeting_id] for meeting in sorted([self.meeting, *extra], key=lambda m: (-m.meeting_date.toordinal(), m.meeting_id))]
+        self.assertEqual(list(export_rows(MeetingInfo.objects.all(), select_columns(MEETING_COLUMNS, ['meeting_id']), chunk_size=1)), expected)
+        # Ordered through a relation
+        attendance = MemberAttendance.objects.filter(member_id=self.members[0]).order_by('-meeting_date__meeting_date')
+        for meeting in extra:
+            mark(meeting, self.members[0])
+        dates = list(export_rows(attendance, select_columns(MEMBER_ATTENDANCE_COLUMNS, ['date']), chunk_size=2))
+        self.assertEqual(dates, [['01/05/2025'], ['01/04/2025'], ['01/04/2025'], ['01/03/2025']])
+
+    def test_header_is_sent_before_querying(self):
+        response = export_members_csv(Member.objects.order_by('member_id'), selected_columns=['member_id', 'status'])
+        with CaptureQueriesContext(connection) as queries:
+            header = next(iter(response.streaming_content))
+        self.assertEqual(header, b'Member ID,Status\r\n')
+        self.assertEqual(len(queries), 0)
+        self.assertEqual(b''.join(response.streaming_content).decode().splitlines(),
+                         ['C000,Active', 'C001,Active', 'C002,Active'])
+
+    def test_report_builder_csv(self):
+        for report_type, header in (('members', 'Member ID'), ('attendance', 'Member ID'),
+                                    ('meetings', 'Meeting ID'), ('payments', 'Payment ID')):
+            response = self.client.post(reverse('reports_builder'), {
+                'report_type': report_type, 'export_format': 'csv',
+                'member_status': '', 'attendance_status': 'true', 'fee_status': '',
+            })
+            self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8', report_type)
+            lines = self.read_csv(response)
+            self.assertTrue(lines[0].startswith(header), report_type)
+        # 'All' leaves a filter off; 'true' applies it
+        self.assertEqual(self.read_csv(self.client.post(reverse('reports_builder'), {
+            'report_type': 'attendance', 'export_format': 'csv', 'attendance_status': 'true', 'fee_status': '',
+        })), ['Member ID,Member Name,Meeting Date,Attendance,Fee Paid', 'C000,A FirstC000 LastC000,01/04/2025,Present,Paid'])
+
+    def test_member_list_export_csv(self):
+        response = self.client.post(reverse('member_info_export'), {'format': 'csv', 'is_adults': 'true', 'columns': ['member_id']})
+        self.assertEqual(self.read_csv(response), ['Member ID', 'C000', 'C001', 'C002'])
+
+    def test_searched_members_with_the_same_values_each_get_a_row(self):
+        for i in range(3):
+            make_member(f'S{i}', member_first_name='Same', member_last_name='Name')
+        response = self.client.post(reverse('member_info_export'), {
+            'format': 'csv', 'search': 'Same', 'is_adults': 'true', 'columns': ['first_name', 'last_name'],
+        })
+        self.assertEqual(self.read_csv(response), ['First Name,Last Name'] + ['Same,Name'] * 3)
+
+    def test_per_meeting_and_member_csv(self):
+        response = self.client.get(reverse('export_attendance_report', args=[self.meeting.meeting_id]), {'format': 'csv'})
+        self.assertEqual(sorted(self.read_csv(response)[1:]), [
+            'C000,A FirstC000 LastC000,Present,Payed',
+            'C001,A FirstC001 LastC001,Absent,Not Payed',
+        ])
+        response = self.client.get(reverse('member_attendance_export', args=['C000']), {'format': 'csv'})
+        self.assertEqual(self.read_csv(response), ['Date,Attendance State,Member Fee State', '01/04/2025,Present,Payed'])
+        response = self.client.get(reverse('member_attendance_export', args=['C000']))
+        self.assertEqual(response['Content-Type'], 'application/ms-excel')
+
+
+class ExportJobTests(ClearedCacheTestCase):
+    def setUp(self):
+        super().setUp()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=self.media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+        for i in range(3):
+            make_member(f'E{i:03d}')
+        self.user = User.objects.create_user('staff', password='pass12345')
+        self.client.force_login(self.user)
+
+    def test_builder_queues_and_worker_generates(self):
+        response = self.client.post(reverse('reports_builder'), {
+            'report_type': 'members', 'export_format': 'excel', 'member_status': 'true', 'background': 'on',
+        })
+        self.assertRedirects(response, reverse('export_job_list'))
+        job = ExportJob.objects.get()
+        self.assertEqual((job.status, job.params['filters']['is_active']), (ExportJob.STATUS_PENDING, True))
+        self.assertEqual(self.client.get(reverse('export_job_list')).status_code, 200)
+
+        self.assertEqual(process_jobs(), 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.rows_total, job.rows_done, job.progress), (ExportJob.STATUS_DONE, 3, 3, 100))
+        self.assertTrue(job.file.name.startswith('exports/'))
+        self.assertIsNotNone(job.expires_at)
+
+        status = self.client.get(reverse('export_job_status', args=[job.job_id])).json()
+        self.assertEqual(status['download_url'], reverse('export_job_download', args=[job.job_id]))
+        response = self.client.get(status['download_url'])
+        sheet = load_workbook(BytesIO(b''.join(response.streaming_content))).active
+        self.assertEqual([row[0] for row in sheet.iter_rows(values_only=True)], ['Member ID', 'E000', 'E001', 'E002'])
+
+    def test_rows_total_counts_the_rows_written_for_searched_members(self):
+        for i in range(3):
+            make_member(f'S{i}', member_first_name='Same', member_last_name='Name')
+        job = create_export_job(self.user, 'members', 'excel', {'search': 'Same'}, ['first_name', 'last_name'])
+        self.assertEqual(process_jobs(), 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.rows_total, job.rows_done), (ExportJob.STATUS_DONE, 3, 3))
+        sheet = load_workbook(job.file.path).active
+        self.assertEqual(list(sheet.iter_rows(values_only=True)), [('First Name', 'Last Name')] + [('Same', 'Name')] * 3)
+
+    @override_settings(EXPORT_BACKGROUND_ROW_THRESHOLD=2)
+    def test_large_exports_are_queued(self):
+        self.user.is_superuser = True
+        self.user.save()
+        response = self.client.post(reverse('member_info_export'), {'format': 'pdf', 'is_adults': 'true', 'columns': ['member_id']})
+        self.assertRedirects(response, reverse('export_job_list'))
+        job = ExportJob.objects.get()
+        self.assertEqual((job.export_format, job.params['columns']), ('pdf', ['member_id']))
+        process_jobs()
+        job.refresh_from_db()
+        self.assertEqual(job.status, ExportJob.STATUS_DONE)
+        self.assertTrue(job.file.name.endswith('.pdf'))
+        # CSV streams inline whatever the size
+        response = self.client.post(reverse('member_info_export'), {'format': 'csv', 'is_adults': 'true'})
+        self.assertTrue(response.streaming)
+
+    def test_claim_is_exclusive_and_stale_jobs_are_retried(self):
+        job = create_export_job(self.user, 'meetings', 'excel')
+        self.assertEqual(claim_next_job().job_id, job.job_id)
+        self.assertIsNone(claim_next_job())
+        ExportJob.objects.filter(job_id=job.job_id).update(heartbeat_at=timezone.now() - STALE_AFTER * 2)
+        claimed = claim_next_job()
+        self.assertEqual((claimed.job_id, claimed.attempts), (job.job_id, 2))
+
+    def test_failed_job_records_error(self):
+        job = create_export_job(self.user, 'members', 'excel', filters={'join_date_from': 'not-a-date'})
+        process_jobs()
+        job.refresh_from_db()
+        self.assertEqual(job.status, ExportJob.STATUS_FAILED)
+        self.assertTrue(job.error)
+        self.assertEqual(self.client.get(reverse('export_job_download', args=[job.job_id])).status_code, 404)
+
+    def test_other_users_cannot_see_jobs(self):
+        job = create_export_job(User.objects.create_user('other', password='pass12345'), 'meetings', 'excel')
+        self.assertEqual(self.client.get(reverse('export_job_status', args=[job.job_id])).status_code, 404)
+
+    def test_cleanup_removes_expired_files(self):
+        job = create_export_job(self.user, 'meetings', 'excel')
+        process_jobs()
+        job.refresh_from_db()
+        path = job.file.path
+        self.assertTrue(os.path.exists(path))
+        self.assertEqual(cleanup_expired_jobs(), 0)
+        self.assertEqual(cleanup_expired_jobs(now=job.expires_at + timedelta(seconds=1)), 1)
+        self.assertFalse(os.path.exists(path))
+        self.assertFalse(os.path.exists(os.path.dirname(path)))
+        self.assertFalse(ExportJob.objects.exists())
+
+
+class ChunkedPdfExportTests(TestCase):
+    headers = ['Member ID', 'First Name', 'Status']
+
+    def rows(self, count):
+        return [[f'R{i:04d}', f'First{i}', 'Active'] for i in range(count)]
+
+    def render(self, rows, workers):
+        output = BytesIO()
+        write_members_pdf(rows, self.headers, output, workers=workers)
+        return PdfReader(BytesIO(output.getvalue()))
+
+    def test_export_members_pdf(self):
+        for i in range(3):
+            make_member(f'F{i:03d}')
+        response = export_members_pdf(Member.objects.order_by('member_id'), selected_columns=['member_id', 'status'])
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        pdf = PdfReader(BytesIO(b''.join(response.streaming_content)))
+        text = pdf.pages[0].extract_text()
+        self.assertIn('Members Export Report', text)
+        self.assertIn('F002', text)
+        self.assertNotIn('First Name', text)
+
+    def test_pages_are_whole_tables_in_order(self):
+        """Every page starts with the header; chunks are joined in row order"""
+        pdf = self.render(self.rows(2500), workers=2)
+        pages = [
+            [line for line in page.extract_text().split('\n') if line.strip() and line != 'Members Export Report']
+            for page in pdf.pages
+        ]
+        self.assertTrue(all(lines[0] == 'Member ID' for lines in pages))
+        ids = [line for lines in pages for line in lines if line.startswith('R')]
+        self.assertEqual(ids, [f'R{i:04d}' for i in range(2500)])
+        self.assertEqual(len(self.render(self.rows(2500), workers=1).pages), len(pdf.pages))
+
+    def test_single_chunk_is_rendered_without_a_pool(self):
+        with mock.patch('app.export_utils.ProcessPoolExecutor') as pool:
+            self.assertEqual(len(self.render(self.rows(30), workers=2).pages), 1)
+            make_member('F000')
+            export_members_pdf(Member.objects.all())
+        pool.assert_not_called()
+
+    def test_empty_export_has_header_page(self):
+        pdf = self.render([], workers=2)
+        self.assertEqual(len(pdf.pages), 1)
+        self.assertIn('Member ID', pdf.pages[0].extract_text())
+
+
+class PaymentStatisticsTests(ClearedCacheTestCase):
+    def setUp(self):
+        super().setUp()
+        self.member = make_member('S001')
+        self.other = make_member('S002')
+
+    def pay(self, member, amount, when, method='CASH'):
+        payment = Payment.objects.create(member=member, amount=amount, payment_method=method)
+        # payment_date is auto_now_add; move it with update() so the test controls the month
+        Payment.objects.filter(pk=payment.pk).update(payment_date=when)
+        payment.refresh_from_db()
+        return payment
+
+    def test_monthly_breakdown_and_totals(self):
+        tz = timezone.get_current_timezone()
+        self.pay(self.member, '100.00', timezone.datetime(2024, 1, 15, 10, tzinfo=tz))
+        self.pay(self.member, '50.00', timezone.datetime(2024, 1, 31, 23, 30, tzinfo=tz), method='BANK')
+        self.pay(self.other, '25.00', timezone.datetime(2024, 3, 1, 0, 30, tzinfo=tz))
+        self.pay(self.other, '999.00', timezone.datetime(2023, 12, 31, 23, 0, tzinfo=tz))
+        cache.clear()
+
+        with CaptureQueriesContext(connection) as queries:
+            stats = get_payment_stats(2024)
+        self.assertEqual(len(queries), 3)
+        self.assertEqual((stats['total_amount'], stats['total_count']), (175, 3))
+        months = {row['month']: (row['amount'], row['count']) for row in stats['monthly_data']}
+        self.assertEqual(months['January'], (150, 2))
+        self.assertEqual(months['February'], (0, 0))
+        self.assertEqual(months['March'], (25, 1))
+        self.assertEqual([(row['payment_method'], row['total']) for row in stats['by_method']], [('CASH', 125), ('BANK', 50)])
+        self.assertEqual([row['member__member_id'] for row in stats['top_members']], ['S001', 'S002'])
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(get_payment_stats(2024), stats)
+        self.assertEqual(len(queries), 0)
+
+    def test_cache_dropped_on_save_and_delete(self):
+        year = timezone.localdate().year
+        self.assertEqual(get_payment_stats(year)['total_count'], 0)
+        payment = Payment.objects.create(member=self.member, amount='40.00')
+        self.assertEqual(get_payment_stats(year)['total_count'], 1)
+        payment.delete()
+        self.assertEqual(get_payment_stats(year)['total_count'], 0)
+
+    def test_past_years_dropped_when_a_member_is_renamed_or_deleted(self):
+        tz = timezone.get_current_timezone()
+        self.pay(self.member, '100.00', timezone.datetime(2020, 5, 1, 10, tzinfo=tz))
+        self.pay(self.other, '50.00', timezone.datetime(2020, 6, 1, 10, tzinfo=tz))
+        names = lambda: [row['member__member_first_name'] for row in get_payment_stats(2020)['top_members']]
+        self.assertEqual(names(), ['FirstS001', 'FirstS002'])
+
+        member = Member.objects.get(pk='S001')
+        member.member_address = 'Elsewhere'
+        member.save()
+        with self.assertNumQueries(0):
+            names()
+        member.member_first_name = 'Renamed'
+        member.save()
+        self.assertEqual(names(), ['Renamed', 'FirstS002'])
+
+        self.other.delete()
+        self.assertEqual(names(), ['Renamed'])
+
+    def test_statistics_page(self):
+        Payment.objects.create(member=self.member, amount='40.00')
+        self.client.force_login(User.objects.create_user('staff', password='pass12345'))
+        response = self.client.get(reverse('payment_statistics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['total_count'], 1)
+        self.assertContains(response, 'Rs. 40.00')
+        self.assertEqual(len(response.context['monthly_data']), 12)
+
+
+class MemberLedgerTests(ClearedCacheTestCase):
+    def setUp(self):
+        super().setUp()
+        self.meetings = [make_meeting(date(2025, month, 1), fee=100 * month) for month in range(1, 4)]
+        self.member = make_member('L001')
+        self.other = make_member('L002')
+
+    def ledger(self, member=None):
+        return MemberLedger.objects.get(member=member or self.member)
+
+    def test_attendance_changes_are_applied_incrementally(self):
+        row = mark(self.meetings[0], self.member)
+        mark(self.meetings[1], self.member, paid=True)
+        mark(self.meetings[2], self.member, present=False, paid=True)
+        ledger = self.ledger()
+        self.assertEqual((ledger.fees_charged, ledger.fees_settled, ledger.outstanding, ledger.unpaid_meetings), (300, 200, 100, 1))
+
+        row = MemberAttendance.objects.get(pk=row.pk)
+        row.attendance_fee_status = True
+        row.save()
+        self.assertEqual((self.ledger().outstanding, self.ledger().fees_settled), (0, 300))
+        MemberAttendance.objects.get(meeting_date=self.meetings[1], member_id=self.member).delete()
+        self.assertEqual((self.ledger().fees_charged, self.ledger().fees_settled), (100, 100))
+        self.assertEqual(verify_ledgers(), [])
+
+    def test_payments_fee_changes_and_meeting_deletes(self):
+        mark(self.meetings[0], self.member)
+        mark(self.meetings[1], self.other)
+        payment = Payment.objects.create(member=self.member, meeting=self.meetings[1], amount='150.50')
+        self.assertEqual((self.ledger().payments_received, self.ledger().payment_count), (Decimal('150.50'), 1))
+
+        payment = Payment.objects.get(pk=payment.pk)
+        payment.amount = '75'
+        payment.save()
+        self.assertEqual(self.ledger().payments_received, Decimal('75.00'))
+
+        self.meetings[0].meeting_fee = 250
+        self.meetings[0].save()
+        self.assertEqual(self.ledger().outstanding, 250)
+
+        # Deleting the meeting cascades the other member's attendance and this member's payment
+        self.meetings[1].delete()
+        self.assertEqual((self.ledger().payment_count, self.ledger(self.other).outstanding), (0, 0))
+        self.assertEqual(verify_ledgers(), [])
+
+    def test_bulk_changes_rebuild_once(self):
+        with bulk_attendance_changes():
+            for meeting in self.meetings:
+                mark(meeting, self.member)
+                mark(meeting, self.other, paid=True)
+        self.assertEqual((self.ledger().outstanding, self.ledger(self.other).outstanding), (600, 0))
+        self.assertEqual(verify_ledgers(), [])
+
+    def test_dashboard_and_arrears_list(self):
+        mark(self.meetings[0], self.member)
+        mark(self.meetings[2], self.other)
+        mark(self.meetings[1], make_member('L003'), paid=True)
+        stats = get_dashboard_stats()
+        self.assertEqual((stats.total_to_receive, stats.members_in_arrears), (400, 2))
+
+        self.client.force_login(User.objects.create_user('staff', password='pass12345'))
+        response = self.client.get(reverse('payment_arrears'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([ledger.member_id for ledger in response.context['ledgers']], ['L002', 'L001'])
+
+    def test_rebuild_and_verify_command(self):
+        mark(self.meetings[0], self.member)
+        MemberLedger.objects.filter(member=self.member).update(outstanding=5)
+        with self.assertRaises(CommandError):
+            call_command('rebuild_member_ledgers', '--verify', stdout=StringIO())
+
+        out = StringIO()
+        call_command('rebuild_member_ledgers', stdout=out)
+        self.assertIn('Rebuilt 2 member ledgers', out.getvalue())
+        call_command('rebuild_member_ledgers', '--verify', stdout=StringIO())
+
+
+class AuditPipelineTests(TestCase):
+    class CaptureHandler(logging.Handler):
+        def __init__(self):
+            super().__init__()
+            self.setFormatter(JSONAuditFormatter())
+            self.lines = []
+
+        def emit(self, record):
+            self.lines.append(json.loads(self.format(record)))
+
+    def setUp(self):
+        self.handler = self.CaptureHandler()
+        self.logger = logging.getLogger('audit_pipeline_test')
+        self.logger.propagate = False
+        self.logger.addHandler(self.handler)
+        self.addCleanup(self.logger.removeHandler, self.handler)
+
+    def event(self, action, level=logging.INFO, created=1700000000.5):
+        return AuditEvent(level, created, None, 'staff', action, None, '127.0.0.1', 'test', '/x/', 'GET', '/x/?a=1', {'key': 'value'})
+
+    def test_events_are_written_on_the_listener_thread(self):
+        pipeline = AuditPipeline(self.logger, maxsize=10)
+        pipeline.start()
+        pipeline.submit(self.event('member_created'))
+        pipeline.stop()
+        [line] = self.handler.lines
+        self.assertEqual((line['who'], line['action'], line['details']['key']), ('staff', 'member_created', 'value'))
+        # Timestamp is when the event was queued, not when it was written
+        self.assertEqual(line['timestamp'], '2023-11-14T22:13:20.500000+00:00')
+        self.assertEqual(pipeline.stats()['written'], 1)
+
+    def test_full_queue_drops_info_and_writes_warnings_inline(self):
+        pipeline = AuditPipeline(self.logger, maxsize=1)
+        for i in range(3):
+            pipeline.submit(self.event(f'http_request_{i}'))
+        pipeline.submit(self.event('security_event:failed_login', level=logging.WARNING))
+        self.assertEqual((pipeline.dropped, pipeline.overflowed), (2, 1))
+        self.assertEqual([line['action'] for line in self.handler.lines], ['security_event:failed_login'])
+
+        pipeline.start()
+        pipeline.stop()
+        actions = [line['action'] for line in self.handler.lines]
+        self.assertEqual(actions[1:], ['http_request_0', 'audit_events_dropped'])
+        self.assertEqual(self.handler.lines[-1]['details']['dropped'], 2)
+
+
+@override_settings(ACTIVITY_LOG_ENABLED=True, ACTIVITY_LOG_BATCH_SIZE=3, ACTIVITY_LOG_FLUSH_SECONDS=3600)
+class ActivityLogTests(TestCase):
+    def setUp(self):
+        activity_log._buffer.drain()
+        self.user = User.objects.create_user('staff', password='pass12345')
+        self.admin = User.objects.create_superuser('admin', password='pass12345')
+
+    def request(self, user):
+        request = RequestFactory().post('/payment/add/')
+        request.user = user
+        return request
+
+    def test_events_are_written_in_batches(self):
+        audit_log_user_action(self.request(self.user), 'payment_added', target='payment:7', extra_details={'amount': '10'})
+        audit_log_security_event(self.request(self.user), 'login_failed', target='user:staff')
+        self.assertEqual(flush_activity(), 0)
+        self.assertFalse(ActivityLog.objects.exists())
+
+        audit_log_user_action(self.request(self.admin), 'staff_deleted', target='user:old')
+        with self.assertNumQueries(3):  # savepoint, one INSERT, release
+            self.assertEqual(flush_activity(), 3)
+        rows = {row.action_type: row for row in ActivityLog.objects.all()}
+        self.assertEqual(set(rows), {'CREATE', 'SECURITY', 'DELETE'})
+        self.assertEqual((rows['CREATE'].target_model, rows['CREATE'].target_id), ('Payment', '7'))
+        self.assertEqual(rows['CREATE'].description, 'payment_added: amount=10')
+        self.assertEqual((rows['CREATE'].user, rows['DELETE'].user), (self.user, self.admin))
+
+    def test_batch_flushes_when_oldest_event_is_old_enough(self):
+        audit_log_user_action(self.request(self.user), 'member_updated', target='member:M1')
+        with override_settings(ACTIVITY_LOG_FLUSH_SECONDS=0):
+            self.assertEqual(flush_activity(), 1)
+        self.assertEqual(ActivityLog.objects.get().action_type, 'UPDATE')
+
+    def test_feed_is_keyset_paginated_and_scoped_to_user(self):
+        now = timezone.now()
+        ActivityLog.objects.bulk_create([
+            ActivityLog(user=self.user if i % 2 else self.admin, action_type='UPDATE', target_model='Member',
+                        target_id=str(i), description='member_updated', created_at=now - timedelta(minutes=i))
+            for i in range(60)
+        ])
+        self.client.force_login(self.admin)
+        first = self.client.get(reverse('activity_feed')).json()
+        self.assertEqual([row['target_id'] for row in first['results'][:3]], ['0', '1', '2'])
+        second = self.client.get(reverse('activity_feed'), {'cursor': first['next_cursor']}).json()
+        self.assertEqual(len(first['results']) + len(second['results']), 60)
+        self.assertIsNone(second['next_cursor'])
+
+        self.client.force_login(self.user)
+        own = self.client.get(reverse('activity_feed')).json()['results']
+        self.assertEqual({row['user'] for row in own}, {'staff'})
+        self.assertEqual(len(own), 30)
+
+
+class RateLimitTests(TestCase):
+    def test_route_table_first_match_wins(self):
+        routes = RouteTable([('/login/', 5, 300), ('/member/register/', 10, 60), ('/member/', 100, 60)])
+        self.assertEqual(routes.match('/login/?next=/').max_requests, 5)
+        self.assertEqual(routes.match('/member/register/').window, 60)
+        self.assertEqual(routes.match('/member/list/').max_requests, 100)
+        self.assertIsNone(routes.match('/'))
+        self.assertIsNone(RouteTable([]).match('/login/'))
+
+    def test_sliding_window_weights_previous_window(self):
+        for _ in range(3):
+            count = hit('/login/:1.2.3.4', 100, now=1000)
+        self.assertEqual(count, 3)
+        self.assertEqual(RateLimitCounter.objects.get().count, 3)
+        # Halfway through the next window half of the previous one still counts
+        self.assertEqual(hit('/login/:1.2.3.4', 100, now=1150), 2.5)
+        self.assertEqual(hit('/login/:5.6.7.8', 100, now=1150), 1)
+
+        self.assertEqual(purge_expired(now=1199), 0)
+        self.assertEqual(purge_expired(now=1201), 1)
+        self.assertEqual(RateLimitCounter.objects.count(), 2)
+
+    @override_settings(RATE_LIMITS=[('/login/', 2, 60)])
+    def test_middleware_blocks_over_limit(self):
+        self.assertEqual(self.client.get(reverse('login')).status_code, 200)
+        self.assertEqual(self.client.get(reverse('login')).status_code, 200)
+        self.assertEqual(self.client.get(reverse('login')).status_code, 403)
+        # Other clients have their own counters
+        self.assertEqual(self.client.get(reverse('login'), REMOTE_ADDR='10.0.0.9').status_code, 200)
+
+
+class TwoTierCacheTests(TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_dir, ignore_errors=True)
+        settings_override = override_settings(CACHES={
+            'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+            'shared': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': self.cache_dir},
+        })
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def process(self, **options):
+        """One worker's view of the cache"""
+        return TwoTierCache('', {'OPTIONS': {'L2': 'shared', 'CHECK_INTERVAL': 0, **options}})
+
+    def test_writes_in_one_process_invalidate_l1_in_others(self):
+        first, second = self.process(), self.process()
+        first.set('stats', {'total': 1})
+        self.assertEqual(second.get('stats'), {'total': 1})
+        first.set('stats', {'total': 2})
+        self.assertEqual(second.get('stats'), {'total': 2})
+        first.delete('stats')
+        self.assertIsNone(second.get('stats'))
+
+    def test_l1_serves_hits_until_the_stamp_is_checked(self):
+        first, second = self.process(), self.process(CHECK_INTERVAL=3600)
+        first.set('stats', [1, 2])
+        self.assertEqual(second.get('stats'), [1, 2])
+        first.set('stats', [3])
+        # Within the check interval the process keeps its own copy...
+        value = second.get('stats')
+        self.assertEqual(value, [1, 2])
+        value.append(99)
+        self.assertEqual(second.get('stats'), [1, 2])
+        # ...which is dropped at the next check
+        second._generations.clear()
+        self.assertEqual(second.get('stats'), [3])
+
+    def test_add_is_decided_by_the_shared_tier(self):
+        first, second = self.process(), self.process()
+        self.assertTrue(first.add('throttle', True, 60))
+        self.assertFalse(second.add('throttle', True, 60))
+        self.assertTrue(second.get('throttle'))
+
+    def test_only_overwrites_and_deletes_invalidate_their_namespace(self):
+        first, second = self.process(), self.process()
+        first.set('stats:2024', 1)
+        first.set('scores:all', 2)
+        self.assertEqual((second.get('stats:2024'), second.get('scores:all')), (1, 2))
+        entries = lambda: {key: second._l1.get(second.make_key(key)) for key in ('stats:2024', 'scores:all')}
+        before = entries()
+        # A new key, or deleting one that is not there, cannot be stale anywhere
+        first.add('stats:2025', 3)
+        first.delete('stats:1999')
+        first.get_or_set('scores:page', 4)
+        second.get('stats:2024'), second.get('scores:all')
+        self.assertEqual(entries(), before)
+        # Overwriting drops that namespace only
+        first.set('stats:2024', 5)
+        self.assertEqual((second.get('scores:all'), second.get('stats:2024')), (2, 5))
+        after = entries()
+        self.assertIs(after['scores:all'], before['scores:all'])
+        self.assertIsNot(after['stats:2024'], before['stats:2024'])
+        first.delete('scores:all')
+        self.assertIsNone(second.get('scores:all'))
+        first.clear()
+        self.assertIsNone(second.get('stats:2024'))
+
+    def test_l1_is_bounded(self):
+        worker = self.process(L1_MAX_ENTRIES=2)
+        for key in ('a', 'b', 'c'):
+            worker.set(key, key)
+        self.assertEqual(len(worker._l1), 2)
+        self.assertEqual(worker.get('a'), 'a')  # Still in the shared tier
+
+
+@override_settings(AUDIT_LOG_ASYNC=False, REQUEST_METRICS_ENABLED=True, SERVER_TIMING_HEADER=True, SLOW_REQUEST_MS=60000)
+class RequestMetricsTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('staff', password='pass12345')
+        self.client.force_login(self.user)
+
+    def server_timing(self, response):
+        """Server-Timing header as {metric: {param: value}}"""
+        metrics = {}
+        for entry in response['Server-Timing'].split(', '):
+            name, *params = entry.split(';')
+            metrics[name] = dict(param.split('=', 1) for param in params)
+        return metrics
+
+    def test_server_timing_reports_queries_and_render_time(self):
+        make_member('M001')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('member_list'))
+        timing = self.server_timing(response)
+        self.assertEqual(timing['db']['desc'], f'"{len(queries)} queries"')
+        self.assertGreater(float(timing['template']['dur']), 0)
+        self.assertGreaterEqual(float(timing['total']['dur']), float(timing['view']['dur']))
+
+    def test_audit_record_includes_metrics(self):
+        with self.assertLogs('audit', 'INFO') as logs:
+            self.client.get(reverse('member_list'))
+        [record] = [record for record in logs.records if record.audit_action == 'http_request']
+        self.assertEqual(record.audit_extra['status_code'], 200)
+        self.assertGreater(record.audit_extra['db_queries'], 0)
+        self.assertIn('template_time_ms', record.audit_extra)
+
+    @override_settings(SLOW_REQUEST_MS=0, SLOW_REQUEST_QUERY_COUNT=2)
+    def test_slow_requests_log_their_slowest_queries(self):
+        with self.assertLogs('audit', 'WARNING') as logs:
+            self.client.get(reverse('member_list'))
+        [record] = [record for record in logs.records if record.audit_action == 'slow_request']
+        slowest = record.audit_extra['slowest_queries']
+        self.assertEqual(len(slowest), 2)
+        self.assertGreaterEqual(slowest[0]['duration_ms'], slowest[1]['duration_ms'])
+
+    def test_streamed_body_is_measured_and_logged_once_consumed(self):
+        self.user.is_superuser = True
+        self.user.save()
+        make_member('M001')
+        with self.assertLogs('audit', 'INFO') as logs:
+            response = self.client.post(reverse('member_info_export'), {'format': 'csv', 'is_adults': 'true'})
+            self.assertNotIn('Server-Timing', response)
+            self.assertFalse([record for record in logs.records if record.audit_action == 'http_request'])
+            with CaptureQueriesContext(connection) as queries:
+                body = b''.join(response.streaming_content)
+        self.assertIn(b'M001', body)
+        self.assertGreater(len(queries), 0)
+        [record] = [record for record in logs.records if record.audit_action == 'http_request']
+        self.assertGreaterEqual(record.audit_extra['db_queries'], len(queries))
+
+    def test_repeated_query_shapes_are_flagged(self):
+        metrics = RequestMetrics(track_shapes=True)
+        execute = lambda sql, params, many, context: None
+        for ids in (['M1'], ['M1', 'M2'], ['M1', 'M2', 'M3']):
+            placeholders = ', '.join(['%s'] * len(ids))
+            metrics(execute, f'SELECT * FROM app_member WHERE member_id IN ({placeholders})', ids, False, {})
+        metrics(execute, 'UPDATE app_member SET member_is_active = %s', [True], False, {})
+        self.assertEqual(metrics.repeated_queries(3), [(3, 'SELECT * FROM app_member WHERE member_id IN (%s...)')])
+        self.assertEqual(metrics.repeated_queries(4), [])
+
+    @override_settings(QUERY_REPEAT_CHECK='raise', QUERY_REPEAT_THRESHOLD=2)
+    def test_repeat_check_fails_the_request(self):
+        # The session and user are loaded once each; member_list runs its own SELECTs once
+        self.assertEqual(self.client.get(reverse('member_list')).status_code, 200)
+        with override_settings(QUERY_REPEAT_THRESHOLD=1), self.assertRaises(RepeatedQueriesError):
+            self.client.get(reverse('member_list'))
+
+    def test_cache_lookups_are_counted_for_the_current_request(self):
+        record_cache_lookup(hit=True)  # Outside a request: ignored
+        metrics = RequestMetrics()
+        token = request_metrics._current.set(metrics)
+        try:
+            record_cache_lookup(hit=True)
+            record_cache_lookup(hit=False)
+        finally:
+            request_metrics._current.reset(token)
+        self.assertEqual((metrics.cache_hits, metrics.cache_misses), (1, 1))
+
+
+class SeedAndBenchmarkTests(TestCase):
+    def setUp(self):
+        self.output_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.output_dir, ignore_errors=True)
+
+    def test_seeded_club_is_consistent(self):
+        call_command('seed_club', members=30, meetings=4, attendance=80, payment_rate=1, stdout=StringIO())
+        self.assertEqual((Member.objects.count(), MeetingInfo.objects.count()), (30, 4))
+        self.assertEqual(MemberAttendance.objects.count(), 80)
+        self.assertEqual(Payment.objects.count(), MemberAttendance.objects.filter(attendance_fee_status=True).count())
+        self.assertEqual((verify_meeting_summaries(), verify_member_states(), verify_ledgers()), ([], [], []))
+        with self.assertRaises(CommandError):
+            call_command('seed_club', members=5, meetings=1, stdout=StringIO())
+
+    def test_benchmark_report_is_compared_with_baseline(self):
+        call_command('seed_club', members=10, meetings=2, attendance=20, stdout=StringIO())
+        report_path = os.path.join(self.output_dir, 'report.json')
+        baseline_path = os.path.join(self.output_dir, 'baseline.json')
+        options = {'view': ['dashboard', 'export_members_csv'], 'repeat': 2, 'warmup': 0, 'output': report_path, 'baseline': baseline_path}
+
+        call_command('benchmark_views', save_baseline=True, stdout=StringIO(), **options)
+        with open(baseline_path) as f:
+            baseline = json.load(f)
+        self.assertEqual(set(baseline['views']), {'dashboard', 'export_members_csv'})
+        self.assertEqual(baseline['views']['dashboard']['status_codes'], [200])
+        self.assertGreater(baseline['views']['dashboard']['queries'], 0)
+
+        # A baseline that needed fewer queries makes the run fail
+        baseline['views']['dashboard']['queries'] = 0
+        with open(baseline_path, 'w') as f:
+            json.dump(baseline, f)
+        with self.assertRaises(CommandError):
+            call_command('benchmark_views', fail_on_regression=True, stdout=StringIO(), **options)
+        with open(report_path) as f:
+            self.assertIn('dashboard', json.load(f)['baseline']['regressions'])
+        self.assertFalse(User.objects.filter(username='benchmark').exists())
+
+    def test_benchmark_refuses_unseeded_data(self):
+        call_command('seed_club', members=10, meetings=2, attendance=20, prefix='R', stdout=StringIO())
+        options = {'view': ['dashboard'], 'repeat': 1, 'warmup': 0, 'output': os.path.join(self.output_dir, 'report.json')}
+        with self.assertRaises(CommandError):
+            call_command('benchmark_views', stdout=StringIO(), **options)
+        call_command('benchmark_views', allow_writes=True, stdout=StringIO(), **options)
+        call_command('benchmark_views', prefix='R', stdout=StringIO(), **options)
+
+
+class QueryBudgetTests(TestCase):
+    """
+    Upper bounds on the queries each page runs. Each page is measured on two
+    club sizes and must run the same number on both, so a per-row query fails
+    however far below its budget it is.
+    """
+    BUDGETS = {
+        'dashboard': 34,
+        'member_list': 6,
+        'member_view': 6,
+        'member_attendance_report': 10,
+        'meeting_list': 6,
+        'attendance_date_all': 7,
+        'attendance_date': 7,
+        'attendance_bulk_mark': 9,
+        'attendance_heatmap': 9,
+        'calendar_view': 7,
+        'payment_list': 8,
+        'payment_statistics': 8,
+        'payment_arrears': 7,
+        'export_attendance_report': 7,
+        'member_attendance_export': 7,
+        'activity_feed': 6,
+        'member_leaderboard': 9,
+        'reports_declining_attendance': 7,
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command('seed_club', members=12, meetings=8, attendance=80, payment_rate=1, stdout=StringIO())
+        cls.user = User.objects.create_superuser('admin', password='pass12345')
+        cls.meeting = MeetingInfo.objects.order_by('-meeting_date').first()
+        cls.member = Member.objects.order_by('member_id').first()
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def urls(self):
+        meeting_id, member_id = self.meeting.meeting_id, self.member.member_id
+        return {
+            'dashboard': (reverse('dashboard'), {}),
+            'member_list': (reverse('member_list'), {}),
+            'member_view': (reverse('member_view', args=[member_id]), {}),
+            'member_attendance_report': (reverse('member_attendance_report', args=[member_id]), {}),
+            'meeting_list': (reverse('meeting_list'), {}),
+            'attendance_date_all': (reverse('attendance_date_all'), {}),
+            'attendance_date': (reverse('attendance_date', args=[meeting_id]), {}),
+            'attendance_bulk_mark': (reverse('attendance_bulk_mark'), {'meeting_id': meeting_id}),
+            'attendance_heatmap': (reverse('attendance_heatmap'), {'year': self.meeting.meeting_date.year}),
+            'calendar_view': (reverse('calendar_view'), {}),
+            'payment_list': (reverse('payment_list'), {}),
+            'payment_statistics': (reverse('payment_statistics'), {}),
+            'payment_arrears': (reverse('payment_arrears'), {}),
+            'export_attendance_report': (reverse('export_attendance_report', args=[meeting_id]), {'format': 'csv'}),
+            'member_attendance_export': (reverse('member_attendance_export', args=[member_id]), {}),
+            'activity_feed': (reverse('activity_feed'), {}),
+            'member_leaderboard': (reverse('member_leaderboard'), {}),
+            'reports_declining_attendance': (reverse('reports_declining_attendance'), {}),
+        }
+
+    def query_counts(self):
+        """Queries each page runs, from a cold cache"""
+        counts = {}
+        for name, (url, params) in self.urls().items():
+            cache.clear()
+            cache.set('dashboard_deactivation_check', True, 3600)
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url, params)
+                # Streamed exports run their queries while the body is read
+                b''.join(response.streaming_content) if response.streaming else response.content
+            self.assertEqual(response.status_code, 200, name)
+            counts[name] = len(queries)
+        return counts
+
+    def test_views_stay_within_query_budgets(self):
+        small = self.query_counts()
+        # Three times the members and attendance: a per-row query shows up as a different count
+        call_command('seed_club', members=36, meetings=8, attendance=240, payment_rate=1, prefix='T', stdout=StringIO())
+        large = self.query_counts()
+        for name, budget in self.BUDGETS.items():
+            with self.subTest(view=name):
+                self.assertEqual(large[name], small[name], f'{name} ran {small[name]} queries, then {large[name]} on a larger club')
+                self.assertLessEqual(small[name], budget, f'{name} ran {small[name]} queries')
+
+
+class EngagementTests(ClearedCacheTestCase):
+    def setUp(self):
+        super().setUp()
+        today = timezone.localdate()
+        self.meetings = [make_meeting(today - timedelta(days=200))] + [
+            make_meeting(today - timedelta(days=days)) for days in (60, 30, 7)
+        ]
+        self.leader = make_member('E1', member_role='PRESIDENT')
+        self.newcomer = make_member('E2')
+        self.former = make_member('E3', is_active=False)
+        for i, meeting in enumerate(self.meetings):
+            mark(meeting, self.leader, paid=i < 2)
+        mark(self.meetings[-1], self.newcomer)
+        mark(self.meetings[0], self.former, paid=True)
+
+    def test_scores_every_active_member_with_the_weighting(self):
+        scores = {entry.member_id: entry for entry in compute_engagement_scores()}
+        self.assertEqual(set(scores), {'E1', 'E2'})
+        leader = scores['E1']
+        self.assertEqual((leader.attendance, leader.payment, leader.recent_activity, leader.leadership), (40.0, 15.0, 20.0, 10))
+        self.assertEqual((leader.score, leader.grade), (85.0, 'A'))
+        newcomer = scores['E2']
+        self.assertEqual((newcomer.attendance, newcomer.payment, newcomer.recent_activity), (10.0, 0.0, 6.7))
+        self.assertEqual((newcomer.score, newcomer.grade), (16.7, 'F'))
+
+    def test_inactive_members_are_scored_on_their_own(self):
+        self.assertEqual(calculate_member_engagement_score(self.former), {
+            'score': 40.0,
+            'breakdown': {'attendance': 10.0, 'payment': 30.0, 'recent_activity': 0.0, 'leadership': 0},
+            'grade': 'F',
+        })
+
+    def test_snapshot_is_cached_until_attendance_changes(self):
+        self.assertEqual(len(get_engagement_scores()), 2)
+        with self.assertNumQueries(0):
+            get_engagement_scores()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            mark(self.meetings[0], self.newcomer, paid=True)
+        self.assertIsNone(cache.get(ENGAGEMENT_CACHE_KEY))
+        newcomer = {entry.member_id: entry for entry in get_engagement_scores()}['E2']
+        self.assertEqual(newcomer.attendance, 20.0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            make_meeting(timezone.localdate())
+        self.assertIsNone(cache.get(ENGAGEMENT_CACHE_KEY))
+
+    def test_leaderboard_sorts_and_paginates(self):
+        user = User.objects.create_superuser('admin', password='pass12345')
+        self.client.force_login(user)
+        response = self.client.get(reverse('member_leaderboard'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([entry.member_id for _rank, entry in response.context['leaderboard']], ['E1', 'E2'])
+
+        response = self.client.get(reverse('member_leaderboard'), {'sort': 'score', 'dir': 'asc'})
+        self.assertEqual([(rank, entry.member_id) for rank, entry in response.context['leaderboard']], [(2, 'E2'), (1, 'E1')])
+
+        for i in range(30):
+            make_member(f'F{i:02d}')
+        cache.clear()
+        response = self.client.get(reverse('member_leaderboard'), {'sort': 'member_id', 'page': 2})
+        self.assertEqual(response.context['page_obj'].paginator.count, 32)
+        self.assertEqual(len(response.context['leaderboard']), 7)
+        self.assertEqual(response.context['leaderboard'][0][1].member_id, 'F23')
+
+
+class RecommendationProviderTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        today = timezone.localdate()
+        self.recent = [make_meeting(today - timedelta(days=days)) for days in (10, 40, 70)]
+        self.previous = [make_meeting(today - timedelta(days=days)) for days in (100, 130, 160)]
+        self.members = [make_member(f'R{i:02d}') for i in range(12)]
+
+    def test_results_are_cached_per_provider(self):
+        first = get_smart_recommendations(None)
+        self.assertTrue(first)
+        self.assertEqual(set(recommendations.PROVIDERS), {'meetings', 'members', 'attendance', 'payments', 'badges'})
+        for name in recommendations.PROVIDERS:
+            self.assertIsNotNone(cache.get(recommendations.CACHE_PREFIX + name))
+        with self.assertNumQueries(0):
+            self.assertEqual(get_smart_recommendations(None), first)
+
+    def test_stale_results_are_served_then_refreshed(self):
+        provider = recommendations.PROVIDERS['meetings']
+        stale = {'title': 'Stale meeting advice', 'priority': 10}
+        cache.set(recommendations.CACHE_PREFIX + 'meetings', {'items': [stale], 'fresh_until': 0}, 3600)
+
+        self.assertIn(stale, get_smart_recommendations(None))
+        # A second request while the refresh is pending does not claim it again
+        self.assertFalse(cache.add(recommendations.CACHE_PREFIX + 'meetings:refreshing', True, 60))
+
+        recommendations.refresh_pending_recommendations()
+        entry = cache.get(recommendations.CACHE_PREFIX + 'meetings')
+        self.assertNotIn(stale, entry['items'])
+        self.assertGreater(entry['fresh_until'], time.time() + provider.ttl - 60)
+        self.assertIsNone(cache.get(recommendations.CACHE_PREFIX + 'meetings:refreshing'))
+
+    @override_settings(RECOMMENDATIONS_TIME_BUDGET_MS=0)
+    def test_cold_providers_over_budget_are_computed_after_the_response(self):
+        self.assertEqual(get_smart_recommendations(None), [])
+        recommendations.refresh_pending_recommendations()
+        self.assertTrue(get_smart_recommendations(None))
+
+    def test_providers_look_at_every_member(self):
+        # Only the last members qualify, past any sample of the first few
+        for member in self.members[-3:]:
+            for meeting in self.previous:
+                mark(meeting, member)
+        titles = {item['title']: item for item in get_smart_recommendations(None)}
+        self.assertIn('3 members have shown declining attendance', titles['Multiple Members Showing Declining Attendance']['message'])
+        self.assertTrue(titles['Award Badges']['message'].startswith('3 members'))
+
+
+class AttendanceAnalyticsTests(TestCase):
+    def setUp(self):
+        self.end = date(2024, 6, 30)
+        self.previous = [make_meeting(self.end - timedelta(days=days)) for days in (170, 140, 110)]
+        self.recent = [make_meeting(self.end - timedelta(days=days)) for days in (80, 50, 20)]
+        self.year_ago = make_meeting(self.end - timedelta(days=300))
+        self.dropped = make_member('D1')
+        self.steady = make_member('D2')
+        self.slipping = make_member('D3')
+        self.inactive = make_member('D4', is_active=False)
+        for meeting in self.previous:
+            for member in (self.dropped, self.steady, self.slipping, self.inactive):
+                mark(meeting, member)
+        for meeting in self.recent:
+            mark(meeting, self.steady)
+        for meeting in self.recent[:2]:
+            mark(meeting, self.slipping)
+        mark(self.recent[0], self.dropped, present=False)
+        mark(self.year_ago, self.steady)
+        # Only present outside both 90-day windows
+        mark(self.year_ago, make_member('D5'))
+
+    def test_window_counts_come_from_one_query(self):
+        previous_ids, recent_ids = window_meetings(90, self.end)
+        self.assertEqual(len(previous_ids), 3)
+        with self.assertNumQueries(1):
+            counts = {row['member_id']: (row['previous_count'], row['recent_count']) for row in member_window_counts(previous_ids, recent_ids)}
+        self.assertEqual(counts, {'D1': (3, 0), 'D2': (3, 3), 'D3': (3, 2), 'D4': (3, 0)})
+
+    def test_declining_members_across_windows(self):
+        trends = declining_members(90, end=self.end)
+        self.assertEqual([(trend.member_id, trend.change) for trend in trends], [('D1', -100.0), ('D3', -33.3)])
+        # 3 -> 2 is not a drop of more than 50%
+        self.assertEqual([trend.member_id for trend in declining_members(90, threshold=0.5, end=self.end)], ['D1'])
+        # Year over year: no meetings were held in the year before
+        self.assertEqual([trend.member_id for trend in declining_members(365, end=self.end)], [])
+
+    def test_report_page_and_json(self):
+        user = User.objects.create_superuser('admin', password='pass12345')
+        self.client.force_login(user)
+        for meeting in self.recent:
+            meeting.meeting_date = timezone.localdate() - (self.end - meeting.meeting_date)
+            meeting.save()
+        for meeting in self.previous:
+            meeting.meeting_date = timezone.localdate() - (self.end - meeting.meeting_date)
+            meeting.save()
+
+        response = self.client.get(reverse('reports_declining_attendance'), {'min_drop': 50})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([trend.member_id for trend in response.context['members']], ['D1'])
+
+        data = self.client.get(reverse('reports_declining_attendance_json'), {'window': 'bogus'}).json()
+        self.assertEqual((data['window'], data['min_drop'], data['count']), ('3m', 30, 2))
+        self.assertEqual(data['results'][0], {
+            'member_id': 'D1', 'first_name': 'FirstD1', 'last_name': 'LastD1',
+            'previous_count': 3, 'recent_count': 0, 'change': -100.0,
+        })
+        self.assertEqual((data['previous_meetings'], data['recent_meetings']), (3, 3))
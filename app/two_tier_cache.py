@@ -0,0 +1,185 @@
+"""
+Two-tier cache backend
+A small per-process LRU (L1) in front of a cache shared by every worker
+process (L2, e.g. the file or database cache). Writes go to both tiers.
+
+Keys are grouped into namespaces by the text before their first ':'
+('payment_stats:2024' is in 'payment_stats'), each with a generation stamp in
+L2. Overwriting or deleting a value replaces its namespace's stamp; other
+processes compare a namespace's stamp at most every CHECK_INTERVAL seconds
+when they read from it, and drop their L1 entries of that namespace when it
+has changed (clear() changes every namespace's stamp). add() and deleting a
+missing key leave the stamp alone: no other process can hold a copy of a key
+that was not in L2.
+
+Configuration:
+    CACHES = {
+        'default': {
+            'BACKEND': 'app.two_tier_cache.TwoTierCache',
+            'OPTIONS': {'L2': 'shared', 'L1_MAX_ENTRIES': 1000, 'L1_TIMEOUT': 10, 'CHECK_INTERVAL': 1},
+        },
+        'shared': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': '/tmp/mms_cache'},
+    }
+"""
+import pickle
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from .request_metrics import record_cache_lookup
+
+
+GENERATION_KEY = 'two_tier_cache:generation:{namespace}'
+CLEARED_KEY = 'two_tier_cache:cleared'  # Replaced by clear(), part of every namespace's stamp
+
+
+class TwoTierCache(BaseCache):
+    """
+    L1 entries are stored pickled, like LocMemCache, so callers can mutate
+    what they get back. An L1 entry lives at most L1_TIMEOUT seconds, which
+    also bounds staleness if two processes replace the stamp at the same time.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._l2_alias = options.get('L2', 'shared')
+        self._l1_max_entries = int(options.get('L1_MAX_ENTRIES', 1000))
+        self._l1_timeout = float(options.get('L1_TIMEOUT', 10))
+        self._check_interval = float(options.get('CHECK_INTERVAL', 1))
+        self._l1 = OrderedDict()  # key -> (pickled value, expires at (monotonic), namespace)
+        self._lock = threading.Lock()
+        self._generations = {}  # namespace -> (stamp, checked at (monotonic))
+
+    @property
+    def l2(self):
+        return caches[self._l2_alias]
+
+    # L1 helpers (keys are already made and validated)
+
+    def _l1_get(self, key):
+        with self._lock:
+            entry = self._l1.get(key)
+            if entry is None:
+                return None
+            if entry[1] <= time.monotonic():
+                del self._l1[key]
+                return None
+            self._l1.move_to_end(key)
+            return entry[0]
+
+    def _l1_set(self, key, value, timeout, namespace):
+        expires = self._l1_timeout if timeout is None else min(timeout, self._l1_timeout)
+        if expires <= 0:
+            self._l1_delete(key)
+            return
+        pickled = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._l1[key] = (pickled, time.monotonic() + expires, namespace)
+            self._l1.move_to_end(key)
+            while len(self._l1) > self._l1_max_entries:
+                self._l1.popitem(last=False)
+
+    def _l1_delete(self, key):
+        with self._lock:
+            self._l1.pop(key, None)
+
+    @staticmethod
+    def _namespace(key):
+        return str(key).split(':', 1)[0]
+
+    def _validate_l1(self, namespace):
+        """Drop the namespace's L1 entries if another process has changed it since the last check"""
+        now = time.monotonic()
+        known = self._generations.get(namespace)
+        if known is not None and now - known[1] < self._check_interval:
+            return
+        generation_key = GENERATION_KEY.format(namespace=namespace)
+        stamps = self.l2.get_many([generation_key, CLEARED_KEY])
+        generation = (stamps.get(generation_key), stamps.get(CLEARED_KEY))
+        if known is None or generation != known[0]:
+            with self._lock:
+                for key in [key for key, entry in self._l1.items() if entry[2] == namespace]:
+                    del self._l1[key]
+        self._generations[namespace] = (generation, now)
+
+    def _bump_generation(self, namespace):
+        generation = uuid.uuid4().hex
+        self.l2.set(GENERATION_KEY.format(namespace=namespace), generation, None)
+        known = self._generations.get(namespace)
+        if known is not None:
+            self._generations[namespace] = ((generation, known[0][1]), known[1])
+
+    def _l2_timeout(self, timeout):
+        return self.default_timeout if timeout is DEFAULT_TIMEOUT else timeout
+
+    # Cache API - L2 keys are made by the L2 backend from the original key
+
+    def get(self, key, default=None, version=None):
+        l1_key = self.make_and_validate_key(key, version=version)
+        namespace = self._namespace(key)
+        self._validate_l1(namespace)
+        pickled = self._l1_get(l1_key)
+        if pickled is not None:
+            record_cache_lookup(hit=True)
+            return pickle.loads(pickled)
+
+        sentinel = object()
+        value = self.l2.get(key, sentinel, version=version)
+        record_cache_lookup(hit=value is not sentinel)
+        if value is sentinel:
+            return default
+        self._l1_set(l1_key, value, self._l1_timeout, namespace)
+        return value
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        l1_key = self.make_and_validate_key(key, version=version)
+        timeout = self._l2_timeout(timeout)
+        self.l2.set(key, value, timeout, version=version)
+        self._bump_generation(self._namespace(key))
+        self._l1_set(l1_key, value, timeout, self._namespace(key))
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        l1_key = self.make_and_validate_key(key, version=version)
+        timeout = self._l2_timeout(timeout)
+        # Always ask L2: it decides whether the key exists for every process.
+        # The key was missing there, so no process has it in L1 to invalidate
+        if not self.l2.add(key, value, timeout, version=version):
+            return False
+        self._l1_set(l1_key, value, timeout, self._namespace(key))
+        return True
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        l1_key = self.make_and_validate_key(key, version=version)
+        touched = self.l2.touch(key, self._l2_timeout(timeout), version=version)
+        self._l1_delete(l1_key)
+        return touched
+
+    def delete(self, key, version=None):
+        l1_key = self.make_and_validate_key(key, version=version)
+        deleted = self.l2.delete(key, version=version)
+        self._l1_delete(l1_key)
+        if deleted:
+            self._bump_generation(self._namespace(key))
+        return deleted
+
+    def has_key(self, key, version=None):
+        l1_key = self.make_and_validate_key(key, version=version)
+        self._validate_l1(self._namespace(key))
+        return self._l1_get(l1_key) is not None or self.l2.has_key(key, version=version)
+
+    def incr(self, key, delta=1, version=None):
+        l1_key = self.make_and_validate_key(key, version=version)
+        value = self.l2.incr(key, delta, version=version)
+        self._l1_delete(l1_key)
+        self._bump_generation(self._namespace(key))
+        return value
+
+    def clear(self):
+        self.l2.clear()
+        self.l2.set(CLEARED_KEY, uuid.uuid4().hex, None)
+        with self._lock:
+            self._l1.clear()
+        self._generations.clear()
@@ -7,9 +7,11 @@ from .views_attendance_bulk import *
 from .views import *
 from .views_db import database_management
 from .views_calendar import calendar_view
-from .views_payment import payment_list, payment_add, payment_edit, payment_delete, payment_statistics
-from .views_reports import reports_builder, reports_quick_stats
+from .views_payment import payment_list, payment_add, payment_edit, payment_delete, payment_statistics, payment_arrears
+from .views_reports import reports_builder, reports_quick_stats, reports_declining_attendance, reports_declining_attendance_json
+from .views_exports import export_job_list, export_job_status, export_job_download
 from .views_heatmap import attendance_heatmap
+from .views_activity import activity_feed
 
 urlpatterns = [
 
@@ -27,6 +29,7 @@ urlpatterns = [
 
     path('member/list/', member_list, name='member_list'),
     path('member/list/adults/', member_list_adults, name='member_list_adults'),
+    path('member/leaderboard/', member_leaderboard, name='member_leaderboard'),
     path('member/register/', member_register, name='member_register'),
     path('member/delete/<str:member_id>', member_delete, name="member_delete"),
     path('member/view/<str:member_id>', member_view, name="member_view"),
@@ -69,9 +72,18 @@ urlpatterns = [
     path('payment/edit/<int:payment_id>/', payment_edit, name='payment_edit'),
     path('payment/delete/<int:payment_id>/', payment_delete, name='payment_delete'),
     path('payment/statistics/', payment_statistics, name='payment_statistics'),
+    path('payment/arrears/', payment_arrears, name='payment_arrears'),
     
     # Custom Reports Builder
     path('reports/builder/', reports_builder, name='reports_builder'),
     path('reports/quick-stats/', reports_quick_stats, name='reports_quick_stats'),
+    path('reports/declining-attendance/', reports_declining_attendance, name='reports_declining_attendance'),
+    path('reports/declining-attendance/data/', reports_declining_attendance_json, name='reports_declining_attendance_json'),
+    path('reports/exports/', export_job_list, name='export_job_list'),
+    path('reports/exports/<int:job_id>/status/', export_job_status, name='export_job_status'),
+    path('reports/exports/<int:job_id>/download/', export_job_download, name='export_job_download'),
+
+    # Audit trail
+    path('activity/feed/', activity_feed, name='activity_feed'),
 
 ]
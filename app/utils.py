@@ -6,6 +6,8 @@ import qrcode
 from django.conf import settings
 from django.db.models import Q
 from .models import Member, MeetingInfo, MemberAttendance
+from .member_state import get_member_state
+from .engagement import get_engagement_scores, get_member_engagement
 
 
 def generate_qr_code(member_id):
@@ -34,6 +36,11 @@ def check_and_deactivate_inactive_members(consecutive_meetings=3, dry_run=False)
     """
     Check for members who haven't attended N consecutive meetings and deactivate them.
     
+    Reads consecutive_misses from MemberAttendanceState, so it runs a fixed
+    number of queries regardless of member count or history length: the
+    meeting count, the active-member count, the matching members, and a
+    single UPDATE.
+    
     Args:
         consecutive_meetings: Number of consecutive meetings to check (default: 3)
         dry_run: If True, only return list without deactivating (default: False)
@@ -44,42 +51,20 @@ def check_and_deactivate_inactive_members(consecutive_meetings=3, dry_run=False)
             'deactivated_members': list of member objects
         }
     """
-    # Get the latest N meetings ordered by date (newest first)
-    latest_meetings = MeetingInfo.objects.all().order_by('-meeting_date')[:consecutive_meetings]
-
-    if not latest_meetings.exists() or latest_meetings.count() < consecutive_meetings:
+    if MeetingInfo.objects.count() < consecutive_meetings:
         return {
             'deactivated_count': 0,
             'deactivated_members': [],
             'message': f'Not enough meetings found. Need at least {consecutive_meetings} meetings.'
         }
 
-    # Get all active members
     active_members = Member.objects.filter(member_is_active=True)
+    active_count = active_members.count()
 
-    deactivated_members = []
-
-    for member in active_members:
-        # Check attendance for the latest N meetings
-        missed_count = 0
-        
-        for meeting in latest_meetings:
-            # Check if member has an attendance record for this meeting
-            attendance = MemberAttendance.objects.filter(
-                member_id=member,
-                meeting_date=meeting
-            ).first()
-
-            # If no attendance record OR attendance_status is False, member missed the meeting
-            if not attendance or not attendance.attendance_status:
-                missed_count += 1
-            else:
-                # If member attended any meeting in the sequence, break (not consecutive)
-                break
-
-        # If member missed all N consecutive meetings, mark for deactivation
-        if missed_count == consecutive_meetings:
-            deactivated_members.append(member)
+    # Missing row or attendance_status=False both count as a missed meeting
+    deactivated_members = list(
+        active_members.filter(attendance_state__consecutive_misses__gte=consecutive_meetings)
+    )
 
     if not dry_run and deactivated_members:
         # Deactivate members
@@ -91,7 +76,7 @@ def check_and_deactivate_inactive_members(consecutive_meetings=3, dry_run=False)
     return {
         'deactivated_count': len(deactivated_members),
         'deactivated_members': deactivated_members,
-        'message': f'Checked {active_members.count()} active members against {latest_meetings.count()} latest meetings.'
+        'message': f'Checked {active_count} active members against {consecutive_meetings} latest meetings.'
     }
 
 
@@ -253,95 +238,7 @@ def calculate_member_engagement_score(member):
             'grade': str (A+, A, B, C, D, F)
         }
     """
-    from django.db.models import Count, Q
-    from datetime import datetime, timedelta
-    
-    score = 0
-    breakdown = {}
-    
-    # 1. Attendance Rate (40 points)
-    total_meetings = MeetingInfo.objects.count()
-    if total_meetings > 0:
-        attended = MemberAttendance.objects.filter(
-            member_id=member,
-            attendance_status=True
-        ).count()
-        attendance_rate = (attended / total_meetings) * 100
-        attendance_score = min(40, (attendance_rate / 100) * 40)
-        score += attendance_score
-        breakdown['attendance'] = round(attendance_score, 1)
-    else:
-        breakdown['attendance'] = 0
-    
-    # 2. Payment Rate (30 points)
-    attended_meetings = MemberAttendance.objects.filter(
-        member_id=member,
-        attendance_status=True
-    ).count()
-    if attended_meetings > 0:
-        paid_meetings = MemberAttendance.objects.filter(
-            member_id=member,
-            attendance_status=True,
-            attendance_fee_status=True
-        ).count()
-        payment_rate = (paid_meetings / attended_meetings) * 100
-        payment_score = min(30, (payment_rate / 100) * 30)
-        score += payment_score
-        breakdown['payment'] = round(payment_score, 1)
-    else:
-        breakdown['payment'] = 0
-    
-    # 3. Recent Activity (20 points) - Last 3 months
-    three_months_ago = datetime.now() - timedelta(days=90)
-    recent_meetings = MeetingInfo.objects.filter(
-        meeting_date__gte=three_months_ago.date()
-    ).count()
-    
-    if recent_meetings > 0:
-        recent_attendance = MemberAttendance.objects.filter(
-            member_id=member,
-            meeting_date__meeting_date__gte=three_months_ago.date(),
-            attendance_status=True
-        ).count()
-        recent_rate = (recent_attendance / recent_meetings) * 100
-        recent_score = min(20, (recent_rate / 100) * 20)
-        score += recent_score
-        breakdown['recent_activity'] = round(recent_score, 1)
-    else:
-        breakdown['recent_activity'] = 0
-    
-    # 4. Role/Leadership (10 points)
-    role_score = 0
-    if member.member_role:
-        if member.member_role in ['PRESIDENT', 'SECRETARY', 'TREASURY']:
-            role_score = 10
-        elif member.member_role in ['VICE_PRESIDENT', 'VICE_SECRETARY', 'VICE_TREASURY']:
-            role_score = 8
-        elif member.member_role == 'COMMITTEE_MEMBER':
-            role_score = 5
-    score += role_score
-    breakdown['leadership'] = role_score
-    
-    # Determine grade
-    final_score = round(score, 1)
-    if final_score >= 90:
-        grade = 'A+'
-    elif final_score >= 80:
-        grade = 'A'
-    elif final_score >= 70:
-        grade = 'B'
-    elif final_score >= 60:
-        grade = 'C'
-    elif final_score >= 50:
-        grade = 'D'
-    else:
-        grade = 'F'
-    
-    return {
-        'score': final_score,
-        'breakdown': breakdown,
-        'grade': grade
-    }
+    return get_member_engagement(member)
 
 
 def award_badges_to_member(member):
@@ -358,15 +255,12 @@ def award_badges_to_member(member):
     from datetime import datetime, timedelta
     
     newly_awarded = []
-    
-    # Get all meetings and attendance
-    all_meetings = MeetingInfo.objects.all().order_by('-meeting_date')
-    member_attendance = MemberAttendance.objects.filter(member_id=member)
+    state = get_member_state(member)
     
     # 1. Perfect Attendance (100% attendance)
-    total_meetings = all_meetings.count()
+    total_meetings = MeetingInfo.objects.count()
     if total_meetings > 0:
-        attended = member_attendance.filter(attendance_status=True).count()
+        attended = state.attended_count
         if attended == total_meetings and attended >= 5:
             if not MemberBadge.objects.filter(member=member, badge_type=BadgeType.PERFECT_ATTENDANCE).exists():
                 MemberBadge.objects.create(
@@ -377,8 +271,8 @@ def award_badges_to_member(member):
                 newly_awarded.append(BadgeType.PERFECT_ATTENDANCE)
     
     # 2. Attendance Streaks
-    streak_5 = check_attendance_streak(member, 5)
-    streak_10 = check_attendance_streak(member, 10)
+    streak_5 = state.current_streak >= 5
+    streak_10 = state.current_streak >= 10
     
     if streak_10:
         if not MemberBadge.objects.filter(member=member, badge_type=BadgeType.ATTENDANCE_STREAK_10).exists():
@@ -398,12 +292,9 @@ def award_badges_to_member(member):
             newly_awarded.append(BadgeType.ATTENDANCE_STREAK_5)
     
     # 3. Payment Champion (100% payment rate)
-    attended_meetings = member_attendance.filter(attendance_status=True).count()
+    attended_meetings = state.attended_count
     if attended_meetings >= 5:
-        paid_meetings = member_attendance.filter(
-            attendance_status=True,
-            attendance_fee_status=True
-        ).count()
+        paid_meetings = state.paid_attended_count
         if paid_meetings == attended_meetings:
             if not MemberBadge.objects.filter(member=member, badge_type=BadgeType.PAYMENT_CHAMPION).exists():
                 MemberBadge.objects.create(
@@ -456,21 +347,7 @@ def check_attendance_streak(member, required_streak):
     Returns:
         bool: True if streak exists
     """
-    recent_meetings = MeetingInfo.objects.all().order_by('-meeting_date')[:required_streak]
-    
-    if recent_meetings.count() < required_streak:
-        return False
-    
-    for meeting in recent_meetings:
-        attendance = MemberAttendance.objects.filter(
-            member_id=member,
-            meeting_date=meeting,
-            attendance_status=True
-        ).exists()
-        if not attendance:
-            return False
-    
-    return True
+    return get_member_state(member).current_streak >= required_streak
 
 
 def get_smart_recommendations():
@@ -538,17 +415,15 @@ def get_smart_recommendations():
                 'link': '/meeting/add/'
             })
     
-    # 4. Celebrate high performers
-    active_members = Member.objects.filter(member_is_active=True)
-    for member in active_members[:5]:  # Check top 5
-        score_data = calculate_member_engagement_score(member)
-        if score_data['score'] >= 90:
+    # 4. Celebrate high performers (scored together, see app.engagement)
+    for entry in get_engagement_scores():
+        if entry.score >= 90:
             recommendations.append({
                 'type': 'success',
-                'title': f'Top Performer: {member.member_id}',
-                'message': f'{member.member_first_name} {member.member_last_name} has an engagement score of {score_data["score"]}!',
+                'title': f'Top Performer: {entry.member_id}',
+                'message': f'{entry.first_name} {entry.last_name} has an engagement score of {entry.score}!',
                 'action': 'View profile',
-                'link': f'/member/view/{member.member_id}'
+                'link': f'/member/view/{entry.member_id}'
             })
     
     return recommendations[:10]  # Limit to 10 recommendations
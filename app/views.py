@@ -7,7 +7,6 @@ from datetime import datetime
 from django.db.models import Count
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.http import HttpResponse
-from openpyxl import Workbook
 from .constants import PAGINATION_MEMBER_ATTENDANCE_REPORT
 
 
@@ -30,8 +29,6 @@ def context_data(request):
 
 @login_required
 def dashboard(request):
-    from django.db.models import Q, Sum, Avg, F
-    from collections import defaultdict
     from django.core.cache import cache
     from .utils import check_and_deactivate_inactive_members
     from .constants import CONSECUTIVE_MEETINGS_FOR_DEACTIVATION
@@ -41,264 +38,62 @@ def dashboard(request):
     # Works in shared hosting/cPanel - no cron jobs needed!
     CACHE_KEY_DASHBOARD_CHECK = 'dashboard_deactivation_check'
     try:
-        cache_value = cache.get(CACHE_KEY_DASHBOARD_CHECK)
-        if not cache_value:
+        # add() claims the hour in the shared cache, so usually one worker runs the check
+        # (FileBasedCache.add() is not atomic; a rare second run deactivates nobody new)
+        if cache.add(CACHE_KEY_DASHBOARD_CHECK, True, 3600):
             try:
                 check_and_deactivate_inactive_members(
                     consecutive_meetings=CONSECUTIVE_MEETINGS_FOR_DEACTIVATION,
                     dry_run=False
                 )
-                # Cache for 1 hour to prevent running too frequently
+            except Exception:
+                # Silently fail to not interrupt dashboard loading - retry on the next visit
                 try:
-                    cache.set(CACHE_KEY_DASHBOARD_CHECK, True, 3600)
+                    cache.delete(CACHE_KEY_DASHBOARD_CHECK)
                 except Exception:
                     pass  # Cache might not be available
-            except Exception:
-                # Silently fail to not interrupt dashboard loading
-                pass
     except Exception:
         # If cache is completely unavailable, skip the check
         pass
 
-    current_year = datetime.now().year
-    current_month = datetime.now().month
-
-    # Basic counts
-    all_members = Member.objects.all().count()
-    active_members = Member.objects.filter(member_is_active=True).count()
-    passive_members = Member.objects.filter(member_is_active=False).count()
-    all_staff = User.objects.all().count()
-    all_meeting = MeetingInfo.objects.all().count()
-
-    # Current year statistics
-    meetings_this_year = MeetingInfo.objects.filter(meeting_date__year=current_year).count()
-    total_attendance_this_year = MemberAttendance.objects.filter(
-        meeting_date__meeting_date__year=current_year
-    ).count()
-    present_count_this_year = MemberAttendance.objects.filter(
-        meeting_date__meeting_date__year=current_year,
-        attendance_status=True
-    ).count()
-    paid_count_this_year = MemberAttendance.objects.filter(
-        meeting_date__meeting_date__year=current_year,
-        attendance_fee_status=True
-    ).count()
-
-    # Calculate attendance rate
-    if total_attendance_this_year > 0:
-        attendance_rate = (present_count_this_year / total_attendance_this_year) * 100
-    else:
-        attendance_rate = 0
-
-    # Calculate fee payment rate
-    if present_count_this_year > 0:
-        fee_payment_rate = (paid_count_this_year / present_count_this_year) * 100
-    else:
-        fee_payment_rate = 0
-
-    # Last 12 months attendance data for Attendance Trend
-    from datetime import date as date_obj, timedelta
-    today = date_obj.today()
-    # Calculate 12 months ago (approximate - 365 days)
-    twelve_months_ago = today - timedelta(days=365)
-    
-    # Get last 12 months of meetings
-    last_12_months_meetings = MeetingInfo.objects.filter(
-        meeting_date__gte=twelve_months_ago,
-        meeting_date__lte=today
-    ).order_by('meeting_date')
-    
-    # Group by month for last 12 months
-    monthly_labels = []
-    monthly_attendance_data = []
-    for i in range(11, -1, -1):  # Last 12 months, most recent last
-        # Calculate month date
-        target_year = today.year
-        target_month = today.month - i
-        while target_month <= 0:
-            target_month += 12
-            target_year -= 1
-        while target_month > 12:
-            target_month -= 12
-            target_year += 1
-        
-        month_date = date_obj(target_year, target_month, 1)
-        month_label = month_date.strftime('%b %Y')
-        monthly_labels.append(month_label)
-        
-        # Count attendance for this month
-        month_start = date_obj(target_year, target_month, 1)
-        if target_month == 12:
-            month_end = date_obj(target_year + 1, 1, 1) - timedelta(days=1)
-        else:
-            month_end = date_obj(target_year, target_month + 1, 1) - timedelta(days=1)
-        
-        month_attendance = MemberAttendance.objects.filter(
-            meeting_date__meeting_date__gte=month_start,
-            meeting_date__meeting_date__lte=month_end,
-            attendance_status=True
-        ).count()
-        monthly_attendance_data.append(month_attendance)
-    
-    # Meeting attendance over time (last 12 months)
-    meeting_attendance_counts = (
-        MemberAttendance.objects
-        .filter(
-            meeting_date__meeting_date__gte=twelve_months_ago,
-            meeting_date__meeting_date__lte=today,
-            attendance_status=True
-        )
-        .values('meeting_date__meeting_date')
-        .annotate(attendance_count=Count('attendance_id'))
-        .order_by('meeting_date__meeting_date')
-    )
-
-    meeting_dates = [entry['meeting_date__meeting_date'].strftime('%d %b') for entry in meeting_attendance_counts]
-    attendance_counts = [entry['attendance_count'] for entry in meeting_attendance_counts]
-    
-    # If no data, provide empty arrays for graphs
-    if not meeting_dates:
-        meeting_dates = []
-        attendance_counts = []
-
-    # Attendance vs Fee Payment comparison (last 12 months)
-    attendance_vs_fee = {
-        'present_paid': MemberAttendance.objects.filter(
-            meeting_date__meeting_date__gte=twelve_months_ago,
-            meeting_date__meeting_date__lte=today,
-            attendance_status=True,
-            attendance_fee_status=True
-        ).count(),
-        'present_unpaid': MemberAttendance.objects.filter(
-            meeting_date__meeting_date__gte=twelve_months_ago,
-            meeting_date__meeting_date__lte=today,
-            attendance_status=True,
-            attendance_fee_status=False
-        ).count(),
-        'absent': MemberAttendance.objects.filter(
-            meeting_date__meeting_date__gte=twelve_months_ago,
-            meeting_date__meeting_date__lte=today,
-            attendance_status=False
-        ).count(),
-    }
-    
-    # Last 12 months monthly payment data
-    monthly_payment_labels = []
-    monthly_payment_data = {
-        'paid': [],
-        'unpaid': []
-    }
-    for i in range(11, -1, -1):
-        # Calculate month date
-        target_year = today.year
-        target_month = today.month - i
-        while target_month <= 0:
-            target_month += 12
-            target_year -= 1
-        while target_month > 12:
-            target_month -= 12
-            target_year += 1
-        
-        month_date = date_obj(target_year, target_month, 1)
-        month_label = month_date.strftime('%b %Y')
-        monthly_payment_labels.append(month_label)
-        
-        month_start = date_obj(target_year, target_month, 1)
-        if target_month == 12:
-            month_end = date_obj(target_year + 1, 1, 1) - timedelta(days=1)
-        else:
-            month_end = date_obj(target_year, target_month + 1, 1) - timedelta(days=1)
-        
-        paid = MemberAttendance.objects.filter(
-            meeting_date__meeting_date__gte=month_start,
-            meeting_date__meeting_date__lte=month_end,
-            attendance_status=True,
-            attendance_fee_status=True
-        ).count()
-        unpaid = MemberAttendance.objects.filter(
-            meeting_date__meeting_date__gte=month_start,
-            meeting_date__meeting_date__lte=month_end,
-            attendance_status=True,
-            attendance_fee_status=False
-        ).count()
-        
-        monthly_payment_data['paid'].append(paid)
-        monthly_payment_data['unpaid'].append(unpaid)
-
-    # Latest meeting info
-    latest_meeting = None
-    latest_meeting_member_count = 0
-    try:
-        if MemberAttendance.objects.exists():
-            latest_meeting = MemberAttendance.objects.latest('meeting_date')
-            latest_meeting_member_count = MemberAttendance.objects.filter(
-                meeting_date=latest_meeting.meeting_date
-            ).values('member_id').distinct().count()
-    except:
-        latest_meeting = None
-        latest_meeting_member_count = 0
-
-    # Member status distribution for pie chart (with age groups)
-    from datetime import date as date_obj
-    today = date_obj.today()
-    cutoff_date = date_obj(today.year - 18, today.month, today.day)
-    if today.month == 2 and today.day == 29:
-        cutoff_date = date_obj(today.year - 18, 2, 28)
-    
-    active_under_18 = Member.objects.filter(member_is_active=True, member_dob__gt=cutoff_date).count()
-    inactive_under_18 = Member.objects.filter(member_is_active=False, member_dob__gt=cutoff_date).count()
-    active_18_plus = Member.objects.filter(member_is_active=True, member_dob__lte=cutoff_date).count()
-    inactive_18_plus = Member.objects.filter(member_is_active=False, member_dob__lte=cutoff_date).count()
-    
-    member_status_data = {
-        'active_under_18': active_under_18,
-        'inactive_under_18': inactive_under_18,
-        'active_18_plus': active_18_plus,
-        'inactive_18_plus': inactive_18_plus
-    }
+    from .dashboard_stats import get_dashboard_stats
+    import json
 
-    # Calculate percentages
-    if all_members != 0:
-        percentage_active = (active_members / all_members) * 100
-        percentage_passive = (passive_members / all_members) * 100
-    else:
-        percentage_active = 0
-        percentage_passive = 0
+    stats = get_dashboard_stats()
 
     context = context_data(request)
     context['page_name'] = 'Dashboard'
-    context['current_year'] = current_year
+    context['current_year'] = stats.current_year
     
     # Basic stats
-    context['all_members'] = all_members
-    context['active_members'] = active_members
-    context['passive_members'] = passive_members
-    context['all_staff'] = all_staff
-    context['all_meeting'] = all_meeting
-    context['meetings_this_year'] = meetings_this_year
+    context['all_members'] = stats.all_members
+    context['active_members'] = stats.active_members
+    context['passive_members'] = stats.passive_members
+    context['all_staff'] = stats.all_staff
+    context['all_meeting'] = stats.all_meeting
+    context['meetings_this_year'] = stats.meetings_this_year
     
     # Percentages
-    context['active_members_percentage'] = f'{percentage_active:.1f}'
-    context['passive_members_percentage'] = f'{percentage_passive:.1f}'
-    context['attendance_rate'] = f'{attendance_rate:.1f}'
-    context['fee_payment_rate'] = f'{fee_payment_rate:.1f}'
+    context['active_members_percentage'] = f'{stats.percentage_active:.1f}'
+    context['passive_members_percentage'] = f'{stats.percentage_passive:.1f}'
+    context['attendance_rate'] = f'{stats.attendance_rate:.1f}'
+    context['fee_payment_rate'] = f'{stats.fee_payment_rate:.1f}'
     
     # Chart data - format for JavaScript
-    import json
-    context['meeting_dates'] = json.dumps(meeting_dates)
-    context['attendance_counts'] = json.dumps(attendance_counts)
-    context['monthly_labels'] = json.dumps(monthly_labels)
-    context['monthly_attendance_data'] = json.dumps(monthly_attendance_data)
-    context['monthly_payment_labels'] = json.dumps(monthly_payment_labels)
-    context['monthly_payment_data'] = json.dumps(monthly_payment_data)
-    context['member_status_data'] = member_status_data
-    context['attendance_vs_fee'] = attendance_vs_fee
+    context['meeting_dates'] = json.dumps(stats.meeting_dates)
+    context['attendance_counts'] = json.dumps(stats.attendance_counts)
+    context['monthly_labels'] = json.dumps(stats.monthly_labels)
+    context['monthly_attendance_data'] = json.dumps(stats.monthly_attendance_data)
+    context['monthly_payment_labels'] = json.dumps(stats.monthly_labels)
+    context['monthly_payment_data'] = json.dumps(stats.monthly_payment_data)
+    context['member_status_data'] = stats.member_status_data
+    context['attendance_vs_fee'] = stats.attendance_vs_fee
     
     # Latest meeting
-    context['latest_meeting'] = latest_meeting
-    context['latest_meeting_member_count'] = latest_meeting_member_count
-    context['present_count_this_year'] = present_count_this_year
-    context['paid_count_this_year'] = paid_count_this_year
+    context['latest_meeting'] = stats.latest_meeting
+    context['latest_meeting_member_count'] = stats.latest_meeting_member_count
+    context['present_count_this_year'] = stats.present_count_this_year
+    context['paid_count_this_year'] = stats.paid_count_this_year
 
     # Member Roles Data for Dashboard Widgets
     from .models import MemberRole
@@ -326,50 +121,19 @@ def dashboard(request):
     context['sub_role_members'] = sub_role_members
     context['committee_members'] = committee_members
     
-    # Finance Calculations
-    # Total collected: Sum of meeting_fee for all attendance records where fee is paid
-    total_collected_result = MemberAttendance.objects.filter(
-        attendance_fee_status=True
-    ).select_related('meeting_date').aggregate(
-        total=Sum('meeting_date__meeting_fee')
-    )
-    total_collected = total_collected_result['total'] if total_collected_result['total'] else 0
-    
-    # Total to receive: Sum of meeting_fee for members who attended but didn't pay
-    total_to_receive_result = MemberAttendance.objects.filter(
-        attendance_status=True,
-        attendance_fee_status=False
-    ).select_related('meeting_date').aggregate(
-        total=Sum('meeting_date__meeting_fee')
-    )
-    total_to_receive = total_to_receive_result['total'] if total_to_receive_result['total'] else 0
-    
-    # Format numbers with commas for better readability (meeting_fee is IntegerField, so no decimals)
-    context['total_collected'] = f'{int(total_collected):,}'
-    context['total_to_receive'] = f'{int(total_to_receive):,}'
+    # Finance - format numbers with commas (meeting_fee is IntegerField, so no decimals)
+    context['total_collected'] = f'{int(stats.total_collected):,}'
+    context['total_to_receive'] = f'{int(stats.total_to_receive):,}'
+    context['members_in_arrears'] = stats.members_in_arrears
     
     # Calendar widget data - upcoming holidays and meetings
     from .holidays_utils import get_upcoming_holidays
     from datetime import date
-    import json
     upcoming_holidays = get_upcoming_holidays(5, date.today())
     context['upcoming_holidays'] = upcoming_holidays
     
-    # All meetings for calendar widget (already created above)
     # All meetings for calendar widget
-    all_meetings = MeetingInfo.objects.all().order_by('meeting_date')
-    meetings_dict = {}
-    for meeting in all_meetings:
-        meeting_date_str = meeting.meeting_date.strftime('%Y-%m-%d')
-        if meeting_date_str not in meetings_dict:
-            meetings_dict[meeting_date_str] = []
-        meetings_dict[meeting_date_str].append({
-            'id': meeting.meeting_id,
-            'date': meeting.meeting_date.strftime('%Y-%m-%d'),
-            'fee': meeting.meeting_fee
-        })
-    # Format meetings for JavaScript
-    context['all_meetings'] = json.dumps(meetings_dict)
+    context['all_meetings'] = json.dumps(stats.meetings_by_date)
     
     # Smart Recommendations
     from .recommendations import get_smart_recommendations
@@ -415,25 +179,20 @@ def member_attendance_report(request, member_id):
     context['current_year'] = current_year
 
     try:
-        from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
+        from .pagination import paginate
         
         member = get_object_or_404(Member, member_id=member_id)
         
         # Optimize query with select_related
         attendances_list = MemberAttendance.objects.filter(
             member_id=member_id
-        ).select_related('meeting_date').order_by('-meeting_date__meeting_date')
+        ).select_related('meeting_date')
         
-        # Pagination
-        paginator = Paginator(attendances_list, PAGINATION_MEMBER_ATTENDANCE_REPORT)
-        page = request.GET.get('page', 1)
-        
-        try:
-            attendances = paginator.page(page)
-        except PageNotAnInteger:
-            attendances = paginator.page(1)
-        except EmptyPage:
-            attendances = paginator.page(paginator.num_pages)
+        # Keyset pagination, newest meeting first (one row per meeting per member)
+        attendances = paginate(
+            request, attendances_list, PAGINATION_MEMBER_ATTENDANCE_REPORT,
+            ('-meeting_date__meeting_date', '-meeting_date_id')
+        )
         
         context['attendances'] = attendances
         context['page_obj'] = attendances  # For pagination template
@@ -462,9 +221,8 @@ def member_qr_generator(request, member_id):
 @user_passes_test(lambda u: u.is_superuser)
 def export_member_details(request):
     """Export members with format selection, column selection, and filter support"""
-    from .search_utils import search_members
-    from .export_utils import export_members_excel, export_members_pdf
-    from datetime import date
+    from .export_jobs import build_report_queryset, create_export_job, should_run_in_background
+    from .export_utils import export_members_csv, export_members_excel, export_members_pdf
     
     # Get data from POST or GET
     data_source = request.POST if request.method == 'POST' else request.GET
@@ -492,21 +250,10 @@ def export_member_details(request):
         if join_date_to:
             filters['join_date_to'] = join_date_to
     
-    # Get members with filters
-    members = search_members(search_query, filters)
-    
-    # Filter by age if needed
-    today = date.today()
-    cutoff_date = date(today.year - 18, today.month, today.day)
-    if today.month == 2 and today.day == 29:
-        cutoff_date = date(today.year - 18, 2, 28)
-    
-    if not is_adults:
-        # Members under 18
-        members = members.filter(member_dob__gt=cutoff_date)
-    else:
-        # Members 18+
-        members = members.filter(member_dob__lte=cutoff_date)
+    # Get members with filters (under 18 unless is_adults)
+    filters['search'] = search_query
+    filters['is_adults'] = is_adults
+    members = build_report_queryset('members', filters)
     
     # Get export format and selected columns
     export_format = data_source.get('format', 'excel')
@@ -517,35 +264,33 @@ def export_member_details(request):
         selected_columns = ['member_id', 'initials', 'first_name', 'last_name', 'address', 
                            'dob', 'telephone', 'account', 'guardian', 'role', 'status', 'join_date']
     
+    # Large Excel/PDF files are generated by the export worker
+    if should_run_in_background(members, export_format):
+        job = create_export_job(request.user, 'members', export_format, filters, selected_columns)
+        messages.success(request, f'Export #{job.job_id} has been queued. It will appear here when it is ready.')
+        return redirect('export_job_list')
+    
     # Export based on format
     if export_format == 'pdf':
         return export_members_pdf(members, selected_columns=selected_columns)
+    elif export_format == 'csv':
+        return export_members_csv(members, selected_columns=selected_columns)
     else:
         return export_members_excel(members, selected_columns=selected_columns)
 
 
 @user_passes_test(lambda u: u.is_superuser)
 def export_member_attendance_report(request, member_id):
+    from .export_utils import MEMBER_ATTENDANCE_COLUMNS, export_queryset_csv, export_queryset_excel, select_columns
     try:
         member = get_object_or_404(Member, member_id=member_id)
-        response = HttpResponse(content_type='application/ms-excel')
-        response['Content-Disposition'] = f'attachment; filename="{member.member_id} - {member.member_initials}{member.member_first_name} {member.member_last_name} Attendance Report.xlsx"'
-
-        wb = Workbook()
-        ws = wb.active
-        ws.title = "Member Attendance Report"
-
-        headers = ["Date", "Attendance State", "Member Fee State"]
-        ws.append(headers)
-
+        filename = f"{member.member_id} - {member.member_initials}{member.member_first_name} {member.member_last_name} Attendance Report"
         attendances = MemberAttendance.objects.filter(member_id=member_id)
-        for attendance in attendances:
-            member_attendance = 'Present' if attendance.attendance_status else 'Absent'
-            member_fee = 'Payed' if attendance.attendance_fee_status else 'Not Payed'
-            ws.append([attendance.meeting_date.meeting_date.strftime("%d/%m/%Y"), member_attendance, member_fee])
+        columns = select_columns(MEMBER_ATTENDANCE_COLUMNS)
 
-        wb.save(response)
-        return response
+        if request.GET.get('format') == 'csv':
+            return export_queryset_csv(attendances, columns, f"{filename}.csv")
+        return export_queryset_excel(attendances, columns, "Member Attendance Report", f"{filename}.xlsx")
     except Exception as e:
         messages.error(request, f"Error exporting report: {str(e)}")
         return redirect('member_list')
@@ -553,29 +298,16 @@ def export_member_attendance_report(request, member_id):
 
 @user_passes_test(lambda u: u.is_superuser)
 def export_attendance_report(request, meeting_id):
+    from .export_utils import MEETING_ATTENDANCE_COLUMNS, export_queryset_csv, export_queryset_excel, select_columns
     try:
         meeting = get_object_or_404(MeetingInfo, meeting_id=meeting_id)
+        filename = f'{meeting.meeting_date.strftime("%d/%m/%Y")} - Attendance Report'
         attendances = MemberAttendance.objects.filter(meeting_date=meeting_id)
+        columns = select_columns(MEETING_ATTENDANCE_COLUMNS)
 
-        response = HttpResponse(content_type='application/ms-excel')
-        response['Content-Disposition'] = f'attachment; filename="{meeting.meeting_date.strftime("%d/%m/%Y")} - Attendance Report.xlsx"'
-
-        wb = Workbook()
-        ws = wb.active
-        ws.title = "Attendance Report"
-
-        headers = ["Member ID", "Full Name", "Attendance State", "Member Fee State"]
-        ws.append(headers)
-
-        for attendance in attendances:
-            member = attendance.member_id
-            member_attendance = 'Present' if attendance.attendance_status else 'Absent'
-            member_fee = 'Payed' if attendance.attendance_fee_status else 'Not Payed'
-            full_name = f"{member.member_initials} {member.member_first_name} {member.member_last_name}"
-            ws.append([member.member_id, full_name, member_attendance, member_fee])
-
-        wb.save(response)
-        return response
+        if request.GET.get('format') == 'csv':
+            return export_queryset_csv(attendances, columns, f"{filename}.csv")
+        return export_queryset_excel(attendances, columns, "Attendance Report", f"{filename}.xlsx")
     except Exception as e:
         messages.error(request, f"Error exporting report: {str(e)}")
         return redirect('attendance_date_all')
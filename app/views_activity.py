@@ -0,0 +1,44 @@
+"""
+Recent activity feed from the ActivityLog audit trail
+"""
+from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse
+from .models import ActivityLog
+from .pagination import paginate
+
+
+ACTIVITY_FEED_PAGE_SIZE = 50
+
+
+@login_required
+def activity_feed(request):
+    """
+    Newest activity first, keyset-paginated on the created_at index.
+
+    Superusers see everyone's activity, staff only their own. Pass the
+    returned next_cursor as ?cursor= for older entries.
+    """
+    activities = ActivityLog.objects.select_related('user')
+    if not request.user.is_superuser:
+        activities = activities.filter(user=request.user)
+    if request.GET.get('action_type'):
+        activities = activities.filter(action_type=request.GET['action_type'])
+
+    page = paginate(request, activities, ACTIVITY_FEED_PAGE_SIZE, ('-created_at', 'activity_id'))
+    return JsonResponse({
+        'results': [
+            {
+                'id': activity.activity_id,
+                'user': activity.user.username if activity.user else None,
+                'action_type': activity.action_type,
+                'action_type_display': activity.get_action_type_display(),
+                'target_model': activity.target_model,
+                'target_id': activity.target_id,
+                'description': activity.description,
+                'created_at': activity.created_at.isoformat(),
+            }
+            for activity in page
+        ],
+        'next_cursor': page.next_cursor,
+        'previous_cursor': page.previous_cursor,
+    })
@@ -77,7 +77,7 @@ def attendance_full_view(request):
 
 @login_required
 def attendance_date_view(request, meeting_id):
-    from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
+    from .pagination import paginate
     
     context = context_data(request)
     try:
@@ -87,18 +87,10 @@ def attendance_date_view(request, meeting_id):
         # Optimize query with select_related to reduce database queries
         attendances_list = MemberAttendance.objects.filter(
             meeting_date=meeting_id
-        ).select_related('member_id', 'meeting_date').order_by('member_id__member_id')
-        
-        # Pagination
-        paginator = Paginator(attendances_list, PAGINATION_ATTENDANCE_LIST)
-        page = request.GET.get('page', 1)
+        ).select_related('member_id', 'meeting_date')
         
-        try:
-            attendances = paginator.page(page)
-        except PageNotAnInteger:
-            attendances = paginator.page(1)
-        except EmptyPage:
-            attendances = paginator.page(paginator.num_pages)
+        # Keyset pagination on the (meeting, member) unique index
+        attendances = paginate(request, attendances_list, PAGINATION_ATTENDANCE_LIST, ('member_id_id',))
         
         context['attendances'] = attendances
         context['page_obj'] = attendances  # For pagination template
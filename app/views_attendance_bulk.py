@@ -4,10 +4,12 @@ Bulk attendance marking views for optimized attendance recording
 from django.contrib import messages
 from django.shortcuts import redirect, render, get_object_or_404
 from django.contrib.auth.decorators import login_required
-from django.db import transaction
 from django.forms import formset_factory
+from django.utils import timezone
 from .forms import *
 from .models import MemberAttendance, MeetingInfo, Member
+from .attendance_followup import bulk_attendance_changes
+from .bulk_attendance import mark_all_present
 from .views import context_data
 
 
@@ -114,60 +116,65 @@ def attendance_bulk_mark(request):
         # Check if user is superuser
         is_superuser = request.user.is_superuser
         
-        with transaction.atomic():
-            for i, member_id in enumerate(member_ids):
-                try:
-                    member = Member.objects.get(member_id=member_id, member_is_active=True)
-                    
-                    # Get attendance status and fee status
-                    attendance_status_str = attendance_statuses[i] if i < len(attendance_statuses) else 'False'
-                    fee_status_str = fee_statuses[i] if i < len(fee_statuses) else 'False'
+        try:
+            with bulk_attendance_changes() as batch:
+                # Load all submitted members and their existing attendance up front
+                members = Member.objects.filter(member_is_active=True).in_bulk(member_ids)
+                existing_attendance = {
+                    att.member_id_id: att
+                    for att in MemberAttendance.objects.filter(
+                        meeting_date=selected_meeting,
+                        member_id__in=member_ids
+                    )
+                }
+                
+                to_create = []
+                to_update = []
+                now = timezone.now()
+                for i, member_id in enumerate(member_ids):
+                    if member_id not in members:
+                        error_count += 1
+                        continue
                     
                     # Convert string to boolean
-                    attendance_status = attendance_status_str == 'True'
-                    fee_status = fee_status_str == 'True'
-                    
-                    # Debug logging (remove in production)
-                    import logging
-                    logger = logging.getLogger(__name__)
-                    logger.debug(f'Processing member {member_id}: attendance={attendance_status}, fee={fee_status}')
-                    
                     # Members can pay fees even if absent - no validation needed
+                    attendance_status = attendance_statuses[i] == 'True'
+                    fee_status = fee_statuses[i] == 'True'
                     
-                    # Check if attendance already exists
-                    existing = MemberAttendance.objects.filter(
-                        meeting_date=selected_meeting,
-                        member_id=member
-                    ).first()
-                    
+                    existing = existing_attendance.get(member_id)
                     if existing:
                         # Only superusers can update existing attendance
                         # Normal staff can only mark new attendance, not edit existing ones
                         if not is_superuser:
                             permission_denied_count += 1
-                            continue  # Skip this member - non-superuser cannot edit existing attendance
+                            continue
                         
-                        # Update existing record (only superusers reach here)
-                        existing.attendance_status = attendance_status
-                        existing.attendance_fee_status = fee_status
-                        existing.save()
-                        success_count += 1
+                        if (existing.attendance_status, existing.attendance_fee_status) != (attendance_status, fee_status):
+                            existing.attendance_status = attendance_status
+                            existing.attendance_fee_status = fee_status
+                            existing.attendance_updated_at = now  # bulk_update skips auto_now
+                            to_update.append(existing)
                     else:
-                        # Create new record
-                        MemberAttendance.objects.create(
+                        to_create.append(MemberAttendance(
                             meeting_date=selected_meeting,
-                            member_id=member,
+                            member_id=members[member_id],
                             attendance_status=attendance_status,
                             attendance_fee_status=fee_status
-                        )
-                        success_count += 1
-                except Member.DoesNotExist:
-                    error_count += 1
-                except Exception as e:
-                    import logging
-                    logger = logging.getLogger(__name__)
-                    logger.error(f'Error processing member {member_id}: {str(e)}')
-                    error_count += 1
+                        ))
+                    batch.track(selected_meeting.meeting_id, member_id)
+                    success_count += 1
+                
+                # bulk_create/bulk_update skip signals; the batch recounts on exit
+                MemberAttendance.objects.bulk_create(to_create, batch_size=500)
+                MemberAttendance.objects.bulk_update(
+                    to_update,
+                    ['attendance_status', 'attendance_fee_status', 'attendance_updated_at'],
+                    batch_size=500
+                )
+        except Exception as e:
+            logger.error(f'Error saving bulk attendance for meeting {selected_meeting.meeting_id}: {str(e)}')
+            error_count += success_count
+            success_count = 0
         
         if success_count > 0:
             messages.success(request, f'Successfully marked attendance for {success_count} member(s).')
@@ -222,30 +229,14 @@ def attendance_mark_all_present(request, meeting_id):
     """
     try:
         meeting = get_object_or_404(MeetingInfo, meeting_id=meeting_id)
-        active_members = Member.objects.filter(member_is_active=True)
-        
-        success_count = 0
         
-        with transaction.atomic():
-            for member in active_members:
-                # Check if attendance already exists
-                attendance, created = MemberAttendance.objects.get_or_create(
-                    meeting_date=meeting,
-                    member_id=member,
-                    defaults={
-                        'attendance_status': True,
-                        'attendance_fee_status': False,
-                    }
-                )
-                
-                if not created:
-                    # Update existing record
-                    attendance.attendance_status = True
-                    attendance.save()
-                
-                success_count += 1
+        created_count, updated_count = mark_all_present(meeting)
         
-        messages.success(request, f'Marked all {success_count} active members as present for {meeting.meeting_date}.')
+        messages.success(
+            request,
+            f'Marked all active members as present for {meeting.meeting_date} '
+            f'({created_count} new, {updated_count} updated).'
+        )
         return redirect('attendance_date', meeting_id=meeting_id)
     
     except Exception as e:
@@ -4,11 +4,11 @@ Calendar View with Sri Lankan Holidays
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
 from .views import context_data
-from .models import MeetingInfo, MemberAttendance
+from .models import MeetingInfo
+from .meeting_summary import get_meeting_summaries
 from .holidays_utils import get_sri_lankan_holidays, get_upcoming_holidays
 from datetime import datetime, date
 from calendar import monthrange, monthcalendar
-from django.db.models import Count, Q
 
 
 @login_required
@@ -35,14 +35,14 @@ def calendar_view(request):
     all_holidays = get_sri_lankan_holidays(year)
     month_holidays = [h for h in all_holidays if h['date'].month == month]
     
-    # Get attendance stats for meetings
+    # Get attendance stats for meetings (pre-computed summaries)
+    meetings = list(meetings)
     meeting_stats = {}
-    for meeting in meetings:
-        attendance = MemberAttendance.objects.filter(meeting_date=meeting)
-        meeting_stats[meeting.meeting_id] = {
-            'total': attendance.count(),
-            'present': attendance.filter(attendance_status=True).count(),
-            'paid': attendance.filter(attendance_fee_status=True).count(),
+    for summary in get_meeting_summaries(meetings).values():
+        meeting_stats[summary.meeting_id] = {
+            'total': summary.total_count,
+            'present': summary.present_count,
+            'paid': summary.paid_count,
         }
     
     # Build calendar grid
@@ -0,0 +1,62 @@
+"""
+Background export jobs - list, progress polling and downloads
+"""
+from django.contrib.auth.decorators import login_required
+from django.http import FileResponse, Http404, JsonResponse
+from django.shortcuts import get_object_or_404, render
+from django.urls import reverse
+from django.utils import timezone
+from .models import ExportJob
+from .views import context_data
+
+
+def _user_jobs(request):
+    jobs = ExportJob.objects.all()
+    if not request.user.is_superuser:
+        jobs = jobs.filter(user=request.user)
+    return jobs
+
+
+def _job_data(job):
+    return {
+        'job_id': job.job_id,
+        'status': job.status,
+        'status_display': job.get_status_display(),
+        'progress': job.progress,
+        'rows_done': job.rows_done,
+        'rows_total': job.rows_total,
+        'error': job.error,
+        'download_url': reverse('export_job_download', args=[job.job_id]) if job.status == ExportJob.STATUS_DONE else None,
+    }
+
+
+@login_required
+def export_job_list(request):
+    """Recent export jobs of the current user (all users for superusers)"""
+    context = context_data(request)
+    context['page_name'] = 'Exports'
+    context.update({
+        'jobs': _user_jobs(request).select_related('user')[:50],
+        'active_statuses': [ExportJob.STATUS_PENDING, ExportJob.STATUS_RUNNING],
+        'breadcrumb_items': [
+            {'name': 'Dashboard', 'url': '/', 'icon': 'home'},
+            {'name': 'Reports Builder', 'url': reverse('reports_builder'), 'icon': 'file-alt'},
+            {'name': 'Exports', 'icon': 'download'},
+        ]
+    })
+    return render(request, 'reports/export_jobs.html', context)
+
+
+@login_required
+def export_job_status(request, job_id):
+    """Progress of one job, polled by the exports page"""
+    job = get_object_or_404(_user_jobs(request), job_id=job_id)
+    return JsonResponse(_job_data(job))
+
+
+@login_required
+def export_job_download(request, job_id):
+    job = get_object_or_404(_user_jobs(request), job_id=job_id)
+    if job.status != ExportJob.STATUS_DONE or not job.file or (job.expires_at and job.expires_at < timezone.now()):
+        raise Http404('Export is not available')
+    return FileResponse(job.file.open('rb'), as_attachment=True, filename=job.file.name.rsplit('/', 1)[-1])
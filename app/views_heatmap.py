@@ -5,8 +5,8 @@ from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
 from .models import Member, MemberAttendance, MeetingInfo
 from .views import context_data
-from datetime import date, timedelta
-from django.db.models import Count, Q
+from .meeting_summary import get_meeting_summaries
+from datetime import date
 
 
 @login_required
@@ -23,10 +23,12 @@ def attendance_heatmap(request):
     members = Member.objects.filter(member_is_active=True).order_by('member_first_name', 'member_last_name')
     
     # Get all meetings for the year
-    meetings = MeetingInfo.objects.filter(meeting_date__year=year).order_by('meeting_date')
+    meetings = list(MeetingInfo.objects.filter(meeting_date__year=year).order_by('meeting_date'))
     
     # Build heatmap data
     heatmap_data = []
+    # Per-month (present, total) used by the monthly summary
+    monthly_counts = {month: [0, 0] for month in range(1, 13)}
     
     if member_id:
         # Single member heatmap
@@ -47,18 +49,20 @@ def attendance_heatmap(request):
                     'meeting_id': meeting.meeting_id,
                 })
             
+            for meeting_date, attended in attendance_dict.items():
+                monthly_counts[meeting_date.month][0] += 1 if attended else 0
+                monthly_counts[meeting_date.month][1] += 1
+            
             context['selected_member'] = member
         except Member.DoesNotExist:
             pass
     else:
-        # Overall heatmap - show attendance rate per meeting
+        # Overall heatmap - show attendance rate per meeting (from meeting summaries)
+        total_members = Member.objects.filter(member_is_active=True).count()
+        summaries = get_meeting_summaries(meetings)
         for meeting in meetings:
-            total_members = Member.objects.filter(member_is_active=True).count()
+            present_count = summaries[meeting.meeting_id].present_count
             if total_members > 0:
-                present_count = MemberAttendance.objects.filter(
-                    meeting_date=meeting,
-                    attendance_status=True
-                ).count()
                 attendance_rate = (present_count / total_members) * 100
             else:
                 attendance_rate = 0
@@ -70,30 +74,18 @@ def attendance_heatmap(request):
                 'total_members': total_members,
                 'meeting_id': meeting.meeting_id,
             })
+            monthly_counts[meeting.meeting_date.month][0] += present_count
+            monthly_counts[meeting.meeting_date.month][1] += 1
     
     # Get monthly summary
     monthly_summary = []
     for month in range(1, 13):
-        month_meetings = meetings.filter(meeting_date__month=month)
+        present, total = monthly_counts[month]
         if member_id:
-            month_attendances = MemberAttendance.objects.filter(
-                member_id__member_id=member_id,
-                meeting_date__meeting_date__year=year,
-                meeting_date__meeting_date__month=month
-            )
-            present = month_attendances.filter(attendance_status=True).count()
-            total = month_attendances.count()
             rate = (present / total * 100) if total > 0 else 0
         else:
-            total = month_meetings.count()
             if total > 0:
-                present = MemberAttendance.objects.filter(
-                    meeting_date__meeting_date__year=year,
-                    meeting_date__meeting_date__month=month,
-                    attendance_status=True
-                ).count()
-                active_members = Member.objects.filter(member_is_active=True).count()
-                rate = (present / (total * active_members) * 100) if active_members > 0 else 0
+                rate = (present / (total * total_members) * 100) if total_members > 0 else 0
             else:
                 present = 0
                 rate = 0
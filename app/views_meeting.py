@@ -11,22 +11,13 @@ from .constants import PAGINATION_MEETING_LIST
 
 @login_required
 def meeting_list(request):
-    from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
+    from .pagination import paginate
     
     context = context_data(request)
     context['page_name'] = 'Meeting List'
     
-    # Pagination - ordered by date (newest first)
-    meetings_list = MeetingInfo.objects.all()
-    paginator = Paginator(meetings_list, PAGINATION_MEETING_LIST)
-    page = request.GET.get('page', 1)
-    
-    try:
-        meetings = paginator.page(page)
-    except PageNotAnInteger:
-        meetings = paginator.page(1)
-    except EmptyPage:
-        meetings = paginator.page(paginator.num_pages)
+    # Keyset pagination - ordered by date (newest first)
+    meetings = paginate(request, MeetingInfo.objects.all(), PAGINATION_MEETING_LIST, ('-meeting_date', '-meeting_id'))
     
     context['meetings'] = meetings
     context['page_obj'] = meetings  # For pagination template
@@ -6,6 +6,7 @@ from .models import *
 from .forms import *
 from .views import context_data
 from .utils import generate_qr_code
+from .engagement import get_engagement_scores
 from .constants import *
 from .audit_logger import audit_log_user_action
 from django.core.files.uploadedfile import UploadedFile
@@ -15,7 +16,7 @@ from django.views.decorators.http import require_http_methods
 
 @login_required
 def member_list(request):
-    from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
+    from .pagination import paginate
     from .search_utils import search_members
     from .models import MemberRole
     from datetime import date
@@ -54,18 +55,10 @@ def member_list(request):
         cutoff_date = date(today.year - 18, 2, 28)
     
     # Apply search and filters, then filter by age
-    members_list = search_members(search_query, filters).filter(member_dob__gt=cutoff_date).order_by('-member_join_at')
+    members_list = search_members(search_query, filters).filter(member_dob__gt=cutoff_date)
     
-    # Pagination
-    paginator = Paginator(members_list, PAGINATION_MEMBER_LIST)
-    page = request.GET.get('page', 1)
-    
-    try:
-        members = paginator.page(page)
-    except PageNotAnInteger:
-        members = paginator.page(1)
-    except EmptyPage:
-        members = paginator.page(paginator.num_pages)
+    # Keyset pagination on the join-date index (newest first)
+    members = paginate(request, members_list, PAGINATION_MEMBER_LIST, ('-member_join_at', 'member_id'))
     
     context['members'] = members
     context['page_obj'] = members
@@ -86,7 +79,7 @@ def member_list(request):
 @login_required
 def member_list_adults(request):
     """List members who are 18 years or older"""
-    from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
+    from .pagination import paginate
     from .search_utils import search_members
     from .models import MemberRole
     from datetime import date
@@ -125,18 +118,10 @@ def member_list_adults(request):
         cutoff_date = date(today.year - 18, 2, 28)
     
     # Apply search and filters, then filter by age (18+)
-    members_list = search_members(search_query, filters).filter(member_dob__lte=cutoff_date).order_by('-member_join_at')
+    members_list = search_members(search_query, filters).filter(member_dob__lte=cutoff_date)
     
-    # Pagination
-    paginator = Paginator(members_list, PAGINATION_MEMBER_LIST)
-    page = request.GET.get('page', 1)
-    
-    try:
-        members = paginator.page(page)
-    except PageNotAnInteger:
-        members = paginator.page(1)
-    except EmptyPage:
-        members = paginator.page(paginator.num_pages)
+    # Keyset pagination on the join-date index (newest first)
+    members = paginate(request, members_list, PAGINATION_MEMBER_LIST, ('-member_join_at', 'member_id'))
     
     context['members'] = members
     context['page_obj'] = members
@@ -255,6 +240,60 @@ def member_view(request, member_id):
         return redirect('member_list')
 
 
+# Leaderboard columns that can be sorted on (?sort=...&dir=asc|desc)
+LEADERBOARD_COLUMNS = [
+    ('member_id', 'Member'),
+    ('score', 'Score'),
+    ('attendance', 'Attendance'),
+    ('payment', 'Payment'),
+    ('recent_activity', 'Recent'),
+    ('leadership', 'Role'),
+]
+
+
+@login_required
+def member_leaderboard(request):
+    """Active members ranked by engagement score, from the cached snapshot"""
+    from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
+    
+    context = context_data(request)
+    context['page_name'] = 'Engagement Leaderboard'
+    
+    sort = request.GET.get('sort', 'score')
+    if sort not in dict(LEADERBOARD_COLUMNS):
+        sort = 'score'
+    descending = request.GET.get('dir', 'asc' if sort == 'member_id' else 'desc') != 'asc'
+    
+    # Ties keep member ID order (the snapshot order), whichever way the column is sorted
+    scores = get_engagement_scores()
+    ranked = sorted(scores, key=lambda entry: entry.score, reverse=True)
+    ranks = {entry.member_id: rank for rank, entry in enumerate(ranked, start=1)}
+    entries = sorted(scores, key=lambda entry: getattr(entry, sort), reverse=descending)
+    
+    paginator = Paginator(entries, PAGINATION_MEMBER_LIST)
+    page = request.GET.get('page', 1)
+    try:
+        leaderboard = paginator.page(page)
+    except PageNotAnInteger:
+        leaderboard = paginator.page(1)
+    except EmptyPage:
+        leaderboard = paginator.page(paginator.num_pages)
+    
+    context.update({
+        'leaderboard': [(ranks[entry.member_id], entry) for entry in leaderboard],
+        'page_obj': leaderboard,
+        'columns': LEADERBOARD_COLUMNS,
+        'sort': sort,
+        'direction': 'desc' if descending else 'asc',
+        'breadcrumb_items': [
+            {'name': 'Dashboard', 'url': '/', 'icon': 'home'},
+            {'name': 'Members', 'url': '/member/list/', 'icon': 'child'},
+            {'name': 'Leaderboard', 'icon': 'trophy'},
+        ],
+    })
+    return render(request, 'member/leaderboard.html', context)
+
+
 @user_passes_test(lambda u: u.is_superuser)
 def member_delete(request, member_id):
     from django.contrib import messages
@@ -5,7 +5,9 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib import messages
 from django.db.models import Sum, Count, Q
-from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
+from .pagination import paginate
+from .payment_stats import get_payment_stats
+from .member_ledger import ledger_totals, members_in_arrears
 from .models import Payment, Member, MeetingInfo
 from .views import context_data
 from .audit_logger import audit_log_user_action
@@ -41,16 +43,8 @@ def payment_list(request):
     total_amount = payments.aggregate(total=Sum('amount'))['total'] or 0
     total_count = payments.count()
     
-    # Pagination
-    paginator = Paginator(payments.order_by('-payment_date'), 20)
-    page = request.GET.get('page', 1)
-    
-    try:
-        payments_page = paginator.page(page)
-    except PageNotAnInteger:
-        payments_page = paginator.page(1)
-    except EmptyPage:
-        payments_page = paginator.page(paginator.num_pages)
+    # Keyset pagination on the payment-date index (the total is already known)
+    payments_page = paginate(request, payments, 20, ('-payment_date', 'payment_id'), count=total_count)
     
     context.update({
         'payments': payments_page,
@@ -236,44 +230,11 @@ def payment_statistics(request):
     # Get date range from request or default to current year
     year = int(request.GET.get('year', datetime.now().year))
     
-    # Total statistics
-    all_payments = Payment.objects.filter(payment_date__year=year)
-    total_amount = all_payments.aggregate(total=Sum('amount'))['total'] or 0
-    total_count = all_payments.count()
-    
-    # By payment method
-    by_method = all_payments.values('payment_method').annotate(
-        total=Sum('amount'),
-        count=Count('payment_id')
-    ).order_by('-total')
-    
-    # Monthly breakdown
-    monthly_data = []
-    for month in range(1, 13):
-        month_payments = all_payments.filter(payment_date__month=month)
-        monthly_data.append({
-            'month': datetime(year, month, 1).strftime('%B'),
-            'amount': month_payments.aggregate(total=Sum('amount'))['total'] or 0,
-            'count': month_payments.count()
-        })
-    
-    # Top paying members
-    top_members = all_payments.values(
-        'member__member_id',
-        'member__member_first_name',
-        'member__member_last_name'
-    ).annotate(
-        total=Sum('amount'),
-        count=Count('payment_id')
-    ).order_by('-total')[:10]
+    stats = get_payment_stats(year)
     
     context.update({
         'year': year,
-        'total_amount': total_amount,
-        'total_count': total_count,
-        'by_method': by_method,
-        'monthly_data': monthly_data,
-        'top_members': top_members,
+        **stats,
         'breadcrumb_items': [
             {'name': 'Dashboard', 'url': '/', 'icon': 'home'},
             {'name': 'Payments', 'url': '/payment/list/', 'icon': 'money-bill-wave'},
@@ -283,3 +244,29 @@ def payment_statistics(request):
     
     return render(request, 'payment/statistics.html', context)
 
+
+
+@login_required
+def payment_arrears(request):
+    """Members with attended meetings still unpaid, largest balance first"""
+    context = context_data(request)
+    context['page_name'] = 'Members in Arrears'
+    
+    totals = ledger_totals()
+    
+    # Keyset pagination on the outstanding index of the member ledgers
+    ledgers = paginate(request, members_in_arrears(), PAGINATION_MEMBER_LIST, ('-outstanding', 'member_id'), count=totals['members_in_arrears'])
+    
+    context.update({
+        'ledgers': ledgers,
+        'page_obj': ledgers,
+        'total_outstanding': totals['total_outstanding'],
+        'members_in_arrears': totals['members_in_arrears'],
+        'breadcrumb_items': [
+            {'name': 'Dashboard', 'url': '/', 'icon': 'home'},
+            {'name': 'Payments', 'url': '/payment/list/', 'icon': 'money-bill-wave'},
+            {'name': 'Arrears', 'icon': 'exclamation-triangle'},
+        ]
+    })
+    
+    return render(request, 'payment/arrears.html', context)
@@ -4,14 +4,28 @@ Custom Reports Builder
 from django.shortcuts import render, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import HttpResponse
+from django.http import HttpResponse, JsonResponse
+from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
 from django.db.models import Count, Sum, Q, Avg
 from .models import Member, MeetingInfo, MemberAttendance, Payment
 from .views import context_data
-from .export_utils import export_members_excel, export_members_pdf, export_meetings_excel, export_attendance_excel
+from .attendance_analytics import DECLINE_THRESHOLD, DEFAULT_WINDOW, WINDOWS, declining_members, window_summary
+from .constants import PAGINATION_MEMBER_LIST
+from .export_jobs import build_report_queryset, create_export_job, should_run_in_background
+from .export_utils import (
+    export_members_excel, export_members_pdf, export_members_csv,
+    export_meetings_excel, export_meetings_csv,
+    export_attendance_excel, export_attendance_csv,
+    export_payments_excel, export_payments_csv,
+)
 from datetime import datetime, date, timedelta
 
 
+def _bool_filter(value):
+    """'true'/'false' from a filter select, None for 'All'"""
+    return {'true': True, 'false': False}.get(value)
+
+
 @login_required
 def reports_builder(request):
     """Custom reports builder interface"""
@@ -26,15 +40,15 @@ def reports_builder(request):
         
         # Build filters based on report type
         if report_type == 'members':
-            filters['is_active'] = request.POST.get('member_status', '')
+            filters['is_active'] = _bool_filter(request.POST.get('member_status', ''))
             filters['role'] = request.POST.get('member_role', '')
             filters['join_date_from'] = request.POST.get('join_date_from', '')
             filters['join_date_to'] = request.POST.get('join_date_to', '')
         elif report_type == 'attendance':
             filters['member_id'] = request.POST.get('member_id', '')
             filters['meeting_id'] = request.POST.get('meeting_id', '')
-            filters['attendance_status'] = request.POST.get('attendance_status', '')
-            filters['fee_status'] = request.POST.get('fee_status', '')
+            filters['attendance_status'] = _bool_filter(request.POST.get('attendance_status', ''))
+            filters['fee_status'] = _bool_filter(request.POST.get('fee_status', ''))
             if date_from:
                 filters['date_from'] = date_from
             if date_to:
@@ -55,72 +69,41 @@ def reports_builder(request):
                 filters['date_to'] = date_to
         
         export_format = request.POST.get('export_format', 'excel')
+        if export_format == 'pdf' and report_type != 'members':
+            export_format = 'excel'  # PDF is members only
         
         # Generate report
         try:
+            queryset = build_report_queryset(report_type, filters)
+            
+            # Large Excel/PDF files are generated by the export worker
+            if (request.POST.get('background') == 'on' and export_format != 'csv') or should_run_in_background(queryset, export_format):
+                job = create_export_job(request.user, report_type, export_format, filters)
+                messages.success(request, f'Export #{job.job_id} has been queued. It will appear here when it is ready.')
+                return redirect('export_job_list')
+            
             if report_type == 'members':
-                from .search_utils import search_members
-                members = search_members('', filters)
                 if export_format == 'pdf':
-                    return export_members_pdf(members)
+                    return export_members_pdf(queryset)
+                elif export_format == 'csv':
+                    return export_members_csv(queryset)
                 else:
-                    return export_members_excel(members)
+                    return export_members_excel(queryset)
             
             elif report_type == 'attendance':
-                from .search_utils import search_attendance
-                attendances = search_attendance('', filters)
-                return export_attendance_excel(attendances)
+                if export_format == 'csv':
+                    return export_attendance_csv(queryset)
+                return export_attendance_excel(queryset)
             
             elif report_type == 'meetings':
-                from .search_utils import search_meetings
-                meetings = search_meetings('', filters)
-                return export_meetings_excel(meetings)
+                if export_format == 'csv':
+                    return export_meetings_csv(queryset)
+                return export_meetings_excel(queryset)
             
             elif report_type == 'payments':
-                payments = Payment.objects.select_related('member', 'meeting').all()
-                if filters.get('member_id'):
-                    payments = payments.filter(member__member_id__icontains=filters['member_id'])
-                if filters.get('payment_method'):
-                    payments = payments.filter(payment_method=filters['payment_method'])
-                if filters.get('date_from'):
-                    payments = payments.filter(payment_date__date__gte=filters['date_from'])
-                if filters.get('date_to'):
-                    payments = payments.filter(payment_date__date__lte=filters['date_to'])
-                
-                # Export payments to Excel
-                from openpyxl import Workbook
-                from openpyxl.styles import Font, PatternFill, Alignment
-                response = HttpResponse(content_type='application/ms-excel')
-                response['Content-Disposition'] = f'attachment; filename="Payments_Report_{datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx"'
-                
-                wb = Workbook()
-                ws = wb.active
-                ws.title = "Payments"
-                
-                headers = ["Payment ID", "Member ID", "Member Name", "Amount", "Method", "Meeting Date", "Receipt #", "Date"]
-                ws.append(headers)
-                
-                for payment in payments:
-                    ws.append([
-                        payment.payment_id,
-                        payment.member.member_id,
-                        f"{payment.member.member_first_name} {payment.member.member_last_name}",
-                        float(payment.amount),
-                        payment.get_payment_method_display(),
-                        payment.meeting.meeting_date.strftime("%d/%m/%Y") if payment.meeting else "",
-                        payment.receipt_number or "",
-                        payment.payment_date.strftime("%d/%m/%Y %H:%M")
-                    ])
-                
-                # Style header
-                for cell in ws[1]:
-                    cell.font = Font(bold=True)
-                    cell.fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-                    cell.font = Font(bold=True, color="FFFFFF")
-                    cell.alignment = Alignment(horizontal='center')
-                
-                wb.save(response)
-                return response
+                if export_format == 'csv':
+                    return export_payments_csv(queryset)
+                return export_payments_excel(queryset)
             
         except Exception as e:
             messages.error(request, f'Error generating report: {str(e)}')
@@ -203,3 +186,72 @@ def reports_quick_stats(request):
     
     return render(request, 'reports/quick_stats.html', context)
 
+
+def _declining_attendance(request):
+    """
+    Declining members for ?window= (a WINDOWS key) and ?min_drop= (percent).
+
+    Returns:
+        tuple: (window key, min_drop, summary of the windows, list of AttendanceTrend)
+    """
+    window = request.GET.get('window', DEFAULT_WINDOW)
+    if window not in WINDOWS:
+        window = DEFAULT_WINDOW
+    try:
+        min_drop = max(1, min(100, int(request.GET.get('min_drop', ''))))
+    except ValueError:
+        min_drop = round(DECLINE_THRESHOLD * 100)
+    
+    days = WINDOWS[window][1]
+    return window, min_drop, window_summary(days), declining_members(days, min_drop / 100)
+
+
+@login_required
+def reports_declining_attendance(request):
+    """Active members whose attendance dropped between two adjacent windows"""
+    context = context_data(request)
+    context['page_name'] = 'Declining Attendance'
+    
+    window, min_drop, summary, trends = _declining_attendance(request)
+    
+    paginator = Paginator(trends, PAGINATION_MEMBER_LIST)
+    page = request.GET.get('page', 1)
+    try:
+        members = paginator.page(page)
+    except PageNotAnInteger:
+        members = paginator.page(1)
+    except EmptyPage:
+        members = paginator.page(paginator.num_pages)
+    
+    context.update({
+        'members': members,
+        'page_obj': members,
+        'windows': [(key, label) for key, (label, _days) in WINDOWS.items()],
+        'window': window,
+        'min_drop': min_drop,
+        'summary': summary,
+        'breadcrumb_items': [
+            {'name': 'Dashboard', 'url': '/', 'icon': 'home'},
+            {'name': 'Reports', 'url': '/reports/builder/', 'icon': 'file-alt'},
+            {'name': 'Declining Attendance', 'icon': 'arrow-down'},
+        ]
+    })
+    
+    return render(request, 'reports/declining_attendance.html', context)
+
+
+@login_required
+def reports_declining_attendance_json(request):
+    """Same report as JSON, with every declining member"""
+    window, min_drop, summary, trends = _declining_attendance(request)
+    return JsonResponse({
+        'window': window,
+        'min_drop': min_drop,
+        'previous_start': summary['previous_start'].isoformat(),
+        'recent_start': summary['recent_start'].isoformat(),
+        'end': summary['end'].isoformat(),
+        'previous_meetings': summary['previous_meetings'],
+        'recent_meetings': summary['recent_meetings'],
+        'count': len(trends),
+        'results': [trend._asdict() for trend in trends],
+    })
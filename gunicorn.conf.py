@@ -0,0 +1,13 @@
+"""
+Gunicorn server hooks
+Loaded automatically from the working directory; bind address and worker
+count stay on the command line (Dockerfile, docker-compose.yml)
+"""
+
+
+def worker_exit(server, worker):
+    """Write queued audit events and buffered activity before the worker process exits"""
+    from app.activity_log import flush_activity
+    from app.audit_logger import stop_audit_pipeline
+    stop_audit_pipeline()
+    flush_activity(force=True)
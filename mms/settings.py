@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/4.2/ref/settings/
 
 from pathlib import Path
 import os
+import tempfile
 from decouple import config
 
 # Configure PyMySQL to work with Django (must be before any Django imports)
@@ -53,6 +54,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'app.request_metrics.RequestMetricsMiddleware',  # Query count and timings (first, to include all middleware)
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -68,9 +70,11 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = 'mms.urls'
 
+TEST_RUNNER = 'app.test_runner.QueryCheckingTestRunner'  # Fails tests on N+1 queries (see app.request_metrics)
+
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'app.request_metrics.TimedDjangoTemplates',  # DjangoTemplates with render timing
         'DIRS': [BASE_DIR / 'templates']
         ,
         'APP_DIRS': True,
@@ -166,13 +170,34 @@ CRISPY_TEMPLATE_PACK = "bootstrap5"
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Bulk attendance marking posts three fields per member; allow ~1,000 members
+DATA_UPLOAD_MAX_NUMBER_FIELDS = config('DATA_UPLOAD_MAX_NUMBER_FIELDS', default=3100, cast=int)
+
+# Background exports (manage.py run_export_worker)
+EXPORT_BACKGROUND_ROW_THRESHOLD = config('EXPORT_BACKGROUND_ROW_THRESHOLD', default=5000, cast=int)  # larger Excel/PDF exports are queued
+EXPORT_JOB_RETENTION_HOURS = config('EXPORT_JOB_RETENTION_HOURS', default=24, cast=int)
+EXPORT_PDF_WORKERS = config('EXPORT_PDF_WORKERS', default=2, cast=int)  # processes rendering large PDF jobs in the worker
+
 # Cache configuration (for automatic member deactivation throttling)
 # Using local memory cache - works without external dependencies
+# Per-process LRU in front of a file cache shared by all workers on the host,
+# so throttles and computed results are shared (see app.two_tier_cache)
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-        'LOCATION': 'unique-snowflake',
-    }
+        'BACKEND': 'app.two_tier_cache.TwoTierCache',
+        'TIMEOUT': 300,
+        'OPTIONS': {
+            'L2': 'shared',
+            'L1_MAX_ENTRIES': config('CACHE_L1_MAX_ENTRIES', default=1000, cast=int),
+            'L1_TIMEOUT': 10,  # seconds an entry may be served from process memory
+            'CHECK_INTERVAL': 1,  # seconds between generation stamp checks
+        },
+    },
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': config('CACHE_DIR', default=os.path.join(tempfile.gettempdir(), 'mms_cache')),
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
 }
 
 # Session Security Settings
@@ -240,12 +265,14 @@ LOGGING = {
             'class': 'logging.FileHandler',
             'filename': os.path.join(BASE_DIR, 'logs', 'security.log'),
             'formatter': 'verbose',
+            'delay': True,  # Only create the file once something is logged
         },
         'security_file': {
             'level': 'WARNING',
             'class': 'logging.FileHandler',
             'filename': os.path.join(BASE_DIR, 'logs', 'security_events.log'),
             'formatter': 'verbose',
+            'delay': True,  # Only create the file once something is logged
         },
     },
     'loggers': {
@@ -267,6 +294,36 @@ LOGGING = {
     },
 }
 
+# Rate limits per client IP: (path prefix, max requests, window seconds), first match wins.
+# Counted in the database so all gunicorn workers share them (see app.rate_limit)
+RATE_LIMITS = [
+    ('/login/', 5, 300),  # 5 attempts per 5 minutes
+    ('/staff/register/', 3, 600),  # 3 attempts per 10 minutes
+    ('/member/register/', 10, 60),  # 10 attempts per minute
+    ('/attendance/mark/', 20, 60),  # 20 attempts per minute
+]
+
+# Audit records are formatted and written by a background thread (see app.audit_logger)
+AUDIT_LOG_ASYNC = config('AUDIT_LOG_ASYNC', default=True, cast=bool)
+AUDIT_LOG_QUEUE_SIZE = config('AUDIT_LOG_QUEUE_SIZE', default=10000, cast=int)  # events waiting to be written
+
+# User actions and security events are also stored in ActivityLog, in batches (see app.activity_log)
+ACTIVITY_LOG_ENABLED = config('ACTIVITY_LOG_ENABLED', default=True, cast=bool)
+ACTIVITY_LOG_BATCH_SIZE = config('ACTIVITY_LOG_BATCH_SIZE', default=50, cast=int)
+ACTIVITY_LOG_FLUSH_SECONDS = config('ACTIVITY_LOG_FLUSH_SECONDS', default=10, cast=int)
+
+# Per-request query count and timings, sent as Server-Timing and added to the audit record (see app.request_metrics)
+REQUEST_METRICS_ENABLED = config('REQUEST_METRICS_ENABLED', default=True, cast=bool)
+SERVER_TIMING_HEADER = config('SERVER_TIMING_HEADER', default=DEBUG, cast=bool)  # query counts and timings are visible to any client
+SLOW_REQUEST_MS = config('SLOW_REQUEST_MS', default=1000, cast=int)  # slower requests log their slowest SQL
+SLOW_REQUEST_QUERY_COUNT = config('SLOW_REQUEST_QUERY_COUNT', default=5, cast=int)
+# N+1 detection: 'off', 'log' (audit warning) or 'raise' (the test runner uses 'raise')
+QUERY_REPEAT_CHECK = config('QUERY_REPEAT_CHECK', default='off')
+QUERY_REPEAT_THRESHOLD = config('QUERY_REPEAT_THRESHOLD', default=5, cast=int)  # same SELECT this many times in one request
+
+# Dashboard recommendations on a cold cache: providers that do not fit are computed after the response (see app.recommendations)
+RECOMMENDATIONS_TIME_BUDGET_MS = config('RECOMMENDATIONS_TIME_BUDGET_MS', default=500, cast=int)
+
 # Create logs directory if it doesn't exist
 LOGS_DIR = os.path.join(BASE_DIR, 'logs')
 if not os.path.exists(LOGS_DIR):